@@ -1,18 +1,18 @@
 import streamlit as st
-import pandas as pd
-from datetime import datetime, timedelta
+from datetime import datetime
 import time
-import toml
-import os
 
 # Import shared utilities
 from utils import (
-    load_rsvps, save_rsvps, get_deadline_datetime, is_past_deadline,
-    get_time_until_deadline, format_time_remaining
+    load_rsvps, get_rsvp_summary, get_recent_rsvps, get_menu_totals, search_rsvps,
+    get_deadline_state, get_deadline_datetime, is_past_deadline,
+    get_time_until_deadline, format_time_remaining, get_rsvp_export,
+    ensure_rsvp_ids, apply_rsvp_edits, get_write_queue_metrics, get_duplicate_rsvps
 )
-
-# Admin password (configured in secrets.toml)
-ADMIN_PASSWORD = st.secrets["admin"]["password"]
+from config import get_config
+import perf
+from perf import timed
+from rate_limit import admit, describe_wait
 
 def show_login_success():
     """Display a simple login success acknowledgment"""
@@ -24,6 +24,7 @@ def admin_welcome_header():
     """Display a welcome header for authenticated admin users"""
     st.info(":material/admin_panel_settings: **Welcome, Admin!** You are logged in to the Wedding RSVP Management System")
 
+@timed
 def admin_login_page():
     """Admin login page"""
     st.title(":material/lock: Admin Login")
@@ -35,7 +36,13 @@ def admin_login_page():
         submit_button = st.form_submit_button("Login", type="primary")
 
     if submit_button:
-        if password == ADMIN_PASSWORD:
+        # Every attempt counts, so passwords cannot be guessed at full speed
+        wait = admit("admin_login")
+        if wait:
+            st.error(
+                f":material/lock_clock: Too many login attempts. Please wait {describe_wait(wait)} and try again."
+            )
+        elif password == get_config().admin.password:
             # Set authentication state
             st.session_state.authenticated = True
             st.session_state.just_logged_in = True
@@ -49,11 +56,15 @@ def admin_login_page():
     st.markdown("---")
     st.info(":material/lightbulb: If you're a guest looking to submit your RSVP, please use the RSVP form instead.")
 
+@timed
 def admin_summary_page():
     """Admin summary page"""
     if not st.session_state.authenticated:
         st.error(":material/lock: Please log in to access this page.")
         st.stop()
+
+    # Imported here so the login page does not load pandas
+    import pandas as pd
     
     # Show welcome header for authenticated users
     admin_welcome_header()
@@ -63,29 +74,30 @@ def admin_summary_page():
         st.success(":material/target: Successfully accessed RSVP Summary Dashboard!")
         st.session_state.just_logged_in = False  # Reset the flag
     
-    st.title(f":material/bar_chart: RSVP Summary: (Time Zone: ({st.secrets['deadline'].get('timezone', 'UTC')})")
+    deadline_state = get_deadline_state()
+    deadline_config = get_config().deadline
+    timezone = deadline_state.timezone if deadline_state else (deadline_config.timezone if deadline_config else 'UTC')
+    st.title(f":material/bar_chart: RSVP Summary: (Time Zone: ({timezone})")
 
     # Display deadline status
-    deadline = get_deadline_datetime()
+    deadline = get_deadline_datetime(deadline_state)
     if deadline:
         col1, col2 = st.columns(2)
 
         with col1:
-            if is_past_deadline():
+            if is_past_deadline(deadline_state):
                 st.error(f":material/schedule: **Deadline has passed**")
                 st.write(f"Deadline was: {deadline.strftime('%B %d, %Y at %I:%M %p %Z')}")
 
                 # Check if still in grace period
-                grace_hours = st.secrets["deadline"].get("grace_period_hours", 24)
-                grace_end = deadline + timedelta(hours=grace_hours)
-                now = datetime.now(deadline.tzinfo)
+                grace_end = deadline_state.grace_end
 
-                if now <= grace_end:
+                if deadline_state.now <= grace_end:
                     st.warning(f":material/timer: Still in grace period until: {grace_end.strftime('%B %d, %Y at %I:%M %p %Z')}")
                 else:
                     st.info(":material/block: Grace period has also ended")
             else:
-                time_remaining = get_time_until_deadline()
+                time_remaining = get_time_until_deadline(deadline_state)
                 formatted_time = format_time_remaining(time_remaining)
                 st.success(f":material/schedule: **Deadline is active**")
                 st.error(f"Deadline: {deadline.strftime('%B %d, %Y at %I:%M %p %Z')}")
@@ -94,28 +106,28 @@ def admin_summary_page():
         with col2:
             # Deadline configuration display
             st.info(":material/settings: **Deadline Configuration**")
-            warning_days = st.secrets["deadline"].get("warning_days", 7)
-            grace_hours = st.secrets["deadline"].get("grace_period_hours", 24)
+            warning_days = deadline_state.warning_days
+            grace_hours = deadline_state.grace_hours
 
             st.warning(f"Warning period: {warning_days} days before deadline")
             st.warning(f"Grace period: {grace_hours} hours after deadline")
 
         st.markdown("---")
 
-    # Load data
-    df = load_rsvps()
+    # Summary counts are computed by the storage backend
+    summary = get_rsvp_summary()
     
-    if not df.empty:
+    if summary['total_rows'] > 0:
         # Summary statistics
         st.write("**RSVP Overview**")
         
         # Main metrics
         col1, col2, col3, col4 = st.columns(4)
         
-        total_contacts = df['contact_name'].nunique()
-        attending_contacts = df[df['attending'] == 'Yes']['contact_name'].nunique()
-        not_attending_contacts = df[df['attending'] == 'No']['contact_name'].nunique()
-        total_guests = len(df[df['attending'] == 'Yes'])
+        total_contacts = summary['total_contacts']
+        attending_contacts = summary['attending_contacts']
+        not_attending_contacts = summary['not_attending_contacts']
+        total_guests = summary['total_guests']
         
         with col1:
             st.metric("Total Responses", total_contacts)
@@ -137,9 +149,9 @@ def admin_summary_page():
         
         # Recent RSVPs
         #st.subheader("Recent RSVPs")
-        recent_df = df.sort_values('timestamp', ascending=False).head(10)
+        recent_df = get_recent_rsvps(10)
         st.divider()
-        for _, row in recent_df.iterrows():
+        for row in recent_df.to_dict('records'):
             with st.container():
                 col1, col2, col3 = st.columns([2, 1, 1])
                 with col1:
@@ -158,42 +170,92 @@ def admin_summary_page():
                         st.write(":material/chat_bubble_outline: No comments")
                         
                 with col3:
-                    st.write(f":material/date_range: *{row['timestamp'].split()[0]}*")  # Just the date
+                    submitted = row['timestamp'].strftime('%Y-%m-%d') if pd.notna(row['timestamp']) else "Unknown"
+                    st.write(f":material/date_range: *{submitted}*")  # Just the date
 
                 st.markdown("---")
     else:
         st.info(":material/inbox: No RSVPs have been submitted yet.")
 
+    # Parties sharing a contact name or email, grouped from the contact index
+    duplicates = get_duplicate_rsvps()
+    with st.expander(f":material/content_copy: Possible duplicate RSVPs ({len(duplicates)})"):
+        if not duplicates:
+            st.write("No two RSVPs share a contact name or email address.")
+        for group in duplicates:
+            st.write(f"**{group[0]['contact_name']}**")
+            for party in group:
+                email = party['contact_email'] or "no email"
+                guests = len(party['rows'])
+                st.write(
+                    f"- {party['contact_name']} ({email}): {guests} row{'s' if guests != 1 else ''}, "
+                    f"submitted {party['timestamp'] or 'at an unknown time'}"
+                )
+        st.caption(
+            "Resubmissions from the same contact name and email replace the earlier RSVP automatically. "
+            "Use the Data Export page to remove any remaining duplicates."
+        )
+
+    # Background writer health
+    with st.expander(":material/speed: Submission queue"):
+        metrics = get_write_queue_metrics()
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Queued", f"{metrics['queue_depth']} / {metrics['queue_capacity']}")
+        with col2:
+            st.metric("Committed", metrics['committed_parties'])
+        with col3:
+            latency = metrics['commit_latency_p50_ms']
+            st.metric("Commit latency (p50)", f"{latency:.0f} ms" if latency is not None else "-")
+        with col4:
+            latency = metrics['commit_latency_p95_ms']
+            st.metric("Commit latency (p95)", f"{latency:.0f} ms" if latency is not None else "-")
+        st.caption(
+            f"{metrics['committed_batches']} batches written, last batch {metrics['last_batch_size']} submissions, "
+            f"{metrics['replaced_parties']} resubmissions replaced an earlier RSVP"
+        )
+        if metrics['failed_commits']:
+            st.warning(
+                f":material/warning: {metrics['failed_commits']} commits failed and were retried. "
+                f"Last error: {metrics['last_error']}"
+            )
+        if metrics['dead_letter_parties']:
+            st.error(
+                f":material/error: {metrics['dead_letter_parties']} submissions could not be saved and were set aside "
+                f"in `{metrics['dead_letter_file']}`. Fix the cause and re-enter them from there."
+            )
+
+@timed
 def admin_menu_page():
     """Admin menu planning page"""
     if not st.session_state.authenticated:
         st.error(":material/lock: Please log in to access this page.")
         st.stop()
+
+    # Imported here so the login page does not load pandas
+    import pandas as pd
     
     # Show welcome header for authenticated users
     admin_welcome_header()
     
     st.title(":material/restaurant: Menu Planning")
 
-    # Load data
-    df = load_rsvps()
-
-    # Check if dataframe is empty or missing required columns
-    if df.empty or 'attending' not in df.columns:
-        st.info(":material/inbox: No attending guests yet to display menu planning data.")
-        return
-
-    total_guests = len(df[df['attending'] == 'Yes'])
+    # Running totals maintained by the storage layer on every save
+    totals = get_menu_totals()
+    total_guests = totals['total_guests']
 
     if total_guests > 0:
-        attending_df = df[df['attending'] == 'Yes']
-        
+        def choice_counts(column):
+            """Menu choice counts as a series, most popular first"""
+            counts = pd.Series(totals['counts'].get(column, {}), dtype='int64')
+            return counts.sort_values(ascending=False, kind='stable')
+
         # Menu summary in columns
         col1, col2, col3 = st.columns(3)
         
         with col1:
             st.subheader(":material/restaurant: Starters")
-            starter_counts = attending_df['starter_choice'].value_counts()
+            starter_counts = choice_counts('starter_choice')
             for starter, count in starter_counts.items():
                 st.write(f"**{starter}:** {count} guests")
             
@@ -203,7 +265,7 @@ def admin_menu_page():
         
         with col2:
             st.subheader(":material/dinner_dining: Main Courses")
-            main_counts = attending_df['main_choice'].value_counts()
+            main_counts = choice_counts('main_choice')
             for main, count in main_counts.items():
                 st.write(f"**{main}:** {count} guests")
             
@@ -213,7 +275,7 @@ def admin_menu_page():
         
         with col3:
             st.subheader(":material/cake: Desserts")
-            dessert_counts = attending_df['dessert_choice'].value_counts()
+            dessert_counts = choice_counts('dessert_choice')
             for dessert, count in dessert_counts.items():
                 st.write(f"**{dessert}:** {count} guests")
             
@@ -223,18 +285,35 @@ def admin_menu_page():
         
         # Dietary requirements
         st.subheader(":material/health_and_safety: Dietary Requirements & Allergies")
-        dietary_df = attending_df[attending_df['dietary_requirements'].notna() & 
-                                (attending_df['dietary_requirements'] != '')]
+        dietary_notes = totals['dietary']
         
-        if not dietary_df.empty:
-            for _, row in dietary_df.iterrows():
-                guest_name = f"{row.get('guest_first_name', '')} {row.get('guest_last_name', '')}".strip()
-                st.write(f"**{guest_name}:** {row['dietary_requirements']}")
+        if dietary_notes:
+            for note in dietary_notes:
+                st.write(f"**{note['guest_name']}:** {note['dietary_requirements']}")
         else:
             st.write("No special dietary requirements reported.")
     else:
-        st.info("No attending guests yet to display menu planning data.")
+        st.info(":material/inbox: No attending guests yet to display menu planning data.")
+
+def editor_changes(row_ids, editor_state):
+    """Translate st.data_editor edits (by row position) into row-ID keyed patches
+
+    row_ids are the IDs of the rows in the order the editor displayed them.
+    """
+    updates = {}
+    for position, changes in editor_state.get('edited_rows', {}).items():
+        updates[row_ids[int(position)]] = changes
+
+    added = []
+    for row in editor_state.get('added_rows', []):
+        row = {column: value for column, value in row.items() if not column.startswith('_index')}
+        if row:
+            added.append(row)
+
+    deleted = [row_ids[int(position)] for position in editor_state.get('deleted_rows', [])]
+    return updates, added, deleted
 
+@timed
 def admin_data_page():
     """Admin detailed data page"""
     if not st.session_state.authenticated:
@@ -246,33 +325,44 @@ def admin_data_page():
     
     st.title(":material/description: Detailed Data")
     
+    # Give rows saved before row IDs existed a stable ID (one-time migration)
+    ensure_rsvp_ids()
+
     # Load data
     df = load_rsvps()
     
     if not df.empty:
-        # Export functionality
+        # Imported here: exports loads pyarrow, which only this page needs
+        from exports import EXPORT_FORMATS, available_formats
+
+        # Export functionality (files are only built when a button is clicked)
         st.write("**:material/download: Export Data**")
+        formats = available_formats()
+        export_format = st.selectbox(
+            "Export format",
+            formats,
+            format_func=lambda fmt: EXPORT_FORMATS[fmt][0],
+            key="export_format"
+        )
+        format_label, extension, mime = EXPORT_FORMATS[export_format]
         col1, col2 = st.columns(2)
         
         with col1:
-            csv = df.to_csv(index=False)
             st.download_button(
-                label=":material/description: Download All Data (CSV)",
-                data=csv,
-                file_name=f"wedding_rsvps_all_{datetime.now().strftime('%Y%m%d')}.csv",
-                mime="text/csv"
+                label=f":material/description: Download All Data ({format_label})",
+                data=lambda: get_rsvp_export(False, export_format),
+                file_name=f"wedding_rsvps_all_{datetime.now().strftime('%Y%m%d')}.{extension}",
+                mime=mime
             )
         
         with col2:
             # Export only attending guests
-            attending_df = df[df['attending'] == 'Yes']
-            if not attending_df.empty:
-                attending_csv = attending_df.to_csv(index=False)
+            if get_rsvp_summary()['total_guests'] > 0:
                 st.download_button(
-                    label=":material/check_circle: Download Attending Only (CSV)",
-                    data=attending_csv,
-                    file_name=f"wedding_rsvps_attending_{datetime.now().strftime('%Y%m%d')}.csv",
-                    mime="text/csv"
+                    label=f":material/check_circle: Download Attending Only ({format_label})",
+                    data=lambda: get_rsvp_export(True, export_format),
+                    file_name=f"wedding_rsvps_attending_{datetime.now().strftime('%Y%m%d')}.{extension}",
+                    mime=mime
                 )
         
         # Search and filter
@@ -281,19 +371,28 @@ def admin_data_page():
         
         filtered_df = df
         if search_term:
-            filtered_df = df[
-                df['contact_name'].str.contains(search_term, case=False, na=False) |
-                df['guest_first_name'].str.contains(search_term, case=False, na=False) |
-                df['guest_last_name'].str.contains(search_term, case=False, na=False)
-            ]
+            filtered_df = search_rsvps(search_term)
+            if filtered_df.attrs.get('fuzzy'):
+                st.caption(":material/spellcheck: No exact matches - showing close matches instead.")
         
         # Display data table
         st.write("**:material/table_view: Complete RSVP Data**")
         if not filtered_df.empty:
-            edited_df = st.data_editor(
+            # Edits are positions in the rows the user saw, which may have been
+            # a different table (new RSVPs, another search) than this run loaded
+            displayed_row_ids = st.session_state.get('rsvp_editor_row_ids')
+            st.session_state.rsvp_editor_row_ids = filtered_df['rsvp_id'].tolist()
+            if displayed_row_ids is None:
+                displayed_row_ids = st.session_state.rsvp_editor_row_ids
+
+            st.data_editor(
                 filtered_df,
                 width="content",
+                num_rows="dynamic",
+                key="rsvp_editor",
                 column_config={
+                    "rsvp_id": None,  # Stable row ID, hidden from the editor
+                    "party_id": None,  # Submission the row belongs to, hidden too
                     "timestamp": "Submitted",
                     "contact_name": "Contact",
                     "contact_email": "Email",
@@ -313,18 +412,89 @@ def admin_data_page():
 
             # Save button to persist changes
             if st.button(":material/save: Save Changes", type="primary"):
-                # Update the original dataframe with edited values
-                if search_term:
-                    # If filtered, update only the filtered rows in the original df
-                    df.update(edited_df)
+                # Only the edited, added and deleted rows are written, keyed by row ID
+                updates, added, deleted = editor_changes(displayed_row_ids, st.session_state.rsvp_editor)
+                if updates or added or deleted:
+                    apply_rsvp_edits(updates, added, deleted)
+                    st.success(":material/check_circle: Changes saved successfully!")
+                    st.rerun()
                 else:
-                    # If not filtered, replace the entire dataframe
-                    df = edited_df
-
-                save_rsvps(df)
-                st.success(":material/check_circle: Changes saved successfully!")
-                st.rerun()
+                    st.info(":material/info: There are no changes to save.")
         else:
             st.write("No data matches your search criteria.")
     else:
-        st.info(":material/inbox: No RSVPs have been submitted yet.")
\ No newline at end of file
+        st.info(":material/inbox: No RSVPs have been submitted yet.")
+
+def _format_bytes(value):
+    """Format a byte count for the performance table"""
+    if value is None:
+        return "-"
+    for unit in ("B", "KB", "MB"):
+        if value < 1024:
+            return f"{value:.0f} {unit}" if unit == "B" else f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} GB"
+
+@timed
+def admin_performance_page():
+    """Admin performance page"""
+    if not st.session_state.authenticated:
+        st.error(":material/lock: Please log in to access this page.")
+        st.stop()
+
+    # Imported here so the login page does not load pandas
+    import pandas as pd
+
+    st.title(":material/speed: Performance")
+    st.write(
+        f"Latency of the app's main operations in this process, over the last {perf.SAMPLES_PER_OPERATION} "
+        "calls of each. Calls and bytes are counted since the app started."
+    )
+
+    operations = perf.snapshot()
+    if not operations:
+        st.info(":material/hourglass_empty: No operations have been timed yet.")
+        return
+
+    st.dataframe(
+        pd.DataFrame([
+            {
+                "Operation": op['operation'],
+                "Calls": op['calls'],
+                "Errors": op['errors'],
+                "p50 (ms)": op['p50_ms'],
+                "p95 (ms)": op['p95_ms'],
+                "p99 (ms)": op['p99_ms'],
+                "Max (ms)": op['max_ms'],
+                "Read": _format_bytes(op['bytes_read']),
+                "Written": _format_bytes(op['bytes_written']),
+            }
+            for op in operations
+        ]),
+        hide_index=True,
+        column_config={
+            column: st.column_config.NumberColumn(format="%.1f")
+            for column in ("p50 (ms)", "p95 (ms)", "p99 (ms)", "Max (ms)")
+        }
+    )
+    st.caption(
+        "Bytes are the file and database I/O of the thread running each operation; "
+        "rsvp_commit is the background writer committing queued submissions."
+    )
+
+    col1, col2 = st.columns([1, 4])
+    with col1:
+        st.download_button(
+            ":material/download: Prometheus metrics",
+            data=perf.prometheus_text(),
+            file_name="rsvp_metrics.prom",
+            mime="text/plain"
+        )
+    with col2:
+        if st.button(":material/restart_alt: Reset"):
+            perf.reset()
+            st.rerun()
+
+    prometheus_file = get_config().metrics.prometheus_file
+    if prometheus_file:
+        st.caption(f"Also written to {prometheus_file} every {perf.PROMETHEUS_EXPORT_SECONDS} seconds.")
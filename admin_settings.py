@@ -3,6 +3,12 @@ import toml
 import os
 from datetime import datetime
 
+from atomic_file import atomic_write
+from config import parse_config, reload_config, ConfigError
+from perf import timed
+from static_files import font_face_problems
+
+@timed
 def admin_settings_page():
     """Admin settings page for editing secrets.toml"""
     if not st.session_state.get('authenticated', False):
@@ -12,7 +18,11 @@ def admin_settings_page():
     main_col1, main_col2, main_col3 = st.columns([1, 4, 1])
     with main_col2:
         st.title(":material/settings: Settings Configuration")
-        st.info(":material/info: Edit your secrets.toml configuration below. Changes require app restart to take effect.")
+        st.info(":material/info: Edit your secrets.toml configuration below. Saved changes take effect immediately, without restarting the app.")
+
+        # Theme fonts are configured in config.toml; uncompressed ones slow down the first page load
+        for problem in font_face_problems():
+            st.warning(f":material/font_download: {problem}")
 
         # Path to secrets file
         secrets_path = os.path.join(".streamlit", "secrets.toml")
@@ -141,6 +151,15 @@ def admin_settings_page():
         col1, col2, col3 = st.columns([1, 1, 4])
         with col1:
             if st.button(":material/save: Save Changes", type="primary", use_container_width=True):
+                try:
+                    # Refuse to save a configuration the app could not run with
+                    parse_config(secrets)
+                except ConfigError as e:
+                    st.error(":material/error: Settings not saved, please fix the following:")
+                    for problem in e.problems:
+                        st.error(f"• {problem}")
+                    st.stop()
+
                 try:
                     # Create backup
                     backup_path = secrets_path + f".backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
@@ -149,12 +168,15 @@ def admin_settings_page():
                     with open(backup_path, 'w') as f:
                         f.write(backup_content)
 
-                    # Write updated secrets
-                    with open(secrets_path, 'w') as f:
+                    # Write updated secrets atomically, so the file watcher never sees a partial file
+                    with atomic_write(secrets_path) as f:
                         toml.dump(secrets, f)
 
-                    st.success(f":material/check_circle: Settings saved! Backup created at {backup_path}")
-                    st.info(":material/restart_alt: **Important:** Restart the Streamlit app for changes to take effect.")
+                    # Swap in the new configuration for every session
+                    config = reload_config()
+
+                    st.success(f":material/check_circle: Settings saved and applied! Backup created at {backup_path}")
+                    st.caption(f"Configuration version {config.version} is now live.")
 
                     # Clear the edited state
                     if 'edited_secrets' in st.session_state:
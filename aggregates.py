@@ -0,0 +1,171 @@
+"""Running menu-choice totals kept next to the RSVP data.
+
+Counts per starter/main/dessert option and the list of dietary notes for
+attending guests are updated by the storage layer on every commit and
+persisted in the derived-data database (see sidecar.py), so the menu
+planning page never has to recount the full table.
+"""
+import collections
+
+import pandas as pd
+
+MENU_COLUMNS = ["starter_choice", "main_choice", "dessert_choice"]
+
+# Tables of the totals in the derived-data database
+SIDECAR_TABLES = [
+    "CREATE TABLE IF NOT EXISTS menu_counts ("
+    "course TEXT NOT NULL, choice TEXT NOT NULL, count INTEGER NOT NULL, PRIMARY KEY (course, choice))",
+    "CREATE TABLE IF NOT EXISTS menu_dietary ("
+    "id INTEGER PRIMARY KEY, guest_name TEXT NOT NULL, dietary_requirements TEXT NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS idx_menu_dietary_note ON menu_dietary (guest_name, dietary_requirements)",
+]
+
+# The attending guest count is stored as the count of this (course, choice)
+_GUESTS = ("attending", "Yes")
+
+# The only columns a recount needs to read
+RECOUNT_COLUMNS = ["attending"] + MENU_COLUMNS + ["guest_first_name", "guest_last_name", "dietary_requirements"]
+
+def _text(value):
+    """Return a stripped string, or '' for missing values"""
+    if value is None:
+        return ''
+    try:
+        if pd.isna(value):
+            return ''
+    except (TypeError, ValueError):
+        pass
+    return str(value).strip()
+
+def empty_aggregates():
+    """Aggregates for a table with no attending guests"""
+    return {
+        'total_guests': 0,
+        'counts': {column: {} for column in MENU_COLUMNS},
+        'dietary': []
+    }
+
+def _dietary_note(row):
+    """(guest name, dietary requirements) of a row, or None if it has no dietary notes"""
+    dietary = _text(row.get('dietary_requirements'))
+    if not dietary:
+        return None
+    guest_name = f"{_text(row.get('guest_first_name'))} {_text(row.get('guest_last_name'))}".strip()
+    return guest_name, dietary
+
+def apply_rows(conn, rows, removed_rows=()):
+    """Fold committed rows into the stored totals, taking out the rows they replaced
+
+    Only the counts that change are written: a commit updates a handful of
+    rows of the sidecar whatever the size of the table.
+    """
+    deltas = collections.Counter()
+    notes = {-1: [], 1: []}
+    for sign, changed_rows in ((-1, removed_rows), (1, rows)):
+        for row in changed_rows:
+            if _text(row.get('attending')) != 'Yes':
+                continue
+            deltas[_GUESTS] += sign
+            for column in MENU_COLUMNS:
+                choice = _text(row.get(column))
+                if choice:
+                    deltas[(column, choice)] += sign
+            note = _dietary_note(row)
+            if note:
+                notes[sign].append(note)
+
+    # Notes of guests an edit left unchanged stay where they are
+    for note in list(notes[-1]):
+        if note in notes[1]:
+            notes[-1].remove(note)
+            notes[1].remove(note)
+
+    changed = [(column, choice, delta) for (column, choice), delta in deltas.items() if delta]
+    if changed:
+        conn.executemany(
+            "INSERT INTO menu_counts (course, choice, count) VALUES (?, ?, ?) "
+            "ON CONFLICT (course, choice) DO UPDATE SET count = count + excluded.count",
+            changed
+        )
+        conn.execute("DELETE FROM menu_counts WHERE count <= 0")
+    for note in notes[-1]:
+        conn.execute(
+            "DELETE FROM menu_dietary WHERE id = ("
+            "SELECT id FROM menu_dietary WHERE guest_name = ? AND dietary_requirements = ? LIMIT 1)",
+            note
+        )
+    conn.executemany("INSERT INTO menu_dietary (guest_name, dietary_requirements) VALUES (?, ?)", notes[1])
+
+def save(conn, aggregates):
+    """Replace the stored totals, e.g. with a recount"""
+    conn.execute("DELETE FROM menu_counts")
+    conn.execute("DELETE FROM menu_dietary")
+    counts = [_GUESTS + (aggregates['total_guests'],)] if aggregates['total_guests'] else []
+    for column, column_counts in aggregates['counts'].items():
+        counts.extend((column, choice, count) for choice, count in column_counts.items())
+    conn.executemany("INSERT INTO menu_counts (course, choice, count) VALUES (?, ?, ?)", counts)
+    conn.executemany(
+        "INSERT INTO menu_dietary (guest_name, dietary_requirements) VALUES (?, ?)",
+        [(note['guest_name'], note['dietary_requirements']) for note in aggregates['dietary']]
+    )
+
+def load(conn):
+    """Read the stored totals in the form returned by recount()"""
+    aggregates = empty_aggregates()
+    for column, choice, count in conn.execute("SELECT course, choice, count FROM menu_counts ORDER BY rowid"):
+        if (column, choice) == _GUESTS:
+            aggregates['total_guests'] = count
+        else:
+            aggregates['counts'].setdefault(column, {})[choice] = count
+    aggregates['dietary'] = [
+        {'guest_name': guest_name, 'dietary_requirements': dietary}
+        for guest_name, dietary in conn.execute(
+            "SELECT guest_name, dietary_requirements FROM menu_dietary ORDER BY id"
+        )
+    ]
+    return aggregates
+
+def recount(df):
+    """Compute the aggregates from scratch from a full RSVP frame"""
+    aggregates = empty_aggregates()
+    if df.empty or 'attending' not in df.columns:
+        return aggregates
+
+    attending_df = df[df['attending'] == 'Yes']
+    aggregates['total_guests'] = len(attending_df)
+
+    for column in MENU_COLUMNS:
+        if column in attending_df.columns:
+            # Plain objects, so categorical columns do not report unused choices
+            choices = attending_df[column].astype(object).map(_text)
+            counts = choices[choices != ''].value_counts()
+            aggregates['counts'][column] = {str(k): int(v) for k, v in counts.items()}
+
+    if 'dietary_requirements' in attending_df.columns:
+        dietary = attending_df['dietary_requirements'].astype(object).map(_text)
+        columns = [c for c in ('guest_first_name', 'guest_last_name', 'dietary_requirements') if c in df.columns]
+        for row in attending_df.loc[dietary != '', columns].to_dict('records'):
+            guest_name, requirements = _dietary_note(row)
+            aggregates['dietary'].append({'guest_name': guest_name, 'dietary_requirements': requirements})
+    return aggregates
+
+def compare(aggregates, expected):
+    """Return human-readable differences between two aggregate dicts"""
+    problems = []
+    if aggregates.get('total_guests') != expected['total_guests']:
+        problems.append(
+            f"total_guests: stored {aggregates.get('total_guests')}, recount {expected['total_guests']}"
+        )
+    for column in MENU_COLUMNS:
+        stored = aggregates.get('counts', {}).get(column, {})
+        actual = expected['counts'][column]
+        for choice in sorted(set(stored) | set(actual)):
+            if stored.get(choice, 0) != actual.get(choice, 0):
+                problems.append(
+                    f"{column} '{choice}': stored {stored.get(choice, 0)}, recount {actual.get(choice, 0)}"
+                )
+    stored_dietary = sorted((d['guest_name'], d['dietary_requirements']) for d in aggregates.get('dietary', []))
+    actual_dietary = sorted((d['guest_name'], d['dietary_requirements']) for d in expected['dietary'])
+    if stored_dietary != actual_dietary:
+        problems.append("dietary notes differ from recount")
+    return problems
@@ -1,109 +1,82 @@
 import streamlit as st
-from datetime import datetime, timedelta
+import time
+from datetime import datetime
 
-# Import admin functions
-from admin import admin_login_page, admin_summary_page, admin_menu_page, admin_data_page
-from admin_settings import admin_settings_page
+# Validated configuration snapshot
+from config import get_config, ConfigError
 
-# Import event info page
-from event_info import event_info_page
+# Resized banner image variants
+from image_assets import image_url, BANNER_IMAGE_WIDTH
+
+# Per-session RSVP form state
+from form_state import get_form, MAX_GUESTS
+
+# Per-session and per-address submission limits
+from rate_limit import admit, describe_wait
+
+# Timing of hot paths for the admin Performance page
+from perf import timed, start_prometheus_export
 
 # Import shared utilities
 from utils import (
-    save_rsvp, get_deadline_datetime, is_past_deadline,
+    queue_rsvp_batch, find_earlier_rsvp, get_deadline_state, get_deadline_datetime, is_past_deadline,
     is_within_grace_period, is_within_warning_period, get_time_until_deadline,
     format_time_remaining
 )
 
+# Check secrets.toml before rendering anything, listing every problem at once
+try:
+    config = get_config()
+except ConfigError as e:
+    st.error(":material/error: **The configuration in secrets.toml is invalid:**")
+    st.markdown("\n".join(f"- {problem}" for problem in e.problems))
+    st.stop()
+
+# Write timing metrics for Prometheus if [metrics] prometheus_file is set
+start_prometheus_export()
+
 # Configure the page
 st.set_page_config(
-    page_title=st.secrets["wedding"]["page_title"],
-    page_icon=st.secrets["wedding"]["page_icon"],
+    page_title=config.wedding.page_title,
+    page_icon=config.wedding.page_icon,
     initial_sidebar_state="collapsed",
     layout="wide"
 )
 
 # Constants
-MAX_GUESTS_FOR_CLEANUP = 20  # Maximum number of guests to clear from session state
 COLUMN_RATIO_HEADER = [2.5, 1]  # Column ratio for header layout
 COLUMN_RATIO_CONTACT = [3, 4, 2]  # Column ratio for contact information
 COLUMN_RATIO_GUEST = [3, 1]  # Column ratio for guest details
 COLUMN_RATIO_MENU = [1.2, 1.8, 1.1]  # Column ratio for menu selections
 
-# Menu options
-STARTERS = st.secrets["menu"]["starters"]
-MAINS = st.secrets["menu"]["mains"]
-DESSERTS = st.secrets["menu"]["desserts"]
-
 def initialize_session_state():
-    """Initialize session state variables"""
-    defaults = {
-        'guests': [{}],
-        'form_submitted': False,
-        'submission_in_progress': False,
-        'authenticated': False,
-        'form_data': {}
-    }
-
-    for key, value in defaults.items():
-        if key not in st.session_state:
-            st.session_state[key] = value
-
-def add_guest():
-    """Add a new guest to the session state"""
-    if not st.session_state.submission_in_progress:
-        st.session_state.guests.append({})
-
-def remove_guest(index):
-    """Remove a guest from the session state"""
-    if len(st.session_state.guests) > 1 and not st.session_state.submission_in_progress:
-        st.session_state.guests.pop(index)
-
-def reset_form():
-    """Reset the form after submission"""
-    # Reset main form state
-    form_state_reset = {
-        'guests': [{}],
-        'form_submitted': False,
-        'submission_in_progress': False,
-        'form_data': {}
-    }
-
-    for key, value in form_state_reset.items():
-        st.session_state[key] = value
-
-    # Clear form fields
-    form_keys = ["attending", "contact_name", "contact_email", "contact_phone", "comments"]
-
-    # Add guest-specific fields
-    for i in range(MAX_GUESTS_FOR_CLEANUP):
-        form_keys.extend([
-            f"guest_first_name_{i}", f"guest_last_name_{i}",
-            f"starter_{i}", f"main_{i}", f"dessert_{i}", f"dietary_{i}"
-        ])
-
-    # Remove the keys from session state
-    for key in form_keys:
-        st.session_state.pop(key, None)
-
-def process_submission():
+    """Initialize session state variables (the RSVP form keeps its own, see form_state.py)"""
+    if 'authenticated' not in st.session_state:
+        st.session_state.authenticated = False
+
+@timed
+def process_submission(deadline_state=None):
     """Process the RSVP submission"""
-    form_data = st.session_state.form_data
+    form = get_form()
+    form_data = form.form_data
+
+    if deadline_state is None:
+        deadline_state = get_deadline_state()
 
     # Check deadline enforcement first
-    if is_past_deadline() and not is_within_grace_period():
+    if is_past_deadline(deadline_state) and not is_within_grace_period(deadline_state):
         st.error(":material/block: RSVP deadline has passed. Submissions are no longer accepted.")
         st.info("Please contact the wedding couple directly if you need to make changes to your RSVP.")
-        st.session_state.submission_in_progress = False
+        form.submission_in_progress = False
         return False
 
     # Show warning if in grace period
-    if is_within_grace_period():
+    if is_within_grace_period(deadline_state):
         st.warning(":material/timer: Submitting during grace period - deadline has passed but submissions are still being accepted.")
 
     # Show urgency warning if within warning period
-    if is_within_warning_period():
-        time_remaining = get_time_until_deadline()
+    if is_within_warning_period(deadline_state):
+        time_remaining = get_time_until_deadline(deadline_state)
         formatted_time = format_time_remaining(time_remaining)
         st.warning(f":material/schedule: Submitting close to deadline - {formatted_time} remaining!")
 
@@ -114,7 +87,7 @@ def process_submission():
         errors.append("Primary contact name is required")
     
     if form_data.get('attending') == "Yes, I/we will attend":
-        for i, _ in enumerate(st.session_state.guests):
+        for i, _ in enumerate(form.guests):
             guest_first_name = form_data.get(f"guest_first_name_{i}", "")
             guest_last_name = form_data.get(f"guest_last_name_{i}", "")
             starter = form_data.get(f"starter_{i}", "")
@@ -138,17 +111,29 @@ def process_submission():
             st.error(f"• {error}")
         
         # Reset submission state on error
-        st.session_state.submission_in_progress = False
+        form.submission_in_progress = False
+        return False
+
+    # Bots and stuck clients are slowed down before anything is written
+    wait = admit("rsvp")
+    if wait:
+        form.retry_at = time.time() + wait
+        form.submission_in_progress = False
         return False
     
     # Prepare data for saving
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    # The form's idempotency token groups this submission's guest rows, so
+    # submitting the same form again replaces the party instead of adding it twice
+    party_id = form.submission_id
     
     try:
         if form_data.get('attending') == "Yes, I/we will attend":
-            # Save each guest as a separate row
-            for i, _ in enumerate(st.session_state.guests):
-                rsvp_data = {
+            # One row per guest, committed together
+            rows = []
+            for i, _ in enumerate(form.guests):
+                rows.append({
+                    "party_id": party_id,
                     "timestamp": timestamp,
                     "contact_name": form_data.get('contact_name', '').strip(),
                     "contact_email": form_data.get('contact_email', '').strip(),
@@ -161,11 +146,11 @@ def process_submission():
                     "dessert_choice": form_data.get(f"dessert_{i}", "").strip(),
                     "dietary_requirements": form_data.get(f"dietary_{i}", "").strip(),
                     "comments": form_data.get('comments', '').strip()
-                }
-                save_rsvp(rsvp_data)
+                })
         else:
-            # Save single "not attending" entry
-            rsvp_data = {
+            # Single "not attending" entry
+            rows = [{
+                "party_id": party_id,
                 "timestamp": timestamp,
                 "contact_name": form_data.get('contact_name', '').strip(),
                 "contact_email": form_data.get('contact_email', '').strip(),
@@ -178,44 +163,141 @@ def process_submission():
                 "dessert_choice": "",
                 "dietary_requirements": "",
                 "comments": form_data.get('comments', '').strip()
-            }
-            save_rsvp(rsvp_data)
+            }]
+
+        # A resubmission by the same contact replaces their earlier RSVP when committed;
+        # while the writer is busy this is unknown and the plain confirmation is shown
+        form.updated_earlier = find_earlier_rsvp(rows[0]["contact_name"], rows[0]["contact_email"]) is True
+
+        # Durably queued; the background writer commits it to storage
+        queue_rsvp_batch(rows)
         
         # Mark as successfully submitted
-        st.session_state.form_submitted = True
-        st.session_state.submission_in_progress = False
+        form.form_submitted = True
+        form.submission_in_progress = False
         return True
         
     except Exception as e:
         st.error(f"An error occurred while saving your RSVP: {str(e)}")
-        st.session_state.submission_in_progress = False
+        form.submission_in_progress = False
         return False
 
+@st.fragment
+def guest_list(menu):
+    """All guest blocks and the Add/Remove guest buttons
+
+    The buttons belong to this fragment and change the form in their
+    callbacks, so adding or removing a guest reruns only this list.
+    """
+    form = get_form()
+    for i, guest_id in enumerate(form.guests):
+        with st.container(border=True):
+            title_col, remove_col = st.columns(COLUMN_RATIO_GUEST)
+            with title_col:
+                st.markdown(f"**Guest {i + 1}**")
+            with remove_col:
+                if i > 0:  # Don't show remove button for first guest
+                    st.button(
+                        "Remove", key=form.key("remove", guest_id),
+                        on_click=form.remove_guest, args=(guest_id,)
+                    )
+            guest_block(guest_id, menu)
+
+    # Add guest button
+    st.button(
+        "**Add Another Guest**", icon=":material/add:", on_click=form.add_guest,
+        disabled=len(form.guests) >= MAX_GUESTS,
+        help=f"Up to {MAX_GUESTS} guests can be included in one RSVP" if len(form.guests) >= MAX_GUESTS else None
+    )
+
+@st.fragment
+def guest_block(guest_id, menu):
+    """One guest's name, menu and dietary fields (editing them reruns only this block)
+
+    Widget keys use the guest's stable id, so removing an earlier guest
+    does not shift anyone's answers.
+    """
+    form = get_form()
+    # Names take the same width as the guest title above them
+    guest_col1, _ = st.columns(COLUMN_RATIO_GUEST)
+
+    with guest_col1:
+        name_col1, name_col2 = st.columns(2)
+        with name_col1:
+            st.text_input(
+                f"First Name*",
+                key=form.key("guest_first_name", guest_id),
+                placeholder="First name"
+            )
+        with name_col2:
+            st.text_input(
+                f"Last Name*",
+                key=form.key("guest_last_name", guest_id),
+                placeholder="Last name"
+            )
+
+    # Menu selections
+    menu_col1, menu_col2, menu_col3 = st.columns(COLUMN_RATIO_MENU)
+
+    with menu_col1:
+        st.selectbox(
+            "Starter Choice*",
+            [""] + list(menu.starters),
+            key=form.key("starter", guest_id),
+            index=0
+        )
+
+    with menu_col2:
+        st.selectbox(
+            "Main Course*",
+            [""] + list(menu.mains),
+            key=form.key("main", guest_id),
+            index=0
+        )
+
+    with menu_col3:
+        st.selectbox(
+            "Dessert Choice*",
+            [""] + list(menu.desserts),
+            key=form.key("dessert", guest_id),
+            index=0
+        )
+
+    # Dietary requirements
+    st.text_area(
+        "Dietary Requirements/Allergies",
+        key=form.key("dietary", guest_id),
+        placeholder="Please list any allergies or dietary requirements",
+        height=60
+    )
+
 def rsvp_form_page():
     """Main RSVP form page"""
     # Create 3-column layout with 2,5,2 ratio - left and right are spacers
     left_spacer, main_col, right_spacer = st.columns([1, 3, 1])
+    config = get_config()
 
     with main_col:
         col1, col2 = st.columns(COLUMN_RATIO_HEADER)
         with col1:
-            st.header(f"{st.secrets['wedding']['wedding_couple']} Wedding RSVP")
-            st.write(st.secrets["welcome"]["message"])
+            st.header(f"{config.wedding.wedding_couple} Wedding RSVP")
+            st.write(config.wedding.welcome_message)
             st.write("Please provide below the details for each guest attending (view the full menu on the [**Event Information**](/event_info_page) page).")
             # Check deadline status and display countdown/warning
-            deadline = get_deadline_datetime()
+            deadline_state = get_deadline_state()
+            deadline = get_deadline_datetime(deadline_state)
             if deadline:
-                if is_past_deadline():
-                    if is_within_grace_period():
+                if is_past_deadline(deadline_state):
+                    if is_within_grace_period(deadline_state):
                         st.error(":material/schedule: RSVP deadline has passed, but submissions are still being accepted for a limited time.")
-                        grace_end = deadline + timedelta(hours=st.secrets["deadline"].get("grace_period_hours", 24))
+                        grace_end = deadline_state.grace_end
                         st.warning(f":material/timer: Grace period ends: {grace_end.strftime('%B %d, %Y at %I:%M %p %Z')}")
                     else:
                         st.error(":material/block: RSVP deadline has passed. New submissions are no longer accepted.")
                         st.info("Please contact the wedding couple directly if you need to make changes to your RSVP.")
                         return  # Stop rendering the form
-                elif is_within_warning_period():
-                    time_remaining = get_time_until_deadline()
+                elif is_within_warning_period(deadline_state):
+                    time_remaining = get_time_until_deadline(deadline_state)
                     formatted_time = format_time_remaining(time_remaining)
 
                     st.warning(f":material/schedule: **RSVP Deadline Approaching!**")
@@ -238,21 +320,25 @@ def rsvp_form_page():
                         """, unsafe_allow_html=True)
                 else:
                     # Show normal deadline info
-                    time_remaining = get_time_until_deadline()
+                    time_remaining = get_time_until_deadline(deadline_state)
                     formatted_time = format_time_remaining(time_remaining)
                     st.info(f":material/schedule: **RSVP Deadline**:  {deadline.strftime('%B %d, %Y at %I:%M %p')} ({formatted_time} remaining)")
 
         with col2:
-            if st.secrets['wedding'].get('banner_image'):
-                st.image(st.secrets['wedding']['banner_image'])
+            if config.wedding.banner_image:
+                st.image(image_url(config.wedding.banner_image, BANNER_IMAGE_WIDTH))
         st.markdown("---")
 
         # Initialize session state
         initialize_session_state()
+        form = get_form()
 
         # Check if form has been successfully submitted
-        if st.session_state.form_submitted:
-            st.success(":material/check_circle: RSVP submitted successfully! Thank you for your response.")
+        if form.form_submitted:
+            if form.updated_earlier:
+                st.success(":material/check_circle: RSVP updated successfully! Your new response replaces the one you sent earlier.")
+            else:
+                st.success(":material/check_circle: RSVP submitted successfully! Thank you for your response.")
             st.balloons()
 
             # if st.button("Submit Another RSVP", type="primary"):
@@ -263,10 +349,10 @@ def rsvp_form_page():
             return
 
         # Check if submission is in progress
-        if st.session_state.submission_in_progress:
+        if form.submission_in_progress:
             st.info(":material/refresh: Processing your RSVP submission...")
             with st.spinner("Please wait..."):
-                if process_submission():
+                if process_submission(deadline_state):
                     st.rerun()
                 else:
                     st.rerun()
@@ -278,7 +364,7 @@ def rsvp_form_page():
             attending = st.radio(
                 "**Will you be attending our wedding?**",
                 ["Yes, I/we will attend", "No, I/we cannot attend"],
-                key="attending", horizontal=True, label_visibility="collapsed"
+                key=form.key("attending"), horizontal=True, label_visibility="collapsed"
             )
 
         # Contact Information
@@ -286,99 +372,39 @@ def rsvp_form_page():
             st.markdown("**Contact Information**")
             contact_col1, contact_col2, contact_col3 = st.columns(COLUMN_RATIO_CONTACT)
             with contact_col1:
-                contact_name = st.text_input("Primary Contact Name*", key="contact_name", width=300)
+                contact_name = st.text_input("Primary Contact Name*", key=form.key("contact_name"), width=300)
             with contact_col2:
-                contact_email = st.text_input("Email Address", key="contact_email", width=350)
+                contact_email = st.text_input("Email Address", key=form.key("contact_email"), width=350)
             with contact_col3:
-                contact_phone = st.text_input("Phone Number", key="contact_phone", width=200)
+                contact_phone = st.text_input("Phone Number", key=form.key("contact_phone"), width=200)
 
         if attending == "Yes, I/we will attend":
             st.markdown("**Guest Details & Menu Choices**")
             st.write("Please provide details for each guest attending (view the full menu on the [**Event Information**](/event_info_page) page):")
 
-            # Display guests
-            for i, _ in enumerate(st.session_state.guests):
-                with st.container(border=True):
-                    st.markdown(f"**Guest {i + 1}**")
-
-                    # Create columns for guest details
-                    guest_col1, guest_col2 = st.columns(COLUMN_RATIO_GUEST)
-
-                    with guest_col1:
-                        name_col1, name_col2 = st.columns(2)
-                        with name_col1:
-                            st.text_input(
-                                f"First Name*",
-                                key=f"guest_first_name_{i}",
-                                placeholder="First name"
-                            )
-                        with name_col2:
-                            st.text_input(
-                                f"Last Name*",
-                                key=f"guest_last_name_{i}",
-                                placeholder="Last name"
-                            )
-
-                    with guest_col2:
-                        if i > 0:  # Don't show remove button for first guest
-                            if st.button(f"Remove", key=f"remove_{i}"):
-                                remove_guest(i)
-                                st.rerun()
-
-                    # Menu selections
-                    menu_col1, menu_col2, menu_col3 = st.columns(COLUMN_RATIO_MENU)
-
-                    with menu_col1:
-                        st.selectbox(
-                            "Starter Choice*",
-                            [""] + STARTERS,
-                            key=f"starter_{i}",
-                            index=0
-                        )
-
-                    with menu_col2:
-                        st.selectbox(
-                            "Main Course*",
-                            [""] + MAINS,
-                            key=f"main_{i}",
-                            index=0
-                        )
-
-                    with menu_col3:
-                        st.selectbox(
-                            "Dessert Choice*",
-                            [""] + DESSERTS,
-                            key=f"dessert_{i}",
-                            index=0
-                        )
-
-                    # Dietary requirements
-                    st.text_area(
-                        "Dietary Requirements/Allergies",
-                        key=f"dietary_{i}",
-                        placeholder="Please list any allergies or dietary requirements",
-                        height=60
-                    )
-
-
-            # Add guest button
-            if st.button("**Add Another Guest**", icon=":material/add:"):
-                add_guest()
-                st.rerun()
+            # Each guest block is a fragment, so editing it reruns only that block
+            guest_list(config.menu)
 
         # Additional comments
         with st.container(border=True):
             st.markdown("**Additional Comments**")
             comments = st.text_area(
                 "Any additional comments or special requests:",
-                key="comments",
+                key=form.key("comments"),
                 height=100
             )
 
+        # Shown after process_submission turned away a rate-limited submission
+        if form.retry_at > time.time():
+            st.warning(
+                ":material/hourglass_top: We have received several submissions from your connection in a short time. "
+                f"Please wait {describe_wait(form.retry_at - time.time())} and then submit your RSVP again."
+            )
+
         # Submit button
         if st.button("Submit RSVP", type="primary", width="content"):
-            # Store form data in session state before processing
-            st.session_state.form_data = {
+            # Store form data before processing
+            form.form_data = {
                 'attending': attending,
                 'contact_name': contact_name,
                 'contact_email': contact_email,
@@ -386,19 +412,53 @@ def rsvp_form_page():
                 'comments': comments
             }
 
-            # Store guest data
-            for i, _ in enumerate(st.session_state.guests):
-                st.session_state.form_data[f"guest_first_name_{i}"] = st.session_state.get(f"guest_first_name_{i}", "")
-                st.session_state.form_data[f"guest_last_name_{i}"] = st.session_state.get(f"guest_last_name_{i}", "")
-                st.session_state.form_data[f"starter_{i}"] = st.session_state.get(f"starter_{i}", "")
-                st.session_state.form_data[f"main_{i}"] = st.session_state.get(f"main_{i}", "")
-                st.session_state.form_data[f"dessert_{i}"] = st.session_state.get(f"dessert_{i}", "")
-                st.session_state.form_data[f"dietary_{i}"] = st.session_state.get(f"dietary_{i}", "")
+            # Store guest data, by position in the party
+            for i, guest_id in enumerate(form.guests):
+                for name in ("guest_first_name", "guest_last_name", "starter", "main", "dessert", "dietary"):
+                    form.form_data[f"{name}_{i}"] = form.value(name, guest_id)
 
             # Set submission in progress
-            st.session_state.submission_in_progress = True
+            form.submission_in_progress = True
             st.rerun()
 
+# Page modules are imported when a page is first shown, so a guest filling in
+# the form never loads the admin pages (or pandas, which they pull in).
+# The wrappers keep the page function names, which Streamlit uses as URL paths.
+def event_info_page():
+    """Event information page"""
+    from event_info import event_info_page as page
+    page()
+
+def admin_login_page():
+    """Admin login page"""
+    from admin import admin_login_page as page
+    page()
+
+def admin_summary_page():
+    """Admin summary page"""
+    from admin import admin_summary_page as page
+    page()
+
+def admin_menu_page():
+    """Admin menu planning page"""
+    from admin import admin_menu_page as page
+    page()
+
+def admin_data_page():
+    """Admin data export page"""
+    from admin import admin_data_page as page
+    page()
+
+def admin_settings_page():
+    """Admin settings page"""
+    from admin_settings import admin_settings_page as page
+    page()
+
+def admin_performance_page():
+    """Admin performance page"""
+    from admin import admin_performance_page as page
+    page()
+
 def main():
     """Main application entry point"""
     initialize_session_state()
@@ -411,9 +471,10 @@ def main():
         _run_public_navigation()
 
 def _run_admin_navigation():
+    config = get_config()
     st.set_page_config(
-        page_title=st.secrets["wedding"]["page_title"],
-        page_icon=st.secrets["wedding"]["page_icon"],
+        page_title=config.wedding.page_title,
+        page_icon=config.wedding.page_icon,
         layout="wide",
         initial_sidebar_state="expanded"
     )
@@ -424,6 +485,7 @@ def _run_admin_navigation():
         st.Page(admin_menu_page, title="Menu Planning", icon=":material/restaurant:"),
         st.Page(admin_data_page, title="Data Export", icon=":material/download:"),
         st.Page(admin_settings_page, title="Settings", icon=":material/settings:"),
+        st.Page(admin_performance_page, title="Performance", icon=":material/speed:"),
     ]
 
     # Create navigation in sidebar
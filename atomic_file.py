@@ -0,0 +1,62 @@
+"""Atomic replacement of files that other readers may open at any time.
+
+The RSVP data file, its sidecars, the Prometheus metrics file, resized
+images and secrets.toml are all written to a temporary file in the same
+directory and renamed over the target, so a reader (another session, a
+replica, the config file watcher) sees either the old or the new file and
+never a partial one.
+
+A temporary file is created owner-only (0600), so the new file is given the
+permissions of the file it replaces, or the usual permissions of a newly
+created file if there is none; otherwise a backup job or a second container
+running as another user would lose access after the first save.
+"""
+import os
+import stat
+import tempfile
+from contextlib import contextmanager
+
+def _read_umask():
+    """The process umask, read without changing it (os.umask would, for every thread)"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("Umask:"):
+                    return int(line.split()[1], 8)
+    except (OSError, ValueError):
+        pass
+    return 0o022
+
+_UMASK = _read_umask()
+
+def _target_mode(path):
+    """Permission bits for a new version of path"""
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        return 0o666 & ~_UMASK
+
+@contextmanager
+def atomic_write(path, mode='w', fsync=False, **open_kwargs):
+    """Open a temporary file that replaces path when the block completes
+
+    Yields the open file; open_kwargs are passed to open() (encoding,
+    newline, ...). With fsync the data is flushed to disk before the rename.
+    If the block raises, path is left untouched and the temporary file removed.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}-", suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, mode, **open_kwargs) as f:
+            yield f
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.chmod(tmp_path, _target_mode(path))
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,478 @@
+"""Typed, validated snapshot of the app configuration in secrets.toml.
+
+secrets.toml is parsed once into frozen dataclasses, so pages read plain
+attributes instead of walking nested ``st.secrets`` lookups on every rerun,
+and a missing or malformed setting is reported up front with every problem
+listed, rather than as a KeyError half way through rendering a page.
+
+The snapshot is swapped atomically when secrets.toml changes, either when
+the admin Settings page saves it or when Streamlit's file watcher notices an
+edit, so new settings apply on the next rerun without restarting the app.
+Modules that derive cached values from the configuration register a
+callback with on_reload() to clear them.
+
+Run ``python config.py`` to check a secrets.toml file without starting the app.
+"""
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+
+import pytz
+
+DEADLINE_FORMAT = "%Y-%m-%d %H:%M"
+
+class ConfigError(ValueError):
+    """secrets.toml is missing required settings or has invalid values"""
+
+    def __init__(self, problems):
+        self.problems = list(problems)
+        super().__init__("; ".join(self.problems))
+
+@dataclass(frozen=True, slots=True)
+class WeddingConfig:
+    page_title: str
+    page_icon: str
+    wedding_couple: str
+    banner_image: str = ""
+    welcome_message: str = ""
+
+@dataclass(frozen=True, slots=True)
+class FilesConfig:
+    csv_file: str
+    backend: str = "csv"
+    sqlite_file: str = ""
+    feather_file: str = ""
+
+@dataclass(frozen=True, slots=True)
+class AdminConfig:
+    password: str
+
+@dataclass(frozen=True, slots=True)
+class RateLimitConfig:
+    shared: bool = False  # keep the buckets next to the data file, for several replicas
+    trust_forwarded_for: bool = False  # take the client IP from X-Forwarded-For (behind a proxy)
+
+@dataclass(frozen=True, slots=True)
+class MetricsConfig:
+    prometheus_file: str = ""  # write timing metrics here in the Prometheus text format
+
+@dataclass(frozen=True, slots=True)
+class MenuItem:
+    """A detailed menu entry: either a markdown line or a name with a description"""
+    text: str = ""
+    name: str = ""
+    description: str = ""
+
+@dataclass(frozen=True, slots=True)
+class MenuConfig:
+    starters: tuple
+    mains: tuple
+    desserts: tuple
+    starters_detailed: tuple = ()
+    mains_detailed: tuple = ()
+    desserts_detailed: tuple = ()
+    menu_description: str = ""
+    menu_notes: str = ""
+
+@dataclass(frozen=True, slots=True)
+class DeadlineConfig:
+    deadline_datetime: str
+    timezone: str = "UTC"
+    grace_period_hours: float = 24
+    warning_days: float = 7
+
+@dataclass(frozen=True, slots=True)
+class Transportation:
+    parking: str = ""
+    public_transport: str = ""
+    taxi_info: str = ""
+
+@dataclass(frozen=True, slots=True)
+class Registry:
+    name: str
+    url: str
+
+@dataclass(frozen=True, slots=True)
+class InfoItem:
+    title: str
+    content: str
+
+@dataclass(frozen=True, slots=True)
+class EventConfig:
+    welcome_text: str
+    wedding_date: str
+    ceremony_time: str
+    venue_name: str
+    venue_address: str
+    venue_description: str = ""
+    venue_image: str = ""
+    venue_map_url: str = ""
+    ceremony_venue_name: str = ""
+    ceremony_venue_address: str = ""
+    ceremony_venue_description: str = ""
+    ceremony_venue_image: str = ""
+    ceremony_venue_map_url: str = ""
+    dress_code: str = ""
+    dress_code_notes: str = ""
+    accommodations_intro: str = "We have reserved room blocks at the following hotels:"
+    registry_message: str = "Your presence is the greatest gift, but if you wish to give something, we are registered at:"
+    transportation: Transportation = None
+    registry: tuple = ()
+    additional_info: tuple = ()
+
+@dataclass(frozen=True, slots=True)
+class TimelineItem:
+    time: str
+    event: str
+    description: str = ""
+
+@dataclass(frozen=True, slots=True)
+class Accommodation:
+    name: str
+    address: str
+    distance: str = ""
+    phone: str = ""
+    booking_code: str = ""
+    website: str = ""
+    notes: str = ""
+
+@dataclass(frozen=True, slots=True)
+class Contact:
+    name: str
+    phone: str = ""
+    email: str = ""
+
+@dataclass(frozen=True, slots=True)
+class AppConfig:
+    wedding: WeddingConfig
+    files: FilesConfig
+    admin: AdminConfig
+    menu: MenuConfig
+    event: EventConfig
+    deadline: DeadlineConfig = None
+    rate_limits: RateLimitConfig = RateLimitConfig()
+    metrics: MetricsConfig = MetricsConfig()
+    timeline: tuple = ()
+    accommodations: tuple = ()
+    contacts: tuple = ()  # (role, Contact) pairs, e.g. ("bride", Contact(...))
+    version: int = field(default=0, compare=False)
+
+class _Reader:
+    """Collects every problem found while reading the raw secrets"""
+
+    def __init__(self):
+        self.problems = []
+        self._missing_sections = set()
+
+    def section(self, data, name, required=True):
+        value = data.get(name)
+        if value is None:
+            if required:
+                self.problems.append(f"missing [{name}] section")
+                self._missing_sections.add(name)
+            return {}
+        if not isinstance(value, dict):
+            self.problems.append(f"[{name}] must be a table")
+            return {}
+        return value
+
+    def text(self, data, key, where, required=False, default=""):
+        value = data.get(key)
+        if value is None or (isinstance(value, str) and not value.strip()):
+            if required and where not in self._missing_sections:
+                self.problems.append(f"missing {where}.{key}")
+            return default
+        if not isinstance(value, (str, int, float)) or isinstance(value, bool):
+            self.problems.append(f"{where}.{key} must be text")
+            return default
+        return str(value)
+
+    def number(self, data, key, where, default):
+        value = data.get(key, default)
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            self.problems.append(f"{where}.{key} must be a number")
+            return default
+        if value < 0:
+            self.problems.append(f"{where}.{key} must not be negative")
+            return default
+        return value
+
+    def flag(self, data, key, where, default=False):
+        value = data.get(key, default)
+        if not isinstance(value, bool):
+            self.problems.append(f"{where}.{key} must be true or false")
+            return default
+        return value
+
+    def choices(self, data, key, where):
+        value = data.get(key)
+        if not isinstance(value, list) or not value:
+            self.problems.append(f"{where}.{key} must be a non-empty list of choices")
+            return ()
+        if not all(isinstance(item, str) and item.strip() for item in value):
+            self.problems.append(f"{where}.{key} must only contain non-empty text")
+            return ()
+        return tuple(value)
+
+    def tables(self, data, key, where):
+        value = data.get(key) or []
+        if not isinstance(value, list) or not all(isinstance(item, dict) for item in value):
+            self.problems.append(f"{where}.{key} must be an array of tables ([[{where}.{key}]])")
+            return []
+        return value
+
+def _menu_items(reader, data, key):
+    """Detailed menu entries, which may be markdown strings or name/description tables"""
+    items = []
+    for item in data.get(key) or []:
+        if isinstance(item, dict):
+            items.append(MenuItem(
+                name=str(item.get('name', '')).strip(),
+                description=str(item.get('description', '') or '')
+            ))
+        elif isinstance(item, str):
+            items.append(MenuItem(text=item.strip()))
+        else:
+            reader.problems.append(f"menu.{key} entries must be text or tables")
+    return tuple(items)
+
+def _deadline(reader, data):
+    """Read and check the [deadline] section (optional)"""
+    if not data:
+        return None
+    deadline_str = reader.text(data, "deadline_datetime", "deadline", required=True)
+    timezone_str = reader.text(data, "timezone", "deadline", default="UTC")
+    if deadline_str:
+        try:
+            datetime.strptime(deadline_str, DEADLINE_FORMAT)
+        except ValueError:
+            reader.problems.append(f"deadline.deadline_datetime must look like YYYY-MM-DD HH:MM, got '{deadline_str}'")
+    if timezone_str not in pytz.all_timezones_set:
+        reader.problems.append(f"deadline.timezone '{timezone_str}' is not a known time zone")
+    return DeadlineConfig(
+        deadline_datetime=deadline_str,
+        timezone=timezone_str,
+        grace_period_hours=reader.number(data, "grace_period_hours", "deadline", 24),
+        warning_days=reader.number(data, "warning_days", "deadline", 7)
+    )
+
+def _event(reader, data):
+    """Read the [event] section"""
+    def text(key, required=False):
+        return reader.text(data, key, "event", required=required)
+
+    transportation = data.get('transportation')
+    if transportation is not None and not isinstance(transportation, dict):
+        reader.problems.append("[event.transportation] must be a table")
+        transportation = None
+
+    defaults = EventConfig.__dataclass_fields__
+    return EventConfig(
+        welcome_text=text("welcome_text", required=True),
+        wedding_date=text("wedding_date", required=True),
+        ceremony_time=text("ceremony_time", required=True),
+        venue_name=text("venue_name", required=True),
+        venue_address=text("venue_address", required=True),
+        venue_description=text("venue_description"),
+        venue_image=text("venue_image"),
+        venue_map_url=text("venue_map_url"),
+        ceremony_venue_name=text("ceremony_venue_name"),
+        ceremony_venue_address=text("ceremony_venue_address", required=bool(data.get("ceremony_venue_name"))),
+        ceremony_venue_description=text("ceremony_venue_description"),
+        ceremony_venue_image=text("ceremony_venue_image"),
+        ceremony_venue_map_url=text("ceremony_venue_map_url"),
+        dress_code=text("dress_code"),
+        dress_code_notes=text("dress_code_notes"),
+        accommodations_intro=text("accommodations_intro") or defaults['accommodations_intro'].default,
+        registry_message=text("registry_message") or defaults['registry_message'].default,
+        transportation=Transportation(
+            parking=reader.text(transportation, "parking", "event.transportation"),
+            public_transport=reader.text(transportation, "public_transport", "event.transportation"),
+            taxi_info=reader.text(transportation, "taxi_info", "event.transportation")
+        ) if transportation else None,
+        registry=tuple(
+            Registry(name=str(item.get('name', '')).strip(), url=str(item.get('url', '')).strip())
+            for item in reader.tables(data, "registry", "event")
+        ),
+        additional_info=tuple(
+            InfoItem(title=str(item.get('title', '')).strip(), content=str(item.get('content', '')).strip())
+            for item in reader.tables(data, "additional_info", "event")
+        )
+    )
+
+def parse_config(data, version=0):
+    """Build and validate an AppConfig from the raw secrets mapping
+
+    Raises ConfigError listing every problem found.
+    """
+    reader = _Reader()
+
+    wedding = reader.section(data, "wedding")
+    welcome = reader.section(data, "welcome", required=False)
+    ui = reader.section(data, "ui", required=False)
+    files = reader.section(data, "files")
+    admin = reader.section(data, "admin")
+    menu = reader.section(data, "menu")
+    event = reader.section(data, "event")
+    deadline = reader.section(data, "deadline", required=False)
+    contact = reader.section(data, "contact", required=False)
+    rate_limits = reader.section(data, "rate_limits", required=False)
+    metrics = reader.section(data, "metrics", required=False)
+
+    backend = reader.text(files, "backend", "files", default="csv")
+    if backend not in ("csv", "sqlite", "feather"):
+        reader.problems.append(f"files.backend must be 'csv', 'sqlite' or 'feather', got '{backend}'")
+
+    contacts = []
+    for role, person in contact.items():
+        if not isinstance(person, dict):
+            reader.problems.append(f"[contact.{role}] must be a table")
+            continue
+        contacts.append((role, Contact(
+            name=reader.text(person, "name", f"contact.{role}", required=True),
+            phone=reader.text(person, "phone", f"contact.{role}"),
+            email=reader.text(person, "email", f"contact.{role}")
+        )))
+
+    config = AppConfig(
+        wedding=WeddingConfig(
+            page_title=reader.text(wedding, "page_title", "wedding", required=True),
+            page_icon=reader.text(wedding, "page_icon", "wedding", required=True),
+            wedding_couple=reader.text(wedding, "wedding_couple", "wedding", required=True),
+            banner_image=reader.text(wedding, "banner_image", "wedding"),
+            # [welcome] message, or the older [ui] welcome_message
+            welcome_message=(
+                reader.text(welcome, "message", "welcome")
+                or reader.text(ui, "welcome_message", "ui")
+            )
+        ),
+        files=FilesConfig(
+            csv_file=reader.text(files, "csv_file", "files", required=True),
+            backend=backend,
+            sqlite_file=reader.text(files, "sqlite_file", "files"),
+            feather_file=reader.text(files, "feather_file", "files")
+        ),
+        admin=AdminConfig(password=reader.text(admin, "password", "admin", required=True)),
+        menu=MenuConfig(
+            starters=reader.choices(menu, "starters", "menu"),
+            mains=reader.choices(menu, "mains", "menu"),
+            desserts=reader.choices(menu, "desserts", "menu"),
+            starters_detailed=_menu_items(reader, menu, "starters_detailed"),
+            mains_detailed=_menu_items(reader, menu, "mains_detailed"),
+            desserts_detailed=_menu_items(reader, menu, "desserts_detailed"),
+            menu_description=reader.text(menu, "menu_description", "menu"),
+            menu_notes=reader.text(menu, "menu_notes", "menu")
+        ),
+        event=_event(reader, event),
+        deadline=_deadline(reader, deadline),
+        rate_limits=RateLimitConfig(
+            shared=reader.flag(rate_limits, "shared", "rate_limits"),
+            trust_forwarded_for=reader.flag(rate_limits, "trust_forwarded_for", "rate_limits")
+        ),
+        metrics=MetricsConfig(prometheus_file=reader.text(metrics, "prometheus_file", "metrics")),
+        timeline=tuple(
+            TimelineItem(
+                time=reader.text(item, "time", "timeline", required=True),
+                event=reader.text(item, "event", "timeline", required=True),
+                description=reader.text(item, "description", "timeline")
+            )
+            for item in reader.tables(data, "timeline", "timeline")
+        ),
+        accommodations=tuple(
+            Accommodation(
+                name=reader.text(item, "name", "accommodations", required=True),
+                address=reader.text(item, "address", "accommodations", required=True),
+                distance=reader.text(item, "distance", "accommodations"),
+                phone=reader.text(item, "phone", "accommodations"),
+                booking_code=reader.text(item, "booking_code", "accommodations"),
+                website=reader.text(item, "website", "accommodations"),
+                notes=reader.text(item, "notes", "accommodations")
+            )
+            for item in reader.tables(data, "accommodations", "accommodations")
+        ),
+        contacts=tuple(contacts),
+        version=version
+    )
+
+    if reader.problems:
+        raise ConfigError(reader.problems)
+    return config
+
+_config = None
+_config_lock = threading.Lock()
+_reload_hooks = []
+
+def get_config():
+    """Return the validated configuration snapshot, loading it on first use
+
+    Raises ConfigError if secrets.toml is invalid.
+    """
+    global _config
+    if _config is None:
+        import streamlit as st
+
+        with _config_lock:
+            if _config is None:
+                _config = parse_config(st.secrets.to_dict())
+                # Pick up edits made outside the Settings page as well
+                st.secrets.file_change_listener.connect(_on_secrets_file_changed)
+    return _config
+
+def on_reload(hook):
+    """Register a function called after a new configuration snapshot is swapped in"""
+    if hook not in _reload_hooks:
+        _reload_hooks.append(hook)
+    return hook
+
+def reload_config():
+    """Re-read secrets.toml and atomically swap in the new snapshot
+
+    Returns the new configuration. Raises ConfigError, and keeps serving the
+    previous snapshot, if the file is now invalid.
+    """
+    global _config
+    import streamlit as st
+
+    # Drop Streamlit's parsed copy so the file is read again now rather than
+    # when its polling file watcher next notices the change
+    reset = getattr(st.secrets, "_reset", None)
+    if reset is not None:
+        reset()
+
+    with _config_lock:
+        version = _config.version + 1 if _config is not None else 0
+        _config = parse_config(st.secrets.to_dict(), version=version)
+        config = _config
+
+    for hook in list(_reload_hooks):
+        hook()
+    return config
+
+def _on_secrets_file_changed(*args, **kwargs):
+    """Streamlit secrets watcher callback"""
+    try:
+        reload_config()
+    except ConfigError:
+        # Keep serving the last valid configuration
+        pass
+
+def main():
+    """Validate a secrets.toml file from the command line"""
+    import argparse
+
+    import toml
+
+    parser = argparse.ArgumentParser(description="Check a secrets.toml file")
+    parser.add_argument("path", nargs="?", default=".streamlit/secrets.toml")
+    args = parser.parse_args()
+
+    try:
+        parse_config(toml.load(args.path))
+    except ConfigError as e:
+        for problem in e.problems:
+            print(problem)
+        raise SystemExit(f"{args.path}: {len(e.problems)} problems found")
+    print(f"{args.path}: configuration is valid")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""Index of stored parties by normalized contact name and email.
+
+Maps each contact key (the contact name and email, case-folded with
+whitespace collapsed) to the parties stored under it, and each party to its
+row ids. The storage layer updates it on every commit, one party at a time,
+in the derived-data database (see sidecar.py), so finding an earlier RSVP
+from the same contact is an indexed lookup rather than a scan of the
+table, and suspected duplicates are grouped from the index alone.
+"""
+import unicodedata
+
+import schema
+from schema import ROW_ID_COLUMN, PARTY_ID_COLUMN, TIMESTAMP_COLUMN
+
+# The only columns a rebuild needs to read
+INDEX_COLUMNS = [ROW_ID_COLUMN, PARTY_ID_COLUMN, TIMESTAMP_COLUMN, "contact_name", "contact_email"]
+
+# Tables of the index in the derived-data database; the latest party under a key has the highest id
+SIDECAR_TABLES = [
+    "CREATE TABLE IF NOT EXISTS contact_parties ("
+    "id INTEGER PRIMARY KEY, party_id TEXT NOT NULL UNIQUE, contact_key TEXT NOT NULL, "
+    "contact_name TEXT NOT NULL, contact_email TEXT NOT NULL, timestamp TEXT NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS idx_contact_parties_key ON contact_parties (contact_key)",
+    "CREATE TABLE IF NOT EXISTS contact_rows (row_id TEXT PRIMARY KEY, party_id TEXT NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS idx_contact_rows_party ON contact_rows (party_id)",
+]
+
+# Separates the name and email in a contact key (never left in a normalized value)
+_KEY_SEPARATOR = "\t"
+
+def _normalize(value):
+    """Case-fold a value and collapse its whitespace ('' for missing values)"""
+    text = schema.to_storage_value(None, value)
+    return " ".join(unicodedata.normalize('NFKC', text).casefold().split())
+
+def contact_key(contact_name, contact_email):
+    """Return the index key of a contact, or None if there is no contact name"""
+    name = _normalize(contact_name)
+    if not name:
+        return None
+    return name + _KEY_SEPARATOR + _normalize(contact_email)
+
+def can_match(key):
+    """True if a contact key can match an earlier party
+
+    A key without an email never matches: two guests can share a name, and
+    only the email tells an earlier RSVP of the same contact apart.
+    """
+    return key is not None and not key.endswith(_KEY_SEPARATOR)
+
+def _ids(row):
+    """(row id, party id) of a row as stored ('' when missing)"""
+    return (
+        schema.to_storage_value(ROW_ID_COLUMN, row.get(ROW_ID_COLUMN)),
+        schema.to_storage_value(PARTY_ID_COLUMN, row.get(PARTY_ID_COLUMN))
+    )
+
+def has_party(conn, party_id):
+    """True if a party is in the index"""
+    return conn.execute("SELECT 1 FROM contact_parties WHERE party_id = ?", (party_id,)).fetchone() is not None
+
+def _insert(conn, rows, indexed):
+    """Index rows; indexed maps party ids to whether they are in the index (None: the index is empty)
+
+    A party is indexed under the contact key of its first row.
+    """
+    empty = indexed is None
+    indexed = {} if empty else indexed
+    parties, row_ids = [], []
+    for row in rows:
+        row_id, party_id = _ids(row)
+        if not row_id or not party_id:
+            continue  # Migrated by ensure_row_ids before it can be matched
+
+        if party_id not in indexed:
+            indexed[party_id] = not empty and has_party(conn, party_id)
+        if not indexed[party_id]:
+            key = contact_key(row.get('contact_name'), row.get('contact_email'))
+            if key is None:
+                continue
+            parties.append((
+                party_id, key,
+                schema.to_storage_value('contact_name', row.get('contact_name')).strip(),
+                schema.to_storage_value('contact_email', row.get('contact_email')).strip(),
+                schema.to_storage_value(TIMESTAMP_COLUMN, row.get(TIMESTAMP_COLUMN))
+            ))
+            indexed[party_id] = True
+        row_ids.append((row_id, party_id))
+
+    conn.executemany(
+        "INSERT INTO contact_parties (party_id, contact_key, contact_name, contact_email, timestamp) "
+        "VALUES (?, ?, ?, ?, ?)",
+        parties
+    )
+    conn.executemany("INSERT OR IGNORE INTO contact_rows (row_id, party_id) VALUES (?, ?)", row_ids)
+
+def add_rows(conn, rows):
+    """Add newly committed rows to the index"""
+    _insert(conn, rows, {})
+
+def remove_rows(conn, rows):
+    """Take previously indexed rows out of the index; a party left without rows is removed"""
+    parties = set()
+    for row in rows:
+        row_id, party_id = _ids(row)
+        conn.execute("DELETE FROM contact_rows WHERE row_id = ? AND party_id = ?", (row_id, party_id))
+        parties.add(party_id)
+    for party_id in parties:
+        if conn.execute("SELECT 1 FROM contact_rows WHERE party_id = ? LIMIT 1", (party_id,)).fetchone() is None:
+            conn.execute("DELETE FROM contact_parties WHERE party_id = ?", (party_id,))
+
+def remove_party(conn, party_id):
+    """Remove a party from the index; returns the ids of its rows"""
+    row_ids = [row_id for row_id, in conn.execute(
+        "SELECT row_id FROM contact_rows WHERE party_id = ? ORDER BY rowid", (party_id,)
+    )]
+    conn.execute("DELETE FROM contact_rows WHERE party_id = ?", (party_id,))
+    conn.execute("DELETE FROM contact_parties WHERE party_id = ?", (party_id,))
+    return row_ids
+
+def find_party(conn, key):
+    """Return the id of the latest party stored under a contact key, or None (see can_match)"""
+    if not can_match(key):
+        return None
+    row = conn.execute(
+        "SELECT party_id FROM contact_parties WHERE contact_key = ? ORDER BY id DESC LIMIT 1", (key,)
+    ).fetchone()
+    return row[0] if row is not None else None
+
+def get_party(conn, party_id):
+    """Return the index entry of a party (contact, timestamp and row ids), or None"""
+    row = conn.execute(
+        "SELECT contact_key, contact_name, contact_email, timestamp FROM contact_parties WHERE party_id = ?",
+        (party_id,)
+    ).fetchone()
+    if row is None:
+        return None
+    row_ids = [row_id for row_id, in conn.execute(
+        "SELECT row_id FROM contact_rows WHERE party_id = ? ORDER BY rowid", (party_id,)
+    )]
+    key, contact_name, contact_email, timestamp = row
+    return {
+        'party_id': party_id, 'key': key, 'contact_name': contact_name,
+        'contact_email': contact_email, 'timestamp': timestamp, 'rows': row_ids
+    }
+
+def rebuild(conn, df):
+    """Build the index from scratch from an RSVP frame (INDEX_COLUMNS are enough)"""
+    conn.execute("DELETE FROM contact_rows")
+    conn.execute("DELETE FROM contact_parties")
+    if df.empty or PARTY_ID_COLUMN not in df.columns or 'contact_name' not in df.columns:
+        return
+    columns = [column for column in INDEX_COLUMNS if column in df.columns]
+    # Timestamps parsed in one pass rather than row by row
+    _insert(conn, schema.apply_schema(df[columns].copy()).to_dict('records'), None)
+
+def load(conn):
+    """Read the whole index: {'contacts': {key: [party ids, oldest first]}, 'parties': {party id: entry}}"""
+    index = {'contacts': {}, 'parties': {}}
+    for party_id, key, contact_name, contact_email, timestamp in conn.execute(
+        "SELECT party_id, contact_key, contact_name, contact_email, timestamp FROM contact_parties ORDER BY id"
+    ):
+        index['parties'][party_id] = {
+            'key': key, 'contact_name': contact_name, 'contact_email': contact_email,
+            'timestamp': timestamp, 'rows': []
+        }
+        index['contacts'].setdefault(key, []).append(party_id)
+    for row_id, party_id in conn.execute("SELECT row_id, party_id FROM contact_rows ORDER BY rowid"):
+        if party_id in index['parties']:
+            index['parties'][party_id]['rows'].append(row_id)
+    return index
+
+def duplicates(index):
+    """Group parties that share a contact name or a contact email
+
+    Parties are linked through the name and the email of their contact key
+    (union-find over the index entries, no pairwise comparison), and every
+    group of two or more parties is returned, oldest party first.
+    """
+    parent = {}
+
+    def find(node):
+        while parent.setdefault(node, node) != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    for party_id, party in index['parties'].items():
+        name, email = party['key'].split(_KEY_SEPARATOR, 1)
+        root = find(('party', party_id))
+        parent[find(('name', name))] = root
+        if email:
+            parent[find(('email', email))] = find(root)
+
+    groups = {}
+    for party_id in index['parties']:
+        groups.setdefault(find(('party', party_id)), []).append(party_id)
+
+    result = []
+    for party_ids in groups.values():
+        if len(party_ids) > 1:
+            parties = [dict(index['parties'][party_id], party_id=party_id) for party_id in party_ids]
+            result.append(sorted(parties, key=lambda party: party['timestamp']))
+    return sorted(result, key=lambda parties: parties[0]['contact_name'].casefold())
@@ -1,328 +1,357 @@
+import threading
+from dataclasses import dataclass
+
 import streamlit as st
 
+from config import get_config
+from perf import timed
+from image_assets import image_url, VENUE_IMAGE_WIDTH
+
+# Tab labels, in display order
+TABS = [
+    ":material/event: Event Details",
+    ":material/restaurant_menu: Menu",
+    ":material/schedule: Timeline",
+    ":material/hotel: Accommodations",
+    ":material/directions_car: Transportation",
+    ":material/card_giftcard: Registry & Info",
+    ":material/contact_mail: Contact"
+]
+
+REGISTRY_CARD_HTML = """
+                                <div style='
+                                    text-align: center;
+                                    padding: 20px;
+                                    border: 1px solid #ddd;
+                                    border-radius: 10px;
+                                    background-color: #f9f9f9;
+                                '>
+                                    <h3>{name}</h3>
+                                    <a href='{url}' target='_blank' style='
+                                        text-decoration: none;
+                                        background-color: #4CAF50;
+                                        color: white;
+                                        padding: 10px 20px;
+                                        border-radius: 5px;
+                                        display: inline-block;
+                                        margin-top: 10px;
+                                    '>View Registry</a>
+                                </div>
+                                """
+
+@dataclass(frozen=True, slots=True)
+class EventView:
+    """Everything the event page renders, derived once per configuration version"""
+    version: int
+    title: str
+    welcome_text: str
+    menu_courses: tuple
+    timeline: tuple
+    registry_cards: tuple
+    valid_info: tuple
+    contacts: tuple
+
+def _menu_lines(items):
+    """Markdown lines for a course: (line, caption) for named dishes, (bullet, None) otherwise"""
+    lines = []
+    for item in items:
+        # Only entries with a name (or a non-empty markdown line) are shown
+        if item.name:
+            lines.append((f"**{item.name}**", item.description))
+        elif item.text:
+            lines.append((f"• {item.text}", None))
+    return tuple(lines)
+
+def _build_view(config):
+    """Derive the event page view model from a configuration snapshot"""
+    event = config.event
+    menu = config.menu
+    courses = (
+        (":material/restaurant: Starters", _menu_lines(menu.starters_detailed)),
+        (":material/hand_meal: Main Courses", _menu_lines(menu.mains_detailed)),
+        (":material/cake: Desserts", _menu_lines(menu.desserts_detailed)),
+    )
+    contacts = dict(config.contacts)
+
+    return EventView(
+        version=config.version,
+        title=f":material/celebration: The Wedding of {config.wedding.wedding_couple}",
+        welcome_text=event.welcome_text,
+        menu_courses=courses if any(lines for _, lines in courses) else (),
+        timeline=tuple((f"**{item.time}**", item.event, item.description) for item in config.timeline),
+        # Filter out registries with empty name or URL
+        registry_cards=tuple(
+            REGISTRY_CARD_HTML.format(name=r.name, url=r.url)
+            for r in event.registry if r.name and r.url
+        ),
+        # Filter out items with empty title or content
+        valid_info=tuple(item for item in event.additional_info if item.title and item.content),
+        contacts=tuple(contacts.get(role) for role in ('bride', 'groom')) if contacts else (),
+    )
+
+_view = None
+_view_lock = threading.Lock()
+
+def get_event_view(config):
+    """Return the cached view model, rebuilding it when the configuration version changes"""
+    global _view
+    view = _view
+    if view is None or view.version != config.version:
+        with _view_lock:
+            view = _view
+            if view is None or view.version != config.version:
+                view = _view = _build_view(config)
+    return view
+
+def _is_open(tab):
+    """True if a tab's content should be rendered (always, if the tab state is not tracked)"""
+    return getattr(tab, 'open', None) is not False
+
+@timed
 def event_info_page():
+    config = get_config()
+    event = config.event
+    view = get_event_view(config)
+
     left_spacer, main_col, right_spacer = st.columns([2, 5, 2])
     with main_col:
-        st.title(f":material/celebration: The Wedding of {st.secrets['wedding']['wedding_couple']}")
-        st.write(st.secrets['event']['welcome_text'])
+        st.title(view.title)
+        st.write(view.welcome_text)
 
         st.markdown("---")
 
-        # Create tabs
-        tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs([
-            ":material/event: Event Details",
-            ":material/restaurant_menu: Menu",
-            ":material/schedule: Timeline",
-            ":material/hotel: Accommodations",
-            ":material/directions_car: Transportation",
-            ":material/card_giftcard: Registry & Info",
-            ":material/contact_mail: Contact"
-        ])
+        # Create tabs; only the selected tab's content is run
+        tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs(TABS, key="event_info_tab", on_change="rerun")
 
         # Tab 1: Event Details (Date, Time, Ceremony, Reception)
-        with tab1:
-            with st.container(border=True):
-            # Wedding Date and Time
-                st.header(":material/calendar_today: Date & Time")
-                col1, col2 = st.columns(2)
-
-                with col1:
-                    st.write("**Wedding Date**")
-                    st.write(st.secrets['event']['wedding_date'])
-
-                with col2:
-                    st.write("**Ceremony Time**")
-                    st.write(st.secrets['event']['ceremony_time'])
-
-                st.markdown("---")
-
-                # Ceremony Venue (Church)
-                if st.secrets['event'].get('ceremony_venue_name'):
-                    st.header(":material/church: Wedding Ceremony")
-
-                    ceremony_col1, ceremony_col2 = st.columns([2, 1])
-
-                    with ceremony_col1:
-                        st.write(f"**{st.secrets['event']['ceremony_venue_name']}**")
-                        st.write(st.secrets['event']['ceremony_venue_address'])
-
-                        if st.secrets['event'].get('ceremony_venue_description'):
-                            st.write("")
-                            st.write(st.secrets['event']['ceremony_venue_description'])
-
-                        # Add map if URL provided
-                        if st.secrets['event'].get('ceremony_venue_map_url'):
-                            st.page_link(st.secrets['event']['ceremony_venue_map_url'], label='Open in Maps', icon=":material/map:")
-
-                    with ceremony_col2:
-                        # Ceremony venue image if provided
-                        if st.secrets['event'].get('ceremony_venue_image'):
-                            st.image(st.secrets['event']['ceremony_venue_image'], width=425)
-
-                    st.markdown("---")
-
-                # Reception Venue
-                st.header(":material/celebration: Reception Venue")
-
-                venue_col1, venue_col2 = st.columns([2, 1])
-
-                with venue_col1:
-                    st.write(f"**{st.secrets['event']['venue_name']}**")
-                    st.write(st.secrets['event']['venue_address'])
-
-                    if st.secrets['event'].get('venue_description'):
-                        st.write(st.secrets['event']['venue_description'])
-
-                    # Add map if URL provided
-                    if st.secrets['event'].get('venue_map_url'):
-                        st.page_link(st.secrets['event']['venue_map_url'], label='Open in Maps', icon=":material/map:")
-
-                with venue_col2:
-                    # Venue image if provided
-                    if st.secrets['event'].get('venue_image'):
-                        st.image(st.secrets['event']['venue_image'], width=425)
+        if _is_open(tab1):
+            with tab1:
+                _event_details_tab(event)
 
         # Tab 2: Menu
-        with tab2:
-            if st.secrets.get('menu'):
-                with st.container(border=True):
-                    menu_info = st.secrets['menu']
-
-                    # Check if there are any detailed menu items to display
-                    starters_detailed = menu_info.get('starters_detailed', [])
-                    mains_detailed = menu_info.get('mains_detailed', [])
-                    desserts_detailed = menu_info.get('desserts_detailed', [])
-
-                    # Helper function to check if items exist and are valid
-                    def has_valid_items(items):
-                        if not items:
-                            return False
-                        for item in items:
-                            if isinstance(item, dict):
-                                if item.get('name', '').strip():
-                                    return True
-                            elif isinstance(item, str) and item.strip():
-                                return True
-                        return False
-
-                    has_starters = has_valid_items(starters_detailed)
-                    has_mains = has_valid_items(mains_detailed)
-                    has_desserts = has_valid_items(desserts_detailed)
-
-                    if has_starters or has_mains or has_desserts:
-                        # Optional menu description
-                        if menu_info.get('menu_description'):
-                            st.write(menu_info['menu_description'])
-
-                        menu_col1, menu_col2, menu_col3 = st.columns(3)
-
-                        if has_starters:
-                            with menu_col1:
-                                st.subheader(":material/restaurant: Starters")
-                                for item in starters_detailed:
-                                    if isinstance(item, dict):
-                                        if item.get('name', '').strip():
-                                            st.markdown(f"**{item['name']}**")
-                                            if item.get('description'):
-                                                st.caption(item['description'])
-                                            st.write("")
-                                    elif isinstance(item, str) and item.strip():
-                                        st.write(f"• {item}")
-
-                        if has_mains:
-                            with menu_col2:
-                                st.subheader(":material/hand_meal: Main Courses")
-                                for item in mains_detailed:
-                                    if isinstance(item, dict):
-                                        if item.get('name', '').strip():
-                                            st.markdown(f"**{item['name']}**")
-                                            if item.get('description'):
-                                                st.caption(item['description'])
-                                            st.write("")
-                                    elif isinstance(item, str) and item.strip():
-                                        st.write(f"• {item}")
-
-                        if has_desserts:
-                            with menu_col3:
-                                st.subheader(":material/cake: Desserts")
-                                for item in desserts_detailed:
-                                    if isinstance(item, dict):
-                                        if item.get('name', '').strip():
-                                            st.markdown(f"**{item['name']}**")
-                                            if item.get('description'):
-                                                st.caption(item['description'])
-                                            st.write("")
-                                    elif isinstance(item, str) and item.strip():
-                                        st.write(f"• {item}")
-
-                        # Optional menu notes
-                        if menu_info.get('menu_notes'):
-                            st.info(f":material/info: {menu_info['menu_notes']}")
-            else:
-                st.info("Menu information will be available soon.")
+        if _is_open(tab2):
+            with tab2:
+                _menu_tab(config.menu, view)
 
         # Tab 3: Timeline
-        with tab3:
-            timeline_items = st.secrets.get('timeline', [])
-            if timeline_items:
-                with st.container(border=True):
-                    for item in timeline_items:
-                        with st.container():
-                            time_col, event_col = st.columns([0.5, 3])
-                            with time_col:
-                                st.markdown(f"**{item['time']}**")
-                            with event_col:
-                                st.write(item['event'])
-                                if item.get('description'):
-                                    st.caption(item['description'])
-            else:
-                st.info("Timeline information will be available soon.")
+        if _is_open(tab3):
+            with tab3:
+                _timeline_tab(view)
 
         # Tab 4: Accommodations
-        with tab4:
-            accommodations_items = st.secrets.get('accommodations', [])
-            if accommodations_items:
-                st.write(st.secrets['event'].get('accommodations_intro',
-                        'We have reserved room blocks at the following hotels:'))
-
-                accommodations = st.secrets['accommodations']
-
-                for hotel in accommodations:
-                    with st.expander(f":material/hotel: {hotel['name']}", expanded=True):
-                        st.write(f"**Address:** {hotel['address']}")
-
-                        if hotel.get('distance'):
-                            st.write(f"**Distance from venue:** {hotel['distance']}")
-
-                        if hotel.get('phone'):
-                            st.write(f"**Phone:** {hotel['phone']}")
-
-                        if hotel.get('booking_code'):
-                            st.info(f":material/info: Use booking code: **{hotel['booking_code']}** for our group rate")
-
-                        if hotel.get('website'):
-                            st.markdown(f"[:material/link: Visit Website]({hotel['website']})")
-
-                        if hotel.get('notes'):
-                            st.write(hotel['notes'])
-            else:
-                st.info("Accommodation information will be available soon.")
+        if _is_open(tab4):
+            with tab4:
+                _accommodations_tab(event, config.accommodations)
 
         # Tab 5: Transportation
-        with tab5:
-            if st.secrets['event'].get('transportation'):
-                transport_info = st.secrets['event']['transportation']
-                with st.container(border=True):
-                    if transport_info.get('parking'):
-                        st.subheader(":material/local_parking: Parking")
-                        st.write(transport_info['parking'])
-                        st.markdown("")
-
-                    if transport_info.get('public_transport'):
-                        st.subheader(":material/train: Public Transportation")
-                        st.write(transport_info['public_transport'])
-                        st.markdown("")
-
-                    if transport_info.get('taxi_info'):
-                        st.subheader(":material/local_taxi: Taxi Services")
-                        st.write(transport_info['taxi_info'])
-            else:
-                st.info("Transportation information will be available soon.")
+        if _is_open(tab5):
+            with tab5:
+                _transportation_tab(event)
 
         # Tab 6: Registry & Additional Info
-        with tab6:
-            with st.container(border=True):
-            # Dress Code
-                dress_code = st.secrets['event'].get('dress_code')
-                if dress_code:
-                    st.subheader(":material/checkroom: Dress Code")
-                    st.write(dress_code)
-
-                    dress_code_notes = st.secrets['event'].get('dress_code_notes')
-                    if dress_code_notes:
-                        st.info(dress_code_notes)
-
-                    st.markdown("---")
-
-                # Gift Registry
-                registries = st.secrets['event'].get('registry')
-                if registries:
-                    # Filter out registries with empty name or URL
-                    valid_registries = [
-                        r for r in registries
-                        if r.get('name', '').strip() and r.get('url', '').strip()
-                    ]
-
-                    if valid_registries:
-                        st.subheader(":material/card_giftcard: Gift Registry")
-                        st.write(st.secrets['event'].get('registry_message',
-                                'Your presence is the greatest gift, but if you wish to give something, we are registered at:'))
-
-                        reg_cols = st.columns(len(valid_registries))
-                        for idx, registry in enumerate(valid_registries):
-                            with reg_cols[idx]:
-                                st.markdown(f"""
-                                <div style='
-                                    text-align: center;
-                                    padding: 20px;
-                                    border: 1px solid #ddd;
-                                    border-radius: 10px;
-                                    background-color: #f9f9f9;
-                                '>
-                                    <h3>{registry['name']}</h3>
-                                    <a href='{registry['url']}' target='_blank' style='
-                                        text-decoration: none;
-                                        background-color: #4CAF50;
-                                        color: white;
-                                        padding: 10px 20px;
-                                        border-radius: 5px;
-                                        display: inline-block;
-                                        margin-top: 10px;
-                                    '>View Registry</a>
-                                </div>
-                                """, unsafe_allow_html=True)
+        if _is_open(tab6):
+            with tab6:
+                _registry_tab(event, view)
 
-                        st.markdown("---")
+        # Tab 7: Contact
+        if _is_open(tab7):
+            with tab7:
+                _contact_tab(view)
 
-                # Additional Information
-                additional_info = st.secrets['event'].get('additional_info')
-                if additional_info:
-                    # Filter out items with empty title or content
-                    valid_info = [
-                        item for item in additional_info
-                        if item.get('title', '').strip() and item.get('content', '').strip()
-                    ]
+def _event_details_tab(event):
+    with st.container(border=True):
+    # Wedding Date and Time
+        st.header(":material/calendar_today: Date & Time")
+        col1, col2 = st.columns(2)
 
-                    if valid_info:
-                        st.subheader(":material/info: Additional Information")
+        with col1:
+            st.write("**Wedding Date**")
+            st.write(event.wedding_date)
 
-                        for info_item in valid_info:
-                            with st.expander(info_item['title']):
-                                st.write(info_item['content'])
+        with col2:
+            st.write("**Ceremony Time**")
+            st.write(event.ceremony_time)
 
-        # Tab 7: Contact
-        with tab7:
-            if st.secrets.get('contact'):
-                contact = st.secrets['contact']
-                with st.container(border=True):
-                    st.write("If you have any questions, please don't hesitate to reach out:")
-
-                    contact_col1, contact_col2 = st.columns(2)
-
-                    if contact.get('bride'):
-                        with contact_col1:
-                            st.write(f"**{contact['bride']['name']}**")
-                            if contact['bride'].get('phone'):
-                                st.write(f":material/phone: {contact['bride']['phone']}")
-                            if contact['bride'].get('email'):
-                                st.write(f":material/email: {contact['bride']['email']}")
-
-                    if contact.get('groom'):
-                        with contact_col2:
-                            st.write(f"**{contact['groom']['name']}**")
-                            if contact['groom'].get('phone'):
-                                st.write(f":material/phone: {contact['groom']['phone']}")
-                            if contact['groom'].get('email'):
-                                st.write(f":material/email: {contact['groom']['email']}")
-            else:
-                st.info("Contact information will be available soon.")
\ No newline at end of file
+        st.markdown("---")
+
+        # Ceremony Venue (Church)
+        if event.ceremony_venue_name:
+            st.header(":material/church: Wedding Ceremony")
+
+            ceremony_col1, ceremony_col2 = st.columns([2, 1])
+
+            with ceremony_col1:
+                st.write(f"**{event.ceremony_venue_name}**")
+                st.write(event.ceremony_venue_address)
+
+                if event.ceremony_venue_description:
+                    st.write("")
+                    st.write(event.ceremony_venue_description)
+
+                # Add map if URL provided
+                if event.ceremony_venue_map_url:
+                    st.page_link(event.ceremony_venue_map_url, label='Open in Maps', icon=":material/map:")
+
+            with ceremony_col2:
+                # Ceremony venue image if provided
+                if event.ceremony_venue_image:
+                    st.image(image_url(event.ceremony_venue_image, VENUE_IMAGE_WIDTH), width=VENUE_IMAGE_WIDTH)
+
+            st.markdown("---")
+
+        # Reception Venue
+        st.header(":material/celebration: Reception Venue")
+
+        venue_col1, venue_col2 = st.columns([2, 1])
+
+        with venue_col1:
+            st.write(f"**{event.venue_name}**")
+            st.write(event.venue_address)
+
+            if event.venue_description:
+                st.write(event.venue_description)
+
+            # Add map if URL provided
+            if event.venue_map_url:
+                st.page_link(event.venue_map_url, label='Open in Maps', icon=":material/map:")
+
+        with venue_col2:
+            # Venue image if provided
+            if event.venue_image:
+                st.image(image_url(event.venue_image, VENUE_IMAGE_WIDTH), width=VENUE_IMAGE_WIDTH)
+
+def _menu_tab(menu_info, view):
+    with st.container(border=True):
+        if view.menu_courses:
+            # Optional menu description
+            if menu_info.menu_description:
+                st.write(menu_info.menu_description)
+
+            for column, (header, lines) in zip(st.columns(3), view.menu_courses):
+                if lines:
+                    with column:
+                        st.subheader(header)
+                        for line, caption in lines:
+                            if caption is None:
+                                st.write(line)
+                            else:
+                                st.markdown(line)
+                                if caption:
+                                    st.caption(caption)
+                                st.write("")
+
+            # Optional menu notes
+            if menu_info.menu_notes:
+                st.info(f":material/info: {menu_info.menu_notes}")
+
+def _timeline_tab(view):
+    if view.timeline:
+        with st.container(border=True):
+            for time_label, event_name, description in view.timeline:
+                with st.container():
+                    time_col, event_col = st.columns([0.5, 3])
+                    with time_col:
+                        st.markdown(time_label)
+                    with event_col:
+                        st.write(event_name)
+                        if description:
+                            st.caption(description)
+    else:
+        st.info("Timeline information will be available soon.")
+
+def _accommodations_tab(event, accommodations):
+    if accommodations:
+        st.write(event.accommodations_intro)
+
+        for hotel in accommodations:
+            with st.expander(f":material/hotel: {hotel.name}", expanded=True):
+                st.write(f"**Address:** {hotel.address}")
+
+                if hotel.distance:
+                    st.write(f"**Distance from venue:** {hotel.distance}")
+
+                if hotel.phone:
+                    st.write(f"**Phone:** {hotel.phone}")
+
+                if hotel.booking_code:
+                    st.info(f":material/info: Use booking code: **{hotel.booking_code}** for our group rate")
+
+                if hotel.website:
+                    st.markdown(f"[:material/link: Visit Website]({hotel.website})")
+
+                if hotel.notes:
+                    st.write(hotel.notes)
+    else:
+        st.info("Accommodation information will be available soon.")
+
+def _transportation_tab(event):
+    if event.transportation:
+        transport_info = event.transportation
+        with st.container(border=True):
+            if transport_info.parking:
+                st.subheader(":material/local_parking: Parking")
+                st.write(transport_info.parking)
+                st.markdown("")
+
+            if transport_info.public_transport:
+                st.subheader(":material/train: Public Transportation")
+                st.write(transport_info.public_transport)
+                st.markdown("")
+
+            if transport_info.taxi_info:
+                st.subheader(":material/local_taxi: Taxi Services")
+                st.write(transport_info.taxi_info)
+    else:
+        st.info("Transportation information will be available soon.")
+
+def _registry_tab(event, view):
+    with st.container(border=True):
+    # Dress Code
+        dress_code = event.dress_code
+        if dress_code:
+            st.subheader(":material/checkroom: Dress Code")
+            st.write(dress_code)
+
+            dress_code_notes = event.dress_code_notes
+            if dress_code_notes:
+                st.info(dress_code_notes)
+
+            st.markdown("---")
+
+        # Gift Registry
+        if view.registry_cards:
+            st.subheader(":material/card_giftcard: Gift Registry")
+            st.write(event.registry_message)
+
+            reg_cols = st.columns(len(view.registry_cards))
+            for column, card_html in zip(reg_cols, view.registry_cards):
+                with column:
+                    st.markdown(card_html, unsafe_allow_html=True)
+
+            st.markdown("---")
+
+        # Additional Information
+        if view.valid_info:
+            st.subheader(":material/info: Additional Information")
+
+            for info_item in view.valid_info:
+                with st.expander(info_item.title):
+                    st.write(info_item.content)
+
+def _contact_tab(view):
+    if view.contacts:
+        with st.container(border=True):
+            st.write("If you have any questions, please don't hesitate to reach out:")
+
+            contact_col1, contact_col2 = st.columns(2)
+
+            for column, person in zip((contact_col1, contact_col2), view.contacts):
+                if person:
+                    with column:
+                        st.write(f"**{person.name}**")
+                        if person.phone:
+                            st.write(f":material/phone: {person.phone}")
+                        if person.email:
+                            st.write(f":material/email: {person.email}")
+    else:
+        st.info("Contact information will be available soon.")
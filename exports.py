@@ -0,0 +1,82 @@
+"""RSVP data exports for the admin Data Export page.
+
+Exports are built chunk by chunk from the storage backend, so the full
+table is never held as a DataFrame and a text copy at the same time, and
+the finished file is cached per data version so repeated downloads of
+unchanged data are free.
+"""
+import gzip
+import io
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export is optional
+    pa = None
+    pq = None
+
+EXPORT_CHUNK_ROWS = 5000
+
+# Export formats: label, file extension, MIME type
+EXPORT_FORMATS = {
+    "csv": ("CSV", "csv", "text/csv"),
+    "csv.gz": ("CSV (gzip)", "csv.gz", "application/gzip"),
+    "parquet": ("Parquet", "parquet", "application/vnd.apache.parquet"),
+}
+
+def available_formats():
+    """Return the export formats usable in this environment"""
+    return [fmt for fmt in EXPORT_FORMATS if fmt != "parquet" or pq is not None]
+
+def _iter_rows(storage, attending_only):
+    """Yield RSVP chunks, optionally limited to attending guests"""
+    for chunk in storage.iter_chunks(EXPORT_CHUNK_ROWS):
+        if attending_only:
+            if 'attending' not in chunk.columns:
+                continue
+            chunk = chunk[chunk['attending'] == 'Yes']
+        if not chunk.empty:
+            yield chunk
+
+def _write_csv(chunks, stream):
+    """Write chunks as one CSV document with a single header"""
+    header = True
+    for chunk in chunks:
+        stream.write(chunk.to_csv(index=False, header=header).encode('utf-8'))
+        header = False
+
+def _write_parquet(chunks, stream):
+    """Write chunks as row groups of one Parquet file"""
+    writer = None
+    try:
+        for chunk in chunks:
+            table = pa.Table.from_pandas(chunk.astype('string'), preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(stream, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+def _build_export(storage, attending_only, fmt):
+    """Build the export file contents"""
+    buffer = io.BytesIO()
+    chunks = _iter_rows(storage, attending_only)
+
+    if fmt == "csv":
+        _write_csv(chunks, buffer)
+    elif fmt == "csv.gz":
+        with gzip.GzipFile(fileobj=buffer, mode='wb') as gz:
+            _write_csv(chunks, gz)
+    elif fmt == "parquet":
+        if pq is None:
+            raise RuntimeError("Parquet export requires pyarrow")
+        _write_parquet(chunks, buffer)
+    else:
+        raise ValueError(f"Unknown export format '{fmt}'")
+
+    return buffer.getvalue()
+
+def build_export(storage, attending_only=False, fmt="csv"):
+    """Return the export file contents, cached for the current data version"""
+    return storage.derived(('export', attending_only, fmt), lambda: _build_export(storage, attending_only, fmt))
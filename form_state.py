@@ -0,0 +1,82 @@
+"""Per-session state of the RSVP form.
+
+Everything the form keeps between reruns lives in one RsvpForm object under
+st.session_state[FORM_STATE_KEY]. Widget keys are namespaced by the form's
+generation and by a stable guest id (not the guest's position), so:
+
+- resetting the form is one assignment: the new form has the next
+  generation, none of the old widget keys are rendered again, and Streamlit
+  drops their state at the end of the next run
+- removing a guest drops only that guest's widgets, and the guests after it
+  keep their own values
+
+Each form also carries a submission_id, the party_id of the rows it submits.
+Submitting the same form twice (a double click, or a rerun while the first
+submission was still being processed) therefore replaces the party rather
+than adding a second copy of it; see storage.BaseStorage.upsert.
+
+A session's form state is bounded by MAX_GUESTS: at most one set of guest
+widgets per guest and no older generations after the next run. Forms are
+not evicted while their tab is open. An idle tab never reruns, so its
+widget state could only be dropped from another session's thread, and a
+guest coming back to it would find an empty form. Closed tabs are freed
+by Streamlit itself once the session's websocket has been gone for
+server.disconnectedSessionTTL seconds (120 by default).
+"""
+import uuid
+from dataclasses import dataclass, field
+
+import streamlit as st
+
+FORM_STATE_KEY = "rsvp_form"
+
+# Largest party one submission can hold
+MAX_GUESTS = 20
+
+@dataclass(eq=False)
+class RsvpForm:
+    """State of one session's RSVP form"""
+    generation: int = 0
+    guests: list = field(default_factory=lambda: [0])  # stable guest ids, in display order
+    next_guest_id: int = 1
+    form_data: dict = field(default_factory=dict)
+    form_submitted: bool = False
+    submission_in_progress: bool = False
+    submission_id: str = field(default_factory=lambda: uuid.uuid4().hex)  # idempotency token
+    updated_earlier: bool = False  # the submission replaced an earlier RSVP
+    retry_at: float = 0.0  # time.time() before which submissions are rate limited
+
+    def key(self, name, guest_id=None):
+        """Widget key for a form field, namespaced by generation (and guest)"""
+        if guest_id is None:
+            return f"rsvp{self.generation}_{name}"
+        return f"rsvp{self.generation}_{name}_{guest_id}"
+
+    def value(self, name, guest_id=None, default=""):
+        """Current value of a form widget"""
+        return st.session_state.get(self.key(name, guest_id), default)
+
+    def add_guest(self):
+        """Add an empty guest block (up to MAX_GUESTS)"""
+        if not self.submission_in_progress and len(self.guests) < MAX_GUESTS:
+            self.guests.append(self.next_guest_id)
+            self.next_guest_id += 1
+
+    def remove_guest(self, guest_id):
+        """Remove a guest block; the first guest cannot be removed"""
+        if len(self.guests) > 1 and not self.submission_in_progress and guest_id in self.guests:
+            self.guests.remove(guest_id)
+
+def get_form():
+    """Return this session's RSVP form state, creating it on first use"""
+    form = st.session_state.get(FORM_STATE_KEY)
+    if form is None:
+        form = st.session_state[FORM_STATE_KEY] = RsvpForm()
+    return form
+
+def reset_form():
+    """Start a new, empty form in one operation"""
+    form = st.session_state.get(FORM_STATE_KEY)
+    generation = form.generation + 1 if form is not None else 0
+    new_form = st.session_state[FORM_STATE_KEY] = RsvpForm(generation=generation)
+    return new_form
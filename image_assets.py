@@ -0,0 +1,185 @@
+"""Resized, compressed image variants served from Streamlit's static folder.
+
+Banner and venue images are configured as local paths or remote URLs and
+are often several megabytes, while the page shows them a few hundred pixels
+wide. image_url() returns the URL of a variant scaled to the display width
+and re-encoded as WebP (JPEG if this Pillow build cannot write WebP).
+Variants are written once to static/img/ under a name that includes a hash
+of the source bytes, so a replaced image never reuses a stale variant.
+Remote images are downloaded once into static/img/remote/ instead of every
+guest fetching them from the origin.
+
+A variant is built in a background thread, one per image and width, started
+by the first request for it; until it is ready image_url() returns the
+original source, so no page render waits for a download or a resize.
+
+Streamlit's static file route sends no Cache-Control header (browsers still
+revalidate with ETag/Last-Modified). The variant names are content-addressed,
+so a reverse proxy in front of the app can mark /app/static/img/ as
+immutable with a long max-age.
+
+If Pillow is not installed, or an image cannot be fetched or decoded, the
+original source is returned unchanged.
+"""
+import glob
+import hashlib
+import io
+import os
+import threading
+import time
+import urllib.request
+
+from atomic_file import atomic_write
+from static_files import STATIC_DIR
+
+try:
+    from PIL import Image, features
+except ImportError:
+    Image = None
+
+VARIANT_DIR = os.path.join(STATIC_DIR, "img")
+REMOTE_DIR = os.path.join(VARIANT_DIR, "remote")
+
+# URL prefix of Streamlit's static file serving (server.enableStaticServing)
+STATIC_URL = "/app/static"
+
+# Display widths in CSS pixels
+BANNER_IMAGE_WIDTH = 400
+VENUE_IMAGE_WIDTH = 425
+
+# Variants are rendered at this multiple of the display width for high-DPI screens
+PIXEL_DENSITY = 2
+
+WEBP_QUALITY = 80
+JPEG_QUALITY = 82
+
+# Remote downloads larger than this are not cached
+MAX_REMOTE_BYTES = 20 * 1024 * 1024
+REMOTE_TIMEOUT_SECONDS = 10
+
+# How long to wait before retrying an image that could not be fetched or decoded
+RETRY_FAILED_SECONDS = 300
+
+# Guarded by _lock, which is never held while fetching or resizing
+_urls = {}
+_failed = {}
+_building = set()
+_lock = threading.Lock()
+
+def _is_remote(source):
+    """True for http(s) URLs"""
+    return source.startswith(("http://", "https://"))
+
+def _write_atomic(path, data):
+    """Write bytes to path so readers never see a partial file"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with atomic_write(path, 'wb') as f:
+        f.write(data)
+
+def _fetch_remote(url):
+    """Download a remote image once; returns the path of the local copy"""
+    name = hashlib.sha256(url.encode('utf-8')).hexdigest()[:16]
+    path = os.path.join(REMOTE_DIR, name)
+    if not os.path.exists(path):
+        request = urllib.request.Request(url, headers={"User-Agent": "wedding-rsvp-image-cache"})
+        with urllib.request.urlopen(request, timeout=REMOTE_TIMEOUT_SECONDS) as response:
+            data = response.read(MAX_REMOTE_BYTES + 1)
+        if len(data) > MAX_REMOTE_BYTES:
+            raise ValueError(f"Image larger than {MAX_REMOTE_BYTES} bytes: {url}")
+        _write_atomic(path, data)
+    return path
+
+def _variant_format(image):
+    """File extension and Pillow save options for a variant of this image"""
+    if features.check('webp'):
+        return "webp", {"format": "WEBP", "quality": WEBP_QUALITY, "method": 6}
+    if image.mode in ("RGBA", "LA") or "transparency" in image.info:
+        # JPEG has no alpha channel
+        return "png", {"format": "PNG", "optimize": True}
+    return "jpg", {"format": "JPEG", "quality": JPEG_QUALITY, "optimize": True, "progressive": True}
+
+def _build_variant(path, width):
+    """Write the resized variant of a local image file; returns its file name"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()[:16]
+    stem = os.path.splitext(os.path.basename(path))[0]
+    prefix = f"{stem}-{digest}-{width}w."
+
+    # Built already, by this or another process
+    existing = glob.glob(os.path.join(glob.escape(VARIANT_DIR), glob.escape(prefix) + "*"))
+    if existing:
+        return os.path.basename(existing[0])
+
+    with Image.open(path) as image:
+        image.load()
+        if image.mode not in ("RGB", "RGBA", "L", "LA"):
+            image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+        extension, options = _variant_format(image)
+        if extension == "jpg" and image.mode != "RGB":
+            image = image.convert("RGB")
+
+        pixels = width * PIXEL_DENSITY
+        if image.width > pixels:
+            image = image.resize((pixels, round(image.height * pixels / image.width)), Image.LANCZOS)
+
+        buffer = io.BytesIO()
+        image.save(buffer, **options)
+
+    name = prefix + extension
+    _write_atomic(os.path.join(VARIANT_DIR, name), buffer.getvalue())
+    return name
+
+def _build(key, source, width):
+    """Background thread: fetch and resize one image, then publish the URL of its variant"""
+    try:
+        path = _fetch_remote(source) if _is_remote(source) else source
+        name = _build_variant(path, width)
+    except Exception:
+        with _lock:
+            _failed[source] = time.monotonic()
+            _building.discard(key)
+        return
+    # The query string stops st.image reading the variant from disk itself when
+    # the working directory happens to be /app (as in the Docker image), so the
+    # browser loads it from the static route instead
+    url = f"{STATIC_URL}/img/{name}?v={name.split('-')[-2]}"
+    with _lock:
+        _failed.pop(source, None)
+        _urls[key] = url
+        _building.discard(key)
+
+def image_url(source, width):
+    """URL of a variant of an image (local path or http(s) URL) resized for display at width pixels
+
+    Returns the original source while the variant is being built, or if it
+    cannot be processed.
+    """
+    if not source or Image is None:
+        return source
+
+    failed_at = _failed.get(source)
+    if failed_at is not None and time.monotonic() - failed_at < RETRY_FAILED_SECONDS:
+        return source
+
+    try:
+        if _is_remote(source):
+            key = (source, width)
+        else:
+            stat = os.stat(source)
+            key = (source, width, stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        return source
+
+    url = _urls.get(key)
+    if url is not None:
+        return url
+
+    with _lock:
+        if key not in _urls and key not in _building:
+            _building.add(key)
+            threading.Thread(
+                target=_build, args=(key, source, width), name="rsvp-image", daemon=True
+            ).start()
+    # The original until the variant is ready
+    return source
@@ -0,0 +1,227 @@
+"""Lightweight timing of the app's hot paths.
+
+Wrap a function with @timed, or a block of code with ``with timer(name):``,
+to record how long each call takes under an operation name. Every
+operation keeps its last SAMPLES_PER_OPERATION latencies in a ring buffer
+for the p50/p95/p99 on the admin Performance page, plus running totals
+(calls, errors, a cumulative latency histogram and the bytes read and
+written) for the Prometheus export.
+
+Bytes are the calling thread's I/O from /proc/thread-self/io during the
+call, so they include every file, database and spool access the operation
+made. Where that file does not exist (not Linux) they are not recorded.
+
+With ``prometheus_file`` set in the ``[metrics]`` section of secrets.toml,
+the metrics are written to that file in the Prometheus text format every
+PROMETHEUS_EXPORT_SECONDS, e.g. for the node_exporter textfile collector.
+"""
+import bisect
+import collections
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from atomic_file import atomic_write
+from config import get_config
+
+# Latencies kept per operation for the percentiles
+SAMPLES_PER_OPERATION = 1000
+
+# Upper bounds of the Prometheus latency histogram buckets
+LATENCY_BUCKETS_SECONDS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# How often the Prometheus file is rewritten
+PROMETHEUS_EXPORT_SECONDS = 15
+
+_IO_PATH = "/proc/thread-self/io"
+
+class _Operation:
+    """Samples and running totals of one operation"""
+
+    def __init__(self):
+        self.samples = collections.deque(maxlen=SAMPLES_PER_OPERATION)
+        self.calls = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_SECONDS) + 1)  # the last one is +Inf
+        self.bytes_read = None
+        self.bytes_written = None
+
+_operations = {}
+_lock = threading.Lock()
+_io_available = os.path.exists(_IO_PATH)
+
+def _thread_io():
+    """(bytes read, bytes written, size of the io file) of the calling thread so far, or None
+
+    The bytes read do not include this read of the io file itself.
+    """
+    if not _io_available:
+        return None
+    try:
+        with open(_IO_PATH, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+    fields = dict(line.split(b':', 1) for line in data.splitlines())
+    return int(fields[b'rchar']), int(fields[b'wchar']), len(data)
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers (None if empty)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def record(operation, seconds, failed=False, bytes_read=None, bytes_written=None):
+    """Record one call of an operation"""
+    with _lock:
+        stats = _operations.get(operation)
+        if stats is None:
+            stats = _operations[operation] = _Operation()
+        stats.calls += 1
+        stats.errors += failed
+        stats.total_seconds += seconds
+        stats.samples.append(seconds)
+        stats.buckets[bisect.bisect_left(LATENCY_BUCKETS_SECONDS, seconds)] += 1
+        if bytes_read is not None:
+            stats.bytes_read = (stats.bytes_read or 0) + bytes_read
+            stats.bytes_written = (stats.bytes_written or 0) + bytes_written
+
+@contextmanager
+def timer(operation):
+    """Time the enclosed block and record it under an operation name
+
+    Exceptions count as errors, except Streamlit's st.rerun()/st.stop()
+    control flow, which does not derive from Exception.
+    """
+    io_before = _thread_io()
+    start = time.perf_counter()
+    failed = False
+    try:
+        yield
+    except Exception:
+        failed = True
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        io_after = _thread_io() if io_before is not None else None
+        if io_after is not None:
+            # The first read of the io file is not charged to the operation
+            bytes_read = io_after[0] - io_before[0] - io_before[2]
+            record(operation, seconds, failed, bytes_read, io_after[1] - io_before[1])
+        else:
+            record(operation, seconds, failed)
+
+def timed(func):
+    """Decorator recording every call of a function under the function's name"""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with timer(func.__name__):
+            return func(*args, **kwargs)
+    return wrapper
+
+def snapshot():
+    """Per-operation call counts, errors, latency percentiles (ms) and bytes, by operation name"""
+    with _lock:
+        operations = {
+            name: (list(stats.samples), stats.calls, stats.errors, stats.total_seconds,
+                   stats.bytes_read, stats.bytes_written)
+            for name, stats in _operations.items()
+        }
+    result = []
+    for name in sorted(operations):
+        samples, calls, errors, total_seconds, bytes_read, bytes_written = operations[name]
+        samples_ms = [seconds * 1000 for seconds in samples]
+        result.append({
+            'operation': name,
+            'calls': calls,
+            'errors': errors,
+            'mean_ms': total_seconds * 1000 / calls,
+            'p50_ms': percentile(samples_ms, 0.50),
+            'p95_ms': percentile(samples_ms, 0.95),
+            'p99_ms': percentile(samples_ms, 0.99),
+            'max_ms': max(samples_ms),
+            'bytes_read': bytes_read,
+            'bytes_written': bytes_written,
+        })
+    return result
+
+def reset():
+    """Forget everything recorded so far"""
+    with _lock:
+        _operations.clear()
+
+def _label(value):
+    """Escape a Prometheus label value"""
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def prometheus_text():
+    """All recorded metrics in the Prometheus text exposition format"""
+    with _lock:
+        operations = {
+            name: (list(stats.buckets), stats.calls, stats.errors, stats.total_seconds,
+                   stats.bytes_read, stats.bytes_written)
+            for name, stats in _operations.items()
+        }
+
+    lines = [
+        "# HELP rsvp_operation_duration_seconds Time taken by each call of an operation.",
+        "# TYPE rsvp_operation_duration_seconds histogram",
+    ]
+    for name in sorted(operations):
+        buckets, calls, _, total_seconds, _, _ = operations[name]
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS_SECONDS + ("+Inf",), buckets):
+            cumulative += count
+            lines.append(
+                f'rsvp_operation_duration_seconds_bucket{{operation="{_label(name)}",le="{bound}"}} {cumulative}'
+            )
+        lines.append(f'rsvp_operation_duration_seconds_sum{{operation="{_label(name)}"}} {total_seconds:.6f}')
+        lines.append(f'rsvp_operation_duration_seconds_count{{operation="{_label(name)}"}} {calls}')
+
+    counters = [
+        ("rsvp_operation_errors_total", "Calls of an operation that raised an exception.", 2),
+        ("rsvp_operation_read_bytes_total", "Bytes read by the calling thread during an operation.", 4),
+        ("rsvp_operation_written_bytes_total", "Bytes written by the calling thread during an operation.", 5),
+    ]
+    for metric, description, field in counters:
+        lines.append(f"# HELP {metric} {description}")
+        lines.append(f"# TYPE {metric} counter")
+        for name in sorted(operations):
+            value = operations[name][field]
+            if value is not None:
+                lines.append(f'{metric}{{operation="{_label(name)}"}} {value}')
+    return "\n".join(lines) + "\n"
+
+def write_prometheus_file(path):
+    """Atomically write prometheus_text() to a file"""
+    with atomic_write(path, encoding='utf-8') as f:
+        f.write(prometheus_text())
+
+_exporter = None
+_exporter_lock = threading.Lock()
+
+def _export_loop():
+    """Exporter thread: rewrite the configured Prometheus file periodically"""
+    while True:
+        path = get_config().metrics.prometheus_file
+        if path:
+            try:
+                write_prometheus_file(path)
+            except OSError:
+                # A missing directory or full disk must not stop the app; retried next round
+                pass
+        time.sleep(PROMETHEUS_EXPORT_SECONDS)
+
+def start_prometheus_export():
+    """Start the Prometheus file exporter if [metrics] prometheus_file is set (once per process)"""
+    global _exporter
+    if not get_config().metrics.prometheus_file:
+        return
+    with _exporter_lock:
+        if _exporter is None or not _exporter.is_alive():
+            _exporter = threading.Thread(target=_export_loop, name="rsvp-metrics", daemon=True)
+            _exporter.start()
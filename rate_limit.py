@@ -0,0 +1,176 @@
+"""Token-bucket rate limits for RSVP submissions and admin logins.
+
+Every limited action has two buckets: one per browser session and one per
+client IP address (a refreshed page is a new session, but not a new
+address). An attempt is admitted only if both buckets hold a token, and
+then takes one from each; buckets refill at a steady rate up to their
+capacity, so a real guest never notices the limit while a bot or stuck
+client is slowed to the refill rate instead of triggering unlimited
+storage writes.
+
+The buckets live in this process by default. With ``shared = true`` in the
+``[rate_limits]`` section of secrets.toml they are kept in a small SQLite
+file next to the RSVP data (``<data file>.limits.db``), so app replicas
+sharing the volume share the limits.
+"""
+import collections
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import closing
+from dataclasses import dataclass
+
+import streamlit as st
+
+from config import get_config
+
+@dataclass(frozen=True, slots=True)
+class Limit:
+    capacity: int  # attempts allowed in a burst
+    refill_seconds: float  # one more attempt is allowed every refill_seconds
+
+# (per session, per client IP) limits for each action
+LIMITS = {
+    "rsvp": (Limit(capacity=3, refill_seconds=60), Limit(capacity=20, refill_seconds=10)),
+    "admin_login": (Limit(capacity=5, refill_seconds=30), Limit(capacity=10, refill_seconds=60)),
+}
+
+# In-memory buckets kept; the least recently used are forgotten first
+MAX_BUCKETS = 10000
+
+def _refill(tokens, updated, limit, now):
+    """Tokens in a bucket at time now"""
+    return min(limit.capacity, tokens + max(0.0, now - updated) / limit.refill_seconds)
+
+def _take(buckets, now):
+    """Take a token from every bucket if each has one; returns (new states, seconds to wait)
+
+    buckets is a list of (limit, tokens, updated) with tokens None for a new bucket.
+    """
+    levels = [
+        limit.capacity if tokens is None else _refill(tokens, updated, limit, now)
+        for limit, tokens, updated in buckets
+    ]
+    wait = max(
+        ((1 - level) * limit.refill_seconds for (limit, _, _), level in zip(buckets, levels) if level < 1),
+        default=0.0
+    )
+    if wait:
+        return levels, wait
+    return [level - 1 for level in levels], 0.0
+
+class MemoryBuckets:
+    """Token buckets of this process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = collections.OrderedDict()
+
+    def take(self, keyed_limits, now=None):
+        """Take one token from each (key, limit) bucket; returns 0 if admitted, else seconds to wait"""
+        now = time.time() if now is None else now
+        with self._lock:
+            states = [(limit,) + self._buckets.get(key, (None, now)) for key, limit in keyed_limits]
+            levels, wait = _take(states, now)
+            for (key, _), level in zip(keyed_limits, levels):
+                self._buckets[key] = (level, now)
+                self._buckets.move_to_end(key)
+            while len(self._buckets) > MAX_BUCKETS:
+                self._buckets.popitem(last=False)
+        return wait
+
+class SharedBuckets:
+    """Token buckets in a SQLite file, shared by every process using it"""
+
+    def __init__(self, path):
+        self.path = path
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL, updated REAL)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_buckets_updated ON buckets (updated)")
+
+    def _connect(self):
+        """Open a connection; one per operation keeps Streamlit threads independent"""
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        # Limits lost in a power cut only let a few more attempts through
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def take(self, keyed_limits, now=None):
+        """Take one token from each (key, limit) bucket; returns 0 if admitted, else seconds to wait"""
+        now = time.time() if now is None else now
+        with closing(self._connect()) as conn:
+            # Write lock up front, so replicas cannot both spend the last token
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                states = []
+                for key, limit in keyed_limits:
+                    row = conn.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+                    states.append((limit,) + (row if row is not None else (None, now)))
+                levels, wait = _take(states, now)
+                conn.executemany(
+                    "INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)",
+                    [(key, level, now) for (key, _), level in zip(keyed_limits, levels)]
+                )
+                # Rows of buckets idle for a day are full again
+                conn.execute("DELETE FROM buckets WHERE updated < ?", (now - 86400,))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return wait
+
+_memory_buckets = MemoryBuckets()
+_shared_buckets = {}
+_shared_buckets_guard = threading.Lock()
+
+def acquire(action, session_key, ip_address=None, buckets=None):
+    """Admit one attempt at an action; returns 0 if admitted, else seconds until the next try
+
+    Clients without a known IP address are limited per session only.
+    """
+    session_limit, ip_limit = LIMITS[action]
+    keyed_limits = [(f"{action}:session:{session_key}", session_limit)]
+    if ip_address:
+        keyed_limits.append((f"{action}:ip:{ip_address}", ip_limit))
+    return (buckets or _memory_buckets).take(keyed_limits)
+
+def _configured_buckets():
+    """The in-memory buckets, or the shared ones if [rate_limits] shared is set"""
+    if not get_config().rate_limits.shared:
+        return _memory_buckets
+    # Imported here: only shared limits need the storage backend (and pandas)
+    from utils import get_storage
+
+    path = get_storage().path + ".limits.db"
+    with _shared_buckets_guard:
+        if path not in _shared_buckets:
+            _shared_buckets[path] = SharedBuckets(path)
+        return _shared_buckets[path]
+
+def client_ip():
+    """The client's IP address, or None if Streamlit does not know it"""
+    if get_config().rate_limits.trust_forwarded_for:
+        forwarded = st.context.headers.get("X-Forwarded-For", "")
+        if forwarded.strip():
+            # The proxy appends the address it saw, so the last entry is the trustworthy one
+            return forwarded.split(",")[-1].strip()
+    return st.context.ip_address
+
+def admit(action):
+    """Admit one attempt at an action by the current session; returns 0 or seconds to wait"""
+    if "rate_limit_session" not in st.session_state:
+        st.session_state.rate_limit_session = uuid.uuid4().hex
+    return acquire(action, st.session_state.rate_limit_session, client_ip(), _configured_buckets())
+
+def describe_wait(seconds):
+    """Human-readable time to wait, rounded up"""
+    seconds = max(1, int(seconds + 0.999))
+    if seconds < 60:
+        return f"{seconds} second{'s' if seconds != 1 else ''}"
+    minutes = (seconds + 59) // 60
+    return f"{minutes} minute{'s' if minutes != 1 else ''}"
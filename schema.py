@@ -0,0 +1,117 @@
+"""Declared schema for RSVP records.
+
+Every stored row has a stable ``rsvp_id`` and a ``party_id`` shared by all
+guests of one submission. Readers get typed frames: low-cardinality
+columns (attendance and menu choices) are categorical, ``timestamp`` is
+datetime64 and free-text columns are always read as strings, so phone
+numbers never lose leading zeros and nothing has to be re-inferred.
+"""
+import uuid
+
+import pandas as pd
+
+ROW_ID_COLUMN = "rsvp_id"
+PARTY_ID_COLUMN = "party_id"
+
+# Column order for new data files
+RSVP_COLUMNS = [
+    ROW_ID_COLUMN, PARTY_ID_COLUMN,
+    "timestamp", "contact_name", "contact_email", "contact_phone", "attending",
+    "guest_first_name", "guest_last_name", "starter_choice", "main_choice",
+    "dessert_choice", "dietary_requirements", "comments"
+]
+
+CATEGORICAL_COLUMNS = ["attending", "starter_choice", "main_choice", "dessert_choice"]
+
+TEXT_COLUMNS = [
+    ROW_ID_COLUMN, PARTY_ID_COLUMN,
+    "contact_name", "contact_email", "contact_phone",
+    "guest_first_name", "guest_last_name", "dietary_requirements", "comments"
+]
+
+TIMESTAMP_COLUMN = "timestamp"
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+def new_id():
+    """Return a new random identifier for a row or party"""
+    return uuid.uuid4().hex
+
+def csv_dtypes():
+    """dtype mapping for pd.read_csv"""
+    dtypes = {column: str for column in TEXT_COLUMNS}
+    dtypes.update({column: 'category' for column in CATEGORICAL_COLUMNS})
+    return dtypes
+
+def parse_timestamps(values):
+    """Parse stored timestamps to datetime64, tolerating hand-edited formats"""
+    parsed = pd.to_datetime(values, format=TIMESTAMP_FORMAT, errors='coerce')
+    unparsed = parsed.isna() & values.notna()
+    if unparsed.any():
+        parsed[unparsed] = pd.to_datetime(values[unparsed], format='mixed', errors='coerce')
+    return parsed
+
+def apply_schema(df):
+    """Cast a freshly read frame to the declared dtypes (in place) and return it"""
+    for column in CATEGORICAL_COLUMNS:
+        if column in df.columns and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype('category')
+    if TIMESTAMP_COLUMN in df.columns and not pd.api.types.is_datetime64_any_dtype(df[TIMESTAMP_COLUMN]):
+        df[TIMESTAMP_COLUMN] = parse_timestamps(df[TIMESTAMP_COLUMN])
+    return df
+
+def _text_column(values):
+    """Return values as a string column with empty cells missing"""
+    values = values.astype('string')
+    return values.mask(values == '')
+
+def coerce_frame(df):
+    """Return a copy of a frame with every column in its declared dtype
+
+    Unlike apply_schema this also repairs columns that were edited in place,
+    e.g. a timestamp column holding a mix of datetimes and strings.
+    """
+    df = df.copy()
+    for column in df.columns:
+        if column == TIMESTAMP_COLUMN:
+            if not pd.api.types.is_datetime64_any_dtype(df[column]):
+                df[column] = parse_timestamps(_text_column(df[column].map(
+                    lambda value: to_storage_value(column, value)
+                )))
+        elif column in CATEGORICAL_COLUMNS:
+            if not isinstance(df[column].dtype, pd.CategoricalDtype):
+                df[column] = _text_column(df[column]).astype('category')
+        else:
+            df[column] = _text_column(df[column])
+    return df
+
+def to_text_frame(df):
+    """Return a frame with every value as stored text ('' for missing values)"""
+    text = {}
+    for column in df.columns:
+        if column == TIMESTAMP_COLUMN and pd.api.types.is_datetime64_any_dtype(df[column]):
+            text[column] = df[column].dt.strftime(TIMESTAMP_FORMAT).fillna('')
+        else:
+            text[column] = df[column].astype('string').fillna('').astype(str)
+    return pd.DataFrame(text, index=df.index)
+
+def order_columns(df):
+    """Put the declared columns first, in schema order, followed by any extras"""
+    known = [column for column in RSVP_COLUMNS if column in df.columns]
+    extra = [column for column in df.columns if column not in RSVP_COLUMNS]
+    return df[known + extra]
+
+def to_storage_value(column, value):
+    """Convert a value to the text stored on disk ('' for missing values)"""
+    if value is None:
+        return ''
+    try:
+        if pd.isna(value):
+            return ''
+    except (TypeError, ValueError):
+        pass
+    if column == TIMESTAMP_COLUMN:
+        timestamp = value if isinstance(value, pd.Timestamp) else pd.to_datetime(value, errors='coerce')
+        if pd.isna(timestamp):
+            return str(value)
+        return timestamp.strftime(TIMESTAMP_FORMAT)
+    return str(value)
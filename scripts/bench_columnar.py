@@ -0,0 +1,128 @@
+"""Benchmark RSVP load time and memory: CSV versus the memory-mapped Feather store.
+
+For each table size a CSV file and an equivalent Feather file are written,
+then every read is timed in a fresh process whose peak RSS growth is
+reported alongside. The "menu" reads load only the columns the menu totals
+need (attendance, choices, names and dietary notes).
+
+Usage:
+    python scripts/bench_columnar.py [--rows 10000 100000 1000000]
+"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+READS = [
+    ("pd.read_csv (all columns)", "csv", "plain"),
+    ("CSV store (all columns)", "csv", "all"),
+    ("CSV store (menu columns)", "csv", "menu"),
+    ("Feather store (all columns)", "feather", "all"),
+    ("Feather store (menu columns)", "feather", "menu"),
+]
+
+
+def make_frame(n_rows):
+    """Build n_rows realistic RSVP rows in parties of three guests"""
+    import numpy as np
+    import pandas as pd
+
+    positions = np.arange(n_rows)
+    party = positions // 3
+    return pd.DataFrame({
+        "rsvp_id": [f"{i:032x}" for i in positions],
+        "party_id": [f"{p:032x}" for p in party],
+        "timestamp": (pd.Timestamp("2025-01-01") + pd.to_timedelta(party, unit="min")).strftime("%Y-%m-%d %H:%M:%S"),
+        "contact_name": [f"Contact {p}" for p in party],
+        "contact_email": [f"contact{p}@example.com" for p in party],
+        "contact_phone": [f"+47 4{p % 10000000:07d}" for p in party],
+        "attending": np.where(party % 10 == 0, "No", "Yes"),
+        "guest_first_name": [f"Guest{i}" for i in positions],
+        "guest_last_name": "Nordmann",
+        "starter_choice": np.array(["Caesar Salad", "Soup of the Day (V/GF)", "Prawn Cocktail"])[positions % 3],
+        "main_choice": np.array(["Pan-Seared Salmon (GF)", "Grilled Chicken Breast (GF)", "Mushroom Risotto (V)"])[positions % 3],
+        "dessert_choice": np.array(["Fruit Tart (V)", "Chocolate Cake (V)"])[positions % 2],
+        "dietary_requirements": np.where(positions % 7 == 0, "No nuts", ""),
+        "comments": "Looking forward to it, \"see you there\"",
+    })
+
+
+def peak_rss_kb():
+    """Peak resident set size of this process in KB
+
+    Prefers VmHWM, because ru_maxrss survives exec and would report the
+    benchmark parent's peak in a fresh child.
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def child(backend_name, kind, csv_file, feather_file):
+    """Run one read in this (fresh) process and print its timing as JSON"""
+    import pandas as pd
+
+    import aggregates
+    import storage
+
+    backend = storage.create_storage(backend_name, csv_file, feather_file=feather_file)
+    before = peak_rss_kb()
+    start = time.perf_counter()
+    if kind == "plain":
+        df = pd.read_csv(csv_file)
+    elif kind == "all":
+        df = backend._read()
+    else:
+        df = backend._read_columns(aggregates.RECOUNT_COLUMNS)
+    elapsed = time.perf_counter() - start
+    after = peak_rss_kb()
+    print(json.dumps({"seconds": elapsed, "rss_kb": after - before, "rows": len(df)}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--child", nargs=4, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(*args.child)
+        return
+
+    import storage
+
+    workdir = tempfile.mkdtemp(prefix="rsvp-columnar-")
+    try:
+        print(f"{'rows':>9}  {'read':<30} {'time (ms)':>10} {'peak RSS (MB)':>14}")
+        for n_rows in args.rows:
+            csv_file = os.path.join(workdir, f"rsvps-{n_rows}.csv")
+            feather_file = os.path.join(workdir, f"rsvps-{n_rows}.feather")
+            make_frame(n_rows).to_csv(csv_file, index=False)
+            storage.import_csv(csv_file, storage.create_storage("feather", csv_file, feather_file=feather_file))
+
+            for label, backend_name, kind in READS:
+                output = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), "--child", backend_name, kind, csv_file, feather_file],
+                    check=True, capture_output=True, text=True
+                ).stdout
+                result = json.loads(output.strip().splitlines()[-1])
+                print(f"{n_rows:>9}  {label:<30} {result['seconds'] * 1000:>10.1f} {result['rss_kb'] / 1024:>14.1f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
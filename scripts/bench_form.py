@@ -0,0 +1,131 @@
+"""Measure the rerun cost of the RSVP form as the party grows.
+
+For each party size, runs the RSVP form page with streamlit.testing's
+AppTest and reports the script run time and number of elements for:
+
+- a full rerun of the page (what every edit cost before the guest blocks
+  became fragments, and what submitting or changing attendance still costs)
+- a rerun of the guest list fragment (adding a guest)
+- removing the last guest: a click on its Remove button, whose callback
+  changes the form before the guest list fragment reruns
+- a rerun of one guest block fragment (editing a guest's name, menu
+  choices or dietary requirements)
+
+AppTest always runs whole scripts, so the fragment reruns are measured by
+running just the fragment function with the same session state.
+
+Usage:
+    python scripts/bench_form.py [--cwd DIR] [--sizes 1 5 10 20] [--repeat 5]
+
+DIR must contain a valid .streamlit/secrets.toml (default: the repository root).
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+FRAGMENT_SCRIPT = """
+import sys
+sys.path.insert(0, {repo!r})
+import streamlit as st
+import app
+menu = app.get_config().menu
+if {whole_list}:
+    app.guest_list(menu)
+else:
+    form = app.get_form()
+    app.guest_block(form.guests[-1], menu)
+"""
+
+
+def count_elements(node):
+    """Number of elements and containers below an AppTest node"""
+    children = getattr(node, "children", None) or {}
+    return len(children) + sum(count_elements(child) for child in children.values())
+
+
+def attending_party(app_test, size):
+    """Put a party of the given size in session state, attending, with names filled in"""
+    from form_state import FORM_STATE_KEY, RsvpForm
+
+    form = RsvpForm(guests=list(range(size)), next_guest_id=size)
+    app_test.session_state[FORM_STATE_KEY] = form
+    app_test.session_state[form.key("attending")] = "Yes, I/we will attend"
+    for guest_id in form.guests:
+        app_test.session_state[form.key("guest_first_name", guest_id)] = f"Guest{guest_id}"
+        app_test.session_state[form.key("guest_last_name", guest_id)] = "Nordmann"
+
+
+def measure(app_test, repeat):
+    """Median run time in milliseconds and element count of an AppTest"""
+    app_test.run()  # warm up
+    if app_test.exception:
+        raise RuntimeError(app_test.exception[0].value)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        app_test.run()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), count_elements(app_test._tree)
+
+
+def measure_remove(size, repeat):
+    """Median time in milliseconds and element count of removing the last guest, or None for one guest"""
+    from streamlit.testing.v1 import AppTest
+    from form_state import FORM_STATE_KEY
+
+    if size < 2:
+        return None
+    timings = []
+    for _ in range(repeat):
+        # Each removal needs a fresh party of the full size
+        app_test = AppTest.from_string(FRAGMENT_SCRIPT.format(repo=REPO_ROOT, whole_list=True), default_timeout=60)
+        attending_party(app_test, size)
+        app_test.run()
+        form = app_test.session_state[FORM_STATE_KEY]
+        remove = app_test.button(key=form.key("remove", form.guests[-1]))
+        start = time.perf_counter()
+        remove.click().run()
+        timings.append((time.perf_counter() - start) * 1000)
+        if app_test.exception:
+            raise RuntimeError(app_test.exception[0].value)
+        if len(app_test.session_state[FORM_STATE_KEY].guests) != size - 1:
+            raise RuntimeError("Remove did not remove the guest")
+    return statistics.median(timings), count_elements(app_test._tree)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cwd", default=REPO_ROOT, help="directory with .streamlit/secrets.toml")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(range(1, 21)))
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    os.chdir(args.cwd)
+    from streamlit.testing.v1 import AppTest
+
+    print(f"{'guests':>6}  {'full rerun':>18}  {'guest list':>18}  {'one guest':>18}  {'remove guest':>18}")
+    print(f"{'':>6}" + f"  {'ms':>9} {'elements':>8}" * 4)
+    for size in args.sizes:
+        results = []
+        for script in (None, True, False):
+            if script is None:
+                app_test = AppTest.from_file(os.path.join(REPO_ROOT, "app.py"), default_timeout=60)
+            else:
+                app_test = AppTest.from_string(
+                    FRAGMENT_SCRIPT.format(repo=REPO_ROOT, whole_list=script), default_timeout=60
+                )
+            attending_party(app_test, size)
+            results.append(measure(app_test, args.repeat))
+        results.append(measure_remove(size, args.repeat))
+        print(f"{size:>6}  " + "  ".join(
+            f"{'-':>9} {'-':>8}" if result is None else f"{result[0]:>9.1f} {result[1]:>8}" for result in results
+        ))
+
+
+if __name__ == "__main__":
+    main()
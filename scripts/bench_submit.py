@@ -0,0 +1,97 @@
+"""Benchmark RSVP submit latency against the size of the existing CSV file.
+
+Compares the append-only ``utils.save_rsvp`` with the previous
+load-concat-rewrite implementation at 100, 10k and 100k existing rows.
+
+Usage:
+    python scripts/bench_submit.py [--rows 100 10000 100000] [--repeat 20]
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def make_row(i):
+    """Build a realistic attending guest row"""
+    return {
+        "timestamp": "2025-06-01 12:00:00",
+        "contact_name": f"Contact {i}",
+        "contact_email": f"contact{i}@example.com",
+        "contact_phone": f"+47 4000{i:04d}",
+        "attending": "Yes",
+        "guest_first_name": f"Guest{i}",
+        "guest_last_name": "Nordmann",
+        "starter_choice": "Caesar Salad",
+        "main_choice": "Pan-Seared Salmon (GF)",
+        "dessert_choice": "Fruit Tart (V)",
+        "dietary_requirements": "",
+        "comments": "Looking forward to it, \"see you there\"",
+    }
+
+
+def legacy_save_rsvp(utils, rsvp_data):
+    """The previous implementation: load everything, concat one row, rewrite"""
+    import pandas as pd
+    df = utils.load_rsvps()
+    df = pd.concat([df, pd.DataFrame([rsvp_data])], ignore_index=True)
+    if 'contact_phone' in df.columns:
+        df['contact_phone'] = df['contact_phone'].astype(str)
+    df.to_csv(utils.get_config().files.csv_file, index=False)
+
+
+def seed(utils, n_rows):
+    """Write a CSV file with n_rows existing RSVPs, in the current column layout"""
+    import pandas as pd
+    import schema
+    rows = [dict(make_row(i), rsvp_id=schema.new_id(), party_id=schema.new_id()) for i in range(n_rows)]
+    pd.DataFrame(rows, columns=schema.RSVP_COLUMNS).to_csv(utils.get_config().files.csv_file, index=False)
+    # Bring the derived data up to date, as in a running app, so the first save does not rebuild it
+    utils.get_menu_totals()
+
+
+def measure(func, repeat):
+    """Return per-call latencies in milliseconds"""
+    timings = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        func(i)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="rsvp-bench-")
+    os.makedirs(os.path.join(workdir, ".streamlit"))
+    # The example configuration is complete and valid; its data file lands in workdir
+    shutil.copy(os.path.join(REPO_ROOT, ".streamlit", "secrets.toml.example"),
+                os.path.join(workdir, ".streamlit", "secrets.toml"))
+    os.chdir(workdir)
+    sys.path.insert(0, REPO_ROOT)
+
+    import utils
+
+    print(f"{'rows':>8} {'impl':>8} {'median ms':>10} {'p95 ms':>10}")
+    for n_rows in args.rows:
+        for name, impl in (("rewrite", legacy_save_rsvp), ("append", None)):
+            seed(utils, n_rows)
+            if impl is None:
+                timings = measure(lambda i: utils.save_rsvp(make_row(n_rows + i)), args.repeat)
+            else:
+                timings = measure(lambda i: impl(utils, make_row(n_rows + i)), args.repeat)
+            p95 = statistics.quantiles(timings, n=20)[-1] if len(timings) > 1 else timings[0]
+            print(f"{n_rows:>8} {name:>8} {statistics.median(timings):>10.2f} {p95:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
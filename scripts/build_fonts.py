@@ -0,0 +1,229 @@
+"""Subset the theme fonts to the glyphs the app renders and convert them to WOFF2.
+
+Reads the [[theme.fontFaces]] entries in .streamlit/config.toml, and for
+every TrueType/OpenType font they reference under static/:
+
+- keeps only Latin (including the Norwegian æ, ø and å), common punctuation
+  and any other character used in .streamlit/secrets.toml
+- pins the width axis of variable fonts to normal and limits the weight axis
+  to the weights the theme uses
+- writes static/<font>-latin.woff2
+
+The fontFaces entries are then rewritten to point at the WOFF2 files, with
+one entry per file (a variable font covers every weight in a single face)
+and a unicodeRange so browsers skip the download for text outside it.
+The original fonts are left in static/ as the source for the next build.
+
+Requires fontTools and brotli (pip install fonttools brotli).
+
+Usage:
+    python scripts/build_fonts.py [--config .streamlit/config.toml] [--text-from .streamlit/secrets.toml]
+    python scripts/build_fonts.py --check
+"""
+import argparse
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import toml
+
+from static_files import STATIC_DIR, FONT_URL_PREFIX, font_face_problems
+
+# Latin: ASCII, Latin-1 (covers æøå ÆØÅ), typographic punctuation, euro and
+# the few Latin Extended letters used in European names
+LATIN_RANGES = [
+    (0x0020, 0x007E), (0x00A0, 0x00FF), (0x0131, 0x0131), (0x0152, 0x0153),
+    (0x0160, 0x0161), (0x0178, 0x0178), (0x017D, 0x017E), (0x02C6, 0x02C6),
+    (0x02DA, 0x02DA), (0x02DC, 0x02DC), (0x2013, 0x2014), (0x2018, 0x201A),
+    (0x201C, 0x201E), (0x2022, 0x2022), (0x2026, 0x2026), (0x2039, 0x203A),
+    (0x20AC, 0x20AC), (0x2122, 0x2122),
+]
+
+# Weight range kept in variable fonts (regular to bold)
+WEIGHT_RANGE = (400, 700)
+
+# Valid CSS font-style values; anything else is dropped from the face
+FONT_STYLES = ("normal", "italic", "oblique")
+
+
+def collect_unicodes(text_paths):
+    """Code points to keep: the Latin ranges plus every character in the given files"""
+    unicodes = set()
+    for start, end in LATIN_RANGES:
+        unicodes.update(range(start, end + 1))
+    for path in text_paths:
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                unicodes.update(ord(c) for c in f.read() if c.isprintable())
+    return unicodes
+
+
+def unicode_range(unicodes):
+    """CSS unicode-range string for a set of code points"""
+    ranges = []
+    for code in sorted(unicodes):
+        if ranges and code == ranges[-1][1] + 1:
+            ranges[-1][1] = code
+        else:
+            ranges.append([code, code])
+    return ", ".join(
+        f"U+{start:04X}" if start == end else f"U+{start:04X}-{end:04X}"
+        for start, end in ranges
+    )
+
+
+def source_font(url):
+    """Path of the original font file behind a fontFaces URL (None if it is not a local font)"""
+    if not url.startswith(FONT_URL_PREFIX):
+        return None
+    path = os.path.join(STATIC_DIR, url[len(FONT_URL_PREFIX):])
+    stem, extension = os.path.splitext(path)
+    if extension.lower() in (".ttf", ".otf"):
+        return path
+    if extension.lower() == ".woff2" and stem.endswith("-latin"):
+        # Rebuild from the original, e.g. after new characters were added to secrets.toml
+        for extension in (".ttf", ".otf"):
+            if os.path.exists(stem[:-len("-latin")] + extension):
+                return stem[:-len("-latin")] + extension
+    return None
+
+
+def subset_font(source, target, unicodes):
+    """Write a WOFF2 subset of one font file; returns the code points it covers"""
+    from fontTools import subset
+    from fontTools.ttLib import TTFont
+    from fontTools.varLib import instancer
+
+    font = TTFont(source)
+
+    options = subset.Options()
+    # Keep kerning, ligatures and the script fonts' contextual alternates
+    options.layout_features = ["*"]
+    options.name_IDs = ["*"]
+    options.notdef_outline = True
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(unicodes=unicodes)
+    subsetter.subset(font)
+
+    # Instance after subsetting, so the instancer only processes the glyphs kept
+    if "fvar" in font:
+        axes = {axis.axisTag: axis for axis in font["fvar"].axes}
+        limits = {}
+        if "wdth" in axes:
+            limits["wdth"] = axes["wdth"].defaultValue
+        if "wght" in axes:
+            weight = axes["wght"]
+            limits["wght"] = (
+                max(weight.minValue, WEIGHT_RANGE[0]),
+                min(weight.maxValue, WEIGHT_RANGE[1]),
+            )
+        if limits:
+            font = instancer.instantiateVariableFont(font, limits)
+
+    font.flavor = "woff2"
+    font.save(target)
+    return set(font.getBestCmap())
+
+
+def build_faces(font_faces, outputs, ranges):
+    """New fontFaces entries: one per family, file and style, pointing at the WOFF2 files"""
+    faces = {}
+    for face in font_faces:
+        url = outputs.get(face["url"], face["url"])
+        style = face.get("style", "normal")
+        style = style if style in FONT_STYLES else "normal"
+        key = (face["family"], url, style)
+        weights = faces.setdefault(key, set())
+        if "weight" in face:
+            weights.update(int(w) for w in str(face["weight"]).split())
+
+    built = []
+    for (family, url, style), weights in faces.items():
+        entry = {"family": family, "url": url, "style": style}
+        if url in ranges:
+            # Variable fonts serve the whole weight range from one file
+            entry["weight"] = f"{WEIGHT_RANGE[0]} {WEIGHT_RANGE[1]}"
+            entry["unicodeRange"] = ranges[url]
+        elif weights:
+            entry["weight"] = str(min(weights)) if len(weights) == 1 else f"{min(weights)} {max(weights)}"
+        built.append(entry)
+    return built
+
+
+def rewrite_font_faces(config_path, faces):
+    """Replace the [[theme.fontFaces]] tables in config.toml, leaving the rest of the file as it is"""
+    with open(config_path, encoding="utf-8") as f:
+        lines = f.read().splitlines()
+
+    kept, insert_at, in_faces = [], None, False
+    for line in lines:
+        stripped = line.strip()
+        if stripped.startswith("["):
+            in_faces = stripped == "[[theme.fontFaces]]"
+            if in_faces:
+                if insert_at is None:
+                    insert_at = len(kept)
+                continue
+        if not in_faces:
+            kept.append(line)
+
+    block = []
+    for face in faces:
+        block.append("[[theme.fontFaces]]")
+        for key, value in face.items():
+            block.append(f"{key}={toml.dumps({'v': value})[4:].strip()}")
+    if insert_at is None:
+        insert_at = 0
+    if insert_at < len(kept) and kept[insert_at].strip():
+        block.append("")
+
+    with open(config_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(kept[:insert_at] + block + kept[insert_at:]) + "\n")
+
+
+def check(config_path):
+    """Report theme fonts that are missing or not yet converted; returns an exit status"""
+    font_faces = toml.load(config_path).get("theme", {}).get("fontFaces", [])
+    problems = font_face_problems(font_faces)
+    for problem in problems:
+        print(problem)
+    print("Theme fonts are subset and compressed" if not problems else f"{len(problems)} font problems found")
+    return 1 if problems else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--config", default=os.path.join(REPO_ROOT, ".streamlit", "config.toml"))
+    parser.add_argument("--text-from", nargs="*", default=[os.path.join(REPO_ROOT, ".streamlit", "secrets.toml")],
+                        help="files whose characters must be kept in addition to Latin")
+    parser.add_argument("--check", action="store_true", help="only report fonts that still need converting")
+    args = parser.parse_args()
+
+    if args.check:
+        sys.exit(check(args.config))
+
+    font_faces = toml.load(args.config).get("theme", {}).get("fontFaces", [])
+    unicodes = collect_unicodes(args.text_from)
+
+    outputs, ranges = {}, {}
+    for face in font_faces:
+        url = face["url"]
+        source = source_font(url)
+        if url in outputs or source is None:
+            continue
+        stem = os.path.splitext(os.path.basename(source))[0]
+        target = os.path.join(STATIC_DIR, f"{stem}-latin.woff2")
+        covered = subset_font(source, target, unicodes)
+        outputs[url] = FONT_URL_PREFIX + os.path.basename(target)
+        ranges[outputs[url]] = unicode_range(covered)
+        print(f"{os.path.basename(source)}: {os.path.getsize(source) / 1024:.0f} KB -> "
+              f"{os.path.basename(target)}: {os.path.getsize(target) / 1024:.0f} KB")
+
+    rewrite_font_faces(args.config, build_faces(font_faces, outputs, ranges))
+    print(f"Updated {args.config}")
+
+
+if __name__ == "__main__":
+    main()
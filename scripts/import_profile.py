@@ -0,0 +1,122 @@
+"""Report the import time of the app's cold start, from ``python -X importtime``.
+
+Imports streamlit and then app.py (as Streamlit does for a new session) in
+a fresh interpreter and reports the total, the slowest top-level imports
+and whether the heavy optional modules were loaded at all. A baseline can
+be saved and compared with a later run, for example before and after a
+change or between container images.
+
+Usage:
+    python scripts/import_profile.py [--module app] [--top 15]
+        [--save baseline.json] [--compare baseline.json]
+
+Run it from a directory with a valid .streamlit/secrets.toml (the
+repository root by default, see --cwd), otherwise app.py stops at the
+configuration check.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules whose presence in a cold start is worth calling out
+WATCHED = ["pandas", "numpy", "pyarrow", "toml", "admin", "admin_settings", "event_info", "storage", "PIL"]
+
+
+def profile(module, cwd):
+    """Cumulative import time in microseconds for every module imported, by name"""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [REPO_ROOT, os.environ.get("PYTHONPATH")])))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import streamlit; import {module}"],
+        cwd=cwd, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        sys.exit(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    times, top_level, pending, children, self_us = {}, [], [], {}, {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or line.count("|") != 2:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit():
+            continue  # header line
+        # Children are printed before their parent, indented two more spaces
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        name = name.strip()
+        times[name] = int(cumulative)
+        if depth == 1:
+            pending.append(name)
+        elif depth == 0:
+            top_level.append(name)
+            children[name], pending = pending, []
+            self_us[name] = int(own)
+    return {
+        "module": module,
+        "total_us": sum(times[name] for name in top_level),
+        "streamlit_us": times.get("streamlit", 0),
+        "module_us": times.get(module, 0),
+        "module_body_us": self_us.get(module, 0),
+        "modules": times,
+        "children": children.get(module, []),
+    }
+
+
+def report(run, top):
+    """Print one profile"""
+    module = run["module"]
+    print(f"Total import time: {run['total_us'] / 1000:.0f} ms "
+          f"(streamlit {run['streamlit_us'] / 1000:.0f} ms, {module} {run['module_us'] / 1000:.0f} ms)")
+    print(f"  of which running {module}'s top-level code: {run['module_body_us'] / 1000:.0f} ms")
+    print()
+    print(f"Slowest imports made by {module}:")
+    for name in sorted(run["children"], key=lambda n: run["modules"][n], reverse=True)[:top]:
+        print(f"  {run['modules'][name] / 1000:>8.1f} ms  {name}")
+    print()
+    print("Heavy modules loaded:")
+    for name in WATCHED:
+        loaded = run["modules"].get(name)
+        print(f"  {name:<15} {f'{loaded / 1000:.1f} ms' if loaded is not None else 'not loaded'}")
+
+
+def compare(run, baseline):
+    """Print the difference from a saved baseline"""
+    delta = run["total_us"] - baseline["total_us"]
+    print()
+    print(f"Baseline total: {baseline['total_us'] / 1000:.0f} ms, now {run['total_us'] / 1000:.0f} ms "
+          f"({delta / 1000:+.0f} ms, {delta / baseline['total_us']:+.0%})")
+    for name in WATCHED:
+        before = baseline["modules"].get(name)
+        after = run["modules"].get(name)
+        if before != after and (before is None or after is None):
+            print(f"  {name}: {'loaded' if before is not None else 'not loaded'} -> "
+                  f"{'loaded' if after is not None else 'not loaded'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="app", help="module to import after streamlit")
+    parser.add_argument("--cwd", default=REPO_ROOT, help="directory to run in (needs .streamlit/secrets.toml)")
+    parser.add_argument("--top", type=int, default=15, help="number of slowest imports to list")
+    parser.add_argument("--runs", type=int, default=3, help="keep the fastest of this many runs")
+    parser.add_argument("--save", help="write this run to a JSON baseline file")
+    parser.add_argument("--compare", help="compare with a JSON baseline file")
+    args = parser.parse_args()
+
+    # The first run warms the OS file cache; the fastest run is the least noisy
+    run = min((profile(args.module, args.cwd) for _ in range(args.runs)), key=lambda r: r["total_us"])
+    report(run, args.top)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(run, json.load(f))
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(run, f, indent=2)
+        print(f"\nSaved baseline to {args.save}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""Load-test RSVP submissions from real guests while bots hammer the form.
+
+Real guests arrive at random times over the test and each submit one RSVP
+from their own session and address. At the same time a few abusive
+clients resubmit every few milliseconds from one address, with a fresh
+session for every attempt (as a bot without cookies would). Every attempt goes
+through the same path as process_submission: rate_limit.acquire(), then the
+background write queue, which commits to a CSV store seeded with existing
+RSVPs. Bot resubmissions replace their earlier party, so each of their
+commits is a full file rewrite.
+
+Three scenarios are run on fresh stores: guests alone, guests under abuse
+without rate limits, and guests under abuse with rate limits. For each, the
+guests' submission latency (until the RSVP is durably queued) is reported
+as p50/p95/p99, with the bot attempts admitted and the storage commits made.
+
+Usage:
+    python scripts/load_rate_limit.py [--guests 100] [--bots 4] [--bot-interval 2]
+        [--duration 5] [--rows 3000] [--shared]
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import rate_limit
+import storage
+from perf import percentile
+from write_queue import WriteQueue
+
+BOT_ADDRESS = "203.0.113.7"
+
+
+class Unlimited:
+    """Buckets that admit every attempt (the app before rate limits)"""
+
+    def take(self, keyed_limits, now=None):
+        return 0.0
+
+
+def make_party(contact, guests=2):
+    """Build the rows for one submitted party"""
+    return [
+        {
+            "timestamp": "2025-06-01 12:00:00",
+            "contact_name": contact,
+            "contact_email": f"{contact.lower().replace(' ', '.')}@example.com",
+            "contact_phone": "+47 40000000",
+            "attending": "Yes",
+            "guest_first_name": f"Guest{guest}",
+            "guest_last_name": "Nordmann",
+            "starter_choice": "Caesar Salad",
+            "main_choice": "Pan-Seared Salmon (GF)",
+            "dessert_choice": "Fruit Tart (V)",
+            "dietary_requirements": "",
+            "comments": "",
+        }
+        for guest in range(guests)
+    ]
+
+
+def run_scenario(args, bots, buckets):
+    """Run one scenario; returns guest latencies (ms), bot attempts, bot admissions and commits"""
+    workdir = tempfile.mkdtemp(prefix="rsvp-load-")
+    try:
+        backend = storage.CsvStorage(os.path.join(workdir, "load.csv"))
+        backend.append([row for i in range(args.rows // 2) for row in make_party(f"Seed {i}")])
+        queue = WriteQueue(backend)
+
+        latencies, bot_counts = [], [0, 0]
+        lock = threading.Lock()
+        stop = threading.Event()
+        start = time.perf_counter()
+
+        def guest(number, arrival):
+            time.sleep(max(0.0, start + arrival - time.perf_counter()))
+            began = time.perf_counter()
+            wait = rate_limit.acquire("rsvp", f"guest-{number}", f"10.0.{number // 250}.{number % 250}", buckets)
+            if not wait:
+                queue.submit(make_party(f"Guest {number}"))
+            with lock:
+                latencies.append((time.perf_counter() - began) * 1000)
+
+        def bot(number):
+            attempts = admitted = 0
+            while not stop.is_set():
+                attempts += 1
+                session = f"bot-{number}-{attempts}"
+                if not rate_limit.acquire("rsvp", session, BOT_ADDRESS, buckets):
+                    admitted += 1
+                    queue.submit(make_party(f"Bot {number}"))
+                stop.wait(args.bot_interval / 1000)
+            with lock:
+                bot_counts[0] += attempts
+                bot_counts[1] += admitted
+
+        threads = [threading.Thread(target=bot, args=(b,)) for b in range(bots)]
+        arrivals = sorted(random.uniform(0, args.duration) for _ in range(args.guests))
+        guests = [threading.Thread(target=guest, args=(g, arrival)) for g, arrival in enumerate(arrivals)]
+        for thread in threads + guests:
+            thread.start()
+        for thread in guests:
+            thread.join()
+        stop.set()
+        for thread in threads:
+            thread.join()
+        queue.close()
+        return latencies, bot_counts[0], bot_counts[1], queue.metrics()['committed_batches']
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--guests", type=int, default=100, help="real guests, one RSVP each")
+    parser.add_argument("--bots", type=int, default=4, help="abusive clients resubmitting in a loop")
+    parser.add_argument("--bot-interval", type=float, default=2, help="milliseconds between a bot's attempts")
+    parser.add_argument("--duration", type=float, default=5, help="seconds over which guests arrive")
+    parser.add_argument("--rows", type=int, default=3000, help="RSVP rows already stored")
+    parser.add_argument("--shared", action="store_true", help="use the SQLite buckets shared by replicas")
+    args = parser.parse_args()
+
+    limits_dir = tempfile.mkdtemp(prefix="rsvp-limits-")
+    scenarios = [
+        ("guests only", 0, Unlimited()),
+        ("bots, no limits", args.bots, Unlimited()),
+        ("bots, rate limited", args.bots, None),
+    ]
+
+    print(f"{'scenario':<20} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'bot attempts':>13} "
+          f"{'admitted':>9} {'commits':>8}")
+    try:
+        for name, bots, buckets in scenarios:
+            if buckets is None:
+                buckets = (rate_limit.SharedBuckets(os.path.join(limits_dir, "limits.db"))
+                           if args.shared else rate_limit.MemoryBuckets())
+            latencies, attempts, admitted, commits = run_scenario(args, bots, buckets)
+            print(f"{name:<20} {percentile(latencies, 0.50):>8.1f} {percentile(latencies, 0.95):>8.1f} "
+                  f"{percentile(latencies, 0.99):>8.1f} {attempts:>13} {admitted:>9} {commits:>8}")
+    finally:
+        shutil.rmtree(limits_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Stress-test concurrent RSVP writes and check that no rows are lost.
+
+Starts several processes, each running several threads, that all submit
+parties to the same storage file at once. Afterwards the stored row count
+is compared with the number of rows submitted and the write throughput is
+reported.
+
+Usage:
+    python scripts/stress_writes.py [--backend csv|sqlite|feather] [--processes 4]
+        [--threads 8] [--submissions 25] [--party-size 3]
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import storage
+
+
+def make_party(process_id, thread_id, submission, party_size):
+    """Build the rows for one submitted party"""
+    contact = f"Contact p{process_id} t{thread_id} s{submission}"
+    return [
+        {
+            "timestamp": "2025-06-01 12:00:00",
+            "contact_name": contact,
+            "contact_email": f"p{process_id}t{thread_id}s{submission}@example.com",
+            "contact_phone": "+47 40000000",
+            "attending": "Yes",
+            "guest_first_name": f"Guest{guest}",
+            "guest_last_name": "Nordmann",
+            "starter_choice": "Caesar Salad",
+            "main_choice": "Pan-Seared Salmon (GF)",
+            "dessert_choice": "Fruit Tart (V)",
+            "dietary_requirements": "",
+            "comments": "",
+        }
+        for guest in range(party_size)
+    ]
+
+
+def run_process(process_id, args, data_file):
+    """Submit parties from several threads within one process"""
+    backend = storage.create_storage(args.backend, data_file, data_file, data_file)
+
+    def worker(thread_id):
+        for submission in range(args.submissions):
+            backend.append(make_party(process_id, thread_id, submission, args.party_size))
+
+    threads = [threading.Thread(target=worker, args=(t,)) for t in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", choices=list(storage.BACKENDS), default="csv")
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--submissions", type=int, default=25)
+    parser.add_argument("--party-size", type=int, default=3)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="rsvp-stress-")
+    data_file = os.path.join(workdir, "stress." + {"csv": "csv", "sqlite": "db", "feather": "feather"}[args.backend])
+
+    # Create the file up front so every writer takes the append path
+    backend = storage.create_storage(args.backend, data_file, data_file, data_file)
+    backend.append(make_party("seed", 0, 0, 1))
+
+    start = time.perf_counter()
+    processes = [
+        multiprocessing.Process(target=run_process, args=(p, args, data_file))
+        for p in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - start
+
+    submissions = args.processes * args.threads * args.submissions
+    expected = 1 + submissions * args.party_size
+    stored = len(backend.load())
+
+    print(f"backend:     {args.backend}")
+    print(f"writers:     {args.processes} processes x {args.threads} threads")
+    print(f"submissions: {submissions} ({expected - 1} rows) in {elapsed:.2f}s")
+    print(f"throughput:  {submissions / elapsed:.0f} submissions/s")
+    print(f"rows stored: {stored} of {expected} expected")
+
+    if stored != expected:
+        print("FAILED: rows were lost or duplicated")
+        sys.exit(1)
+    print("OK: no rows lost")
+
+
+if __name__ == "__main__":
+    main()
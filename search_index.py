@@ -0,0 +1,177 @@
+"""In-memory name search index for the admin Data Export page.
+
+Names are casefolded and accent-normalized (so "Ase" finds "Åse" and
+"Oystein" finds "Øystein"), then indexed by token prefix and by trigram.
+Lookups intersect small posting sets instead of scanning every row, and
+when nothing matches exactly the index falls back to typo-tolerant
+matching against the name vocabulary: candidate names share a trigram with
+the query, or for short queries (where one typo can touch every trigram,
+as in "jahn" for "john") have a length within the typo budget. A swap of
+two adjacent letters counts as one typo.
+"""
+import unicodedata
+from collections import defaultdict
+
+import pandas as pd
+
+# Letters that do not decompose into a base letter plus an accent
+_TRANSLITERATIONS = str.maketrans({
+    'ø': 'o', 'æ': 'ae', 'œ': 'oe', 'ð': 'd', 'þ': 'th', 'ł': 'l', 'đ': 'd', 'ı': 'i'
+})
+
+# Token prefixes shorter than a trigram are indexed directly
+_PREFIX_LENGTHS = (1, 2)
+
+def normalize(text):
+    """Casefold and strip accents from a name"""
+    text = unicodedata.normalize('NFKD', text.casefold())
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return text.translate(_TRANSLITERATIONS)
+
+def _trigrams(text):
+    """Return the set of trigrams of a string"""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+def _max_edits(token):
+    """Number of typos tolerated for a query token of this length"""
+    return 1 if len(token) <= 5 else 2
+
+def _edit_distance(a, b, limit):
+    """Edit distance between a and b, or limit + 1 if it exceeds limit
+
+    Optimal string alignment distance: Levenshtein plus transpositions of
+    adjacent letters ("jhon" is one edit from "john", not two).
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before_previous = None
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            distance = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ca != cb)
+            )
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                distance = min(distance, before_previous[j - 2] + 1)
+            current.append(distance)
+        if min(current) > limit:
+            return limit + 1
+        before_previous, previous = previous, current
+    return previous[-1]
+
+class SearchIndex:
+    """Prefix/trigram index over the name columns of an RSVP frame"""
+
+    def __init__(self, df, columns):
+        self._texts = []
+        self._trigram_rows = defaultdict(set)
+        self._prefix_rows = defaultdict(set)
+        self._token_rows = defaultdict(set)
+        self._trigram_tokens = defaultdict(set)
+        self._length_tokens = defaultdict(list)
+
+        present = [column for column in columns if column in df.columns]
+        values = [df[column].tolist() for column in present]
+        for position in range(len(df)):
+            parts = []
+            for column_values in values:
+                value = column_values[position]
+                if isinstance(value, str) or not pd.isna(value):
+                    parts.append(normalize(str(value)))
+            text = ' '.join(parts)
+            self._texts.append(text)
+
+            for trigram in _trigrams(text):
+                self._trigram_rows[trigram].add(position)
+            for token in text.split():
+                self._token_rows[token].add(position)
+                for length in _PREFIX_LENGTHS:
+                    if len(token) >= length:
+                        self._prefix_rows[token[:length]].add(position)
+
+        for token in self._token_rows:
+            for trigram in _trigrams(token):
+                self._trigram_tokens[trigram].add(token)
+            self._length_tokens[len(token)].append(token)
+
+    def __len__(self):
+        return len(self._texts)
+
+    def _estimate(self, token):
+        """Upper bound on the number of rows a token can match exactly"""
+        if len(token) < 3:
+            return len(self._prefix_rows.get(token, ()))
+        return min(len(self._trigram_rows.get(t, ())) for t in _trigrams(token))
+
+    def _exact(self, token, within=None):
+        """Rows containing the token as a substring (or a name starting with it)"""
+        if len(token) < 3:
+            rows = self._prefix_rows.get(token, set())
+            return set(rows) if within is None else within & rows
+
+        postings = sorted((self._trigram_rows.get(t, set()) for t in _trigrams(token)), key=len)
+        candidates = postings[0] if within is None else within & postings[0]
+        for posting in postings[1:]:
+            if not candidates:
+                return set()
+            candidates = candidates & posting
+        return {position for position in candidates if token in self._texts[position]}
+
+    def _fuzzy(self, token, within=None):
+        """Rows with a name within a few typos of the token (or of its prefix)"""
+        if len(token) < 3:
+            return self._exact(token, within)
+
+        limit = _max_edits(token)
+        shared = defaultdict(int)
+        for trigram in _trigrams(token):
+            for candidate in self._trigram_tokens.get(trigram, ()):
+                shared[candidate] += 1
+
+        # Each edit can break at most three trigrams, a transposition four
+        min_shared = len(token) - 2 - 4 * limit
+        candidates = {candidate for candidate, count in shared.items() if count >= min_shared}
+        if min_shared < 1:
+            # A match may share no trigram at all: scan the names of a close enough length
+            for length in range(len(token) - limit, len(token) + limit + 1):
+                candidates.update(self._length_tokens.get(length, ()))
+
+        letters = set(token)
+        rows = set()
+        for candidate in candidates:
+            # Cheap bound first: each edit brings in at most one letter the name lacks
+            if len(letters.difference(candidate)) > limit:
+                continue
+            distance = min(
+                _edit_distance(token, candidate, limit),
+                _edit_distance(token, candidate[:len(token)], limit)
+            )
+            if distance <= limit:
+                rows |= self._token_rows[candidate]
+        return rows if within is None else within & rows
+
+    def search(self, term, fuzzy=True):
+        """Return (sorted row positions, whether typo-tolerant matching was used)
+
+        Every word of the search term must match the row's contact or guest
+        name. Typo-tolerant matching is only used when nothing matches exactly.
+        """
+        # Most selective word first; later words only check the survivors
+        tokens = sorted(set(normalize(term).split()), key=self._estimate)
+        if not tokens:
+            return list(range(len(self._texts))), False
+
+        for match, is_fuzzy in ((self._exact, False), (self._fuzzy, True)):
+            if is_fuzzy and not fuzzy:
+                break
+            rows = None
+            for token in tokens:
+                rows = match(token, rows)
+                if not rows:
+                    break
+            if rows:
+                return sorted(rows), is_fuzzy
+        return [], False
@@ -0,0 +1,108 @@
+"""SQLite database of data derived from the RSVP data file.
+
+The menu totals and the contact index are kept in one small SQLite file
+next to the data file (``<data file>.derived.db``). The storage layer
+updates them under the data file's write lock after every commit, touching
+only the counts and parties the commit changed, so a commit costs the same
+with 100 stored RSVPs as with 100,000.
+
+The database remembers the data version it was last brought up to date
+with (``source``). If that is not the version before a commit (a crash
+between the two writes, or the data file edited outside the app), the
+derived tables are rebuilt from the data instead of updated.
+"""
+import json
+import os
+import sqlite3
+from contextlib import closing, contextmanager
+
+def sidecar_path(data_path):
+    """Path of the derived-data database kept next to a data file"""
+    return data_path + ".derived.db"
+
+def signature(version):
+    """Normalize a data version to the form stored in the sidecar (JSON lists)"""
+    return json.loads(json.dumps(version))
+
+class Sidecar:
+    """Derived-data database of one data file
+
+    tables is a list of CREATE TABLE/INDEX IF NOT EXISTS statements, one set
+    per kind of derived data.
+    """
+
+    def __init__(self, data_path, tables):
+        self.path = sidecar_path(data_path)
+        self._tables = list(tables)
+
+    def _open(self, path):
+        """Open a connection to a database with the derived-data tables"""
+        conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        try:
+            # Lost in a power cut, the derived data is rebuilt from the data file
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+            for statement in self._tables:
+                conn.execute(statement)
+        except BaseException:
+            conn.close()
+            raise
+        return conn
+
+    def _connect(self):
+        """Open a connection; one per operation keeps Streamlit threads independent"""
+        try:
+            return self._open(self.path)
+        except sqlite3.OperationalError:
+            raise  # Locked, read-only, disk full, ...
+        except sqlite3.DatabaseError:
+            # Not a database (e.g. cut short by a full disk): everything in it can be rebuilt
+            for path in (self.path, self.path + "-wal", self.path + "-shm"):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            return self._open(self.path)
+
+    @contextmanager
+    def read(self):
+        """Connection reading one consistent snapshot of the derived data"""
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN")
+            try:
+                yield conn
+            finally:
+                conn.execute("ROLLBACK")
+
+    @contextmanager
+    def update(self):
+        """Write transaction on the derived data (the caller holds the data file's write lock)
+
+        Committed when the block completes, rolled back if it raises.
+        """
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    @contextmanager
+    def in_memory(self):
+        """Connection to an empty in-memory copy of the tables, when the file is unusable"""
+        with closing(self._open(":memory:")) as conn:
+            yield conn
+
+    def source(self, conn):
+        """The data version the derived data is up to date with, or None"""
+        row = conn.execute("SELECT value FROM meta WHERE name = 'source'").fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def set_source(self, conn, source):
+        """Record the data version the derived data is now up to date with"""
+        conn.execute(
+            "INSERT OR REPLACE INTO meta (name, value) VALUES ('source', ?)", (json.dumps(source),)
+        )
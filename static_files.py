@@ -0,0 +1,37 @@
+"""Files served from Streamlit's static folder (server.enableStaticServing).
+
+Resized images (see image_assets.py) and the theme fonts live under
+static/ next to the app. The theme fonts are referenced from
+[[theme.fontFaces]] in .streamlit/config.toml and converted to WOFF2 by
+scripts/build_fonts.py; font_face_problems() reports the ones that are not.
+"""
+import os
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+
+# How config.toml fontFaces entries refer to files in STATIC_DIR
+FONT_URL_PREFIX = "app/static/"
+
+# Font files that browsers download uncompressed
+UNCOMPRESSED_FONT_EXTENSIONS = (".ttf", ".otf")
+
+def font_face_problems(font_faces=None):
+    """List theme fonts that are missing from static/ or have not been converted to WOFF2
+
+    Defaults to the theme.fontFaces entries of the running app.
+    """
+    if font_faces is None:
+        import streamlit as st
+        font_faces = st.get_option("theme.fontFaces") or []
+
+    problems = []
+    for face in font_faces:
+        url = face.get("url", "")
+        if not url.startswith(FONT_URL_PREFIX):
+            continue
+        name = url[len(FONT_URL_PREFIX):]
+        if not os.path.exists(os.path.join(STATIC_DIR, name)):
+            problems.append(f"Font file static/{name} is missing")
+        elif name.lower().endswith(UNCOMPRESSED_FONT_EXTENSIONS):
+            problems.append(f"Font static/{name} is served uncompressed, run scripts/build_fonts.py")
+    return problems
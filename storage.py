@@ -0,0 +1,1177 @@
+"""Storage backends for RSVP data.
+
+The backend is selected with the ``backend`` setting in the ``[files]``
+section of secrets.toml:
+
+    [files]
+    csv_file = "wedding_rsvps.csv"
+    backend = "csv"            # or "sqlite" or "feather"
+    sqlite_file = "wedding_rsvps.db"
+
+    feather_file = "wedding_rsvps.feather"   # used by backend = "feather"
+
+Run ``python storage.py import-csv`` once to copy an existing CSV file into
+the configured SQLite database or Feather file.
+"""
+import argparse
+import csv
+import glob
+import io
+import os
+import sqlite3
+import threading
+from contextlib import closing, contextmanager
+
+import pandas as pd
+
+import aggregates
+import contact_index
+import schema
+import sidecar
+from atomic_file import atomic_write
+from schema import RSVP_COLUMNS, ROW_ID_COLUMN, PARTY_ID_COLUMN
+from search_index import SearchIndex
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # The Feather backend is optional
+    pa = None
+    feather = None
+
+# Columns matched by the admin name search
+SEARCH_COLUMNS = ["contact_name", "guest_first_name", "guest_last_name"]
+
+def _is_missing(value):
+    """Return True for values that are stored as empty cells"""
+    if value is None:
+        return True
+    try:
+        return bool(pd.isna(value))
+    except (TypeError, ValueError):
+        return False
+
+def _has_value(row, column):
+    """Return True if a row dict has a non-empty value for the column"""
+    value = row.get(column)
+    return not _is_missing(value) and value != ''
+
+def _with_row_id(row, party_id=None):
+    """Return a copy of a row dict that has a row identifier and a party identifier
+
+    Rows without a party get party_id, or a party of their own if it is None.
+    """
+    if _has_value(row, ROW_ID_COLUMN) and _has_value(row, PARTY_ID_COLUMN):
+        return row
+    row = dict(row)
+    if not _has_value(row, ROW_ID_COLUMN):
+        row[ROW_ID_COLUMN] = schema.new_id()
+    if not _has_value(row, PARTY_ID_COLUMN):
+        row[PARTY_ID_COLUMN] = party_id or schema.new_id()
+    return row
+
+def _missing_ids(df, column):
+    """Return a boolean mask of rows without a value in an identifier column"""
+    if column not in df.columns:
+        return pd.Series(True, index=df.index)
+    return df[column].isna() | (df[column].astype('string') == '')
+
+def _missing_row_ids(df):
+    """Return a boolean mask of rows without a row or party identifier"""
+    return _missing_ids(df, ROW_ID_COLUMN) | _missing_ids(df, PARTY_ID_COLUMN)
+
+def _fill_row_ids(df):
+    """Give rows without a row or party identifier new ones (in place); returns True if any were added
+
+    Rows saved before parties were recorded are grouped by contact name and
+    submission timestamp, which is how one submission's guest rows were written.
+    """
+    if not _missing_row_ids(df).any():
+        return False
+
+    missing = _missing_ids(df, ROW_ID_COLUMN)
+    if ROW_ID_COLUMN not in df.columns:
+        df[ROW_ID_COLUMN] = None
+    df[ROW_ID_COLUMN] = df[ROW_ID_COLUMN].astype('object')
+    df.loc[missing, ROW_ID_COLUMN] = [schema.new_id() for _ in range(int(missing.sum()))]
+
+    missing = _missing_ids(df, PARTY_ID_COLUMN)
+    if PARTY_ID_COLUMN not in df.columns:
+        df[PARTY_ID_COLUMN] = None
+    df[PARTY_ID_COLUMN] = df[PARTY_ID_COLUMN].astype('object')
+    if missing.any():
+        keys = [column for column in ("contact_name", "timestamp") if column in df.columns]
+        if keys:
+            groups = df.loc[missing, keys].astype('string').fillna('').groupby(keys, sort=False).ngroup()
+        else:
+            groups = pd.Series(range(int(missing.sum())), index=df.index[missing])
+        party_ids = [schema.new_id() for _ in range(int(groups.max()) + 1)]
+        df.loc[missing, PARTY_ID_COLUMN] = [party_ids[group] for group in groups]
+    return True
+
+def _empty_summary():
+    """Summary counts for an empty RSVP table"""
+    return {
+        'total_rows': 0,
+        'total_contacts': 0,
+        'attending_contacts': 0,
+        'not_attending_contacts': 0,
+        'total_guests': 0
+    }
+
+# Under pandas Copy-on-Write a shallow copy is enough to keep the cached
+# frame untouched by callers; older pandas needs a real copy.
+_COPY_ON_WRITE = int(pd.__version__.split('.')[0]) >= 3
+
+def _file_stat(path):
+    """Return (mtime_ns, size) of a file, or None if it does not exist"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+# One in-process lock per data file, shared by every backend object for it
+_thread_locks = {}
+_thread_locks_guard = threading.Lock()
+
+def _thread_lock_for(path):
+    """Return the in-process write lock for a data file"""
+    key = os.path.abspath(path)
+    with _thread_locks_guard:
+        if key not in _thread_locks:
+            _thread_locks[key] = threading.Lock()
+        return _thread_locks[key]
+
+@contextmanager
+def write_lock(path):
+    """Hold the exclusive write lock for a data file
+
+    A threading.Lock serializes Streamlit sessions within this process and an
+    fcntl lock on a sidecar ``.lock`` file serializes other processes and
+    container replicas sharing the volume. Readers never take this lock.
+    """
+    with _thread_lock_for(path):
+        if fcntl is None:
+            yield
+            return
+        with open(path + ".lock", "a") as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+def summarize_rsvps(df):
+    """Compute every admin summary metric in one aggregation pass
+
+    Groups once on a categorical 'attending' column and takes the distinct
+    contact count and row count per group.
+    """
+    if df.empty or 'attending' not in df.columns or 'contact_name' not in df.columns:
+        summary = _empty_summary()
+        summary['total_rows'] = len(df)
+        return summary
+
+    attending = df['attending'].astype('category')
+    per_status = df.groupby(attending, observed=True)['contact_name'].agg(['nunique', 'size'])
+
+    def status_value(status, column):
+        return int(per_status.at[status, column]) if status in per_status.index else 0
+
+    return {
+        'total_rows': len(df),
+        'total_contacts': int(df['contact_name'].nunique()),
+        'attending_contacts': status_value('Yes', 'nunique'),
+        'not_attending_contacts': status_value('No', 'nunique'),
+        'total_guests': status_value('Yes', 'size')
+    }
+
+class BaseStorage:
+    """Shared read cache for storage backends
+
+    load() parses the underlying file once and serves later calls from a
+    process-wide cache keyed on the data version, i.e. the (mtime_ns, size)
+    of the backing files (a change counter for SQLite) plus a counter of our
+    own writes. Every Streamlit
+    session shares the same backend object, so admin reruns only pay for a
+    parse after the data has actually changed.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._cache_version = None
+        self._cache_df = None
+        self._derived_version = None
+        self._derived = {}
+        self._sidecar = sidecar.Sidecar(path, aggregates.SIDECAR_TABLES + contact_index.SIDECAR_TABLES)
+
+    def _file_paths(self):
+        """Files whose (mtime_ns, size) identify the stored data"""
+        return [self.path]
+
+    def _stored_version(self):
+        """Token identifying the stored data, as seen by every process: the backing files' stats"""
+        return tuple(_file_stat(path) for path in self._file_paths())
+
+    def data_version(self):
+        """Return a token that changes whenever the stored rows change"""
+        return (self._writes,) + self._stored_version()
+
+    def load(self):
+        """Load all RSVP rows (a private copy of the cached frame)"""
+        with self._lock:
+            version = self.data_version()
+            if self._cache_df is None or version != self._cache_version:
+                self._cache_df = self._read()
+                self._cache_version = version
+            df = self._cache_df
+        return df.copy(deep=not _COPY_ON_WRITE)
+
+    def _file_signature(self):
+        """The stored data version, in the form stored in sidecars"""
+        return sidecar.signature(list(self._stored_version()))
+
+    def append(self, rows):
+        """Append rows in one atomic operation
+
+        The rows are one party: rows without a party_id share a new one.
+        """
+        party_id = schema.new_id()
+        rows = [_with_row_id(row, party_id) for row in rows]
+        if not rows:
+            return
+        try:
+            with write_lock(self.path):
+                before = self._file_signature()
+                self._append(rows)
+                self._update_derived(rows, before)
+        finally:
+            self.invalidate()
+
+    def upsert(self, rows):
+        """Commit submitted parties, each replacing an earlier submission of the same party
+
+        A party replaces the stored rows of the same party_id (the same form
+        submitted twice) or, failing that, of the latest party stored under
+        the same normalized contact name and email (found in the contact
+        index). A replacing party keeps the stored party_id. Parties with no
+        earlier submission are appended as by append(). Returns the number
+        of parties that replaced an earlier submission.
+        """
+        party_id = schema.new_id()
+        parties = {}
+        for row in rows:
+            row = dict(_with_row_id(row, party_id))
+            parties.setdefault(row[PARTY_ID_COLUMN], []).append(row)
+        if not parties:
+            return 0
+        try:
+            with write_lock(self.path):
+                before = self._file_signature()
+                committed = False
+                try:
+                    with self._sidecar.update() as conn:
+                        if self._sidecar.source(conn) != before:
+                            # Contacts can only be matched against an up-to-date index
+                            self._rebuild_derived(conn)
+
+                        new_rows, deleted, replaced = self._match_parties(conn, parties)
+                        if deleted:
+                            removed_rows, new_rows = self._patch({}, new_rows, deleted)
+                        else:
+                            # Nothing to replace in storage: the cheap append path
+                            removed_rows = ()
+                            self._append(new_rows)
+                        committed = True
+                        aggregates.apply_rows(conn, new_rows, removed_rows)
+                        self._sidecar.set_source(conn, self._file_signature())
+                except sqlite3.Error:
+                    if not committed:
+                        raise
+                    # The RSVP data is already committed; a stale sidecar is rebuilt on next read
+        finally:
+            self.invalidate()
+        return replaced
+
+    def _match_parties(self, conn, parties):
+        """Match submitted parties to stored ones and index them in the sidecar transaction
+
+        Returns (rows to store, ids of stored rows they replace, number of
+        parties that replaced an earlier submission).
+        """
+        added, deleted, replaced = {}, [], 0
+        for party_id, party_rows in parties.items():
+            if not contact_index.has_party(conn, party_id):
+                first = party_rows[0]
+                key = contact_index.contact_key(first.get('contact_name'), first.get('contact_email'))
+                earlier = contact_index.find_party(conn, key)
+                if earlier is not None:
+                    party_id = earlier
+            if contact_index.has_party(conn, party_id):
+                replaced += 1
+                row_ids = contact_index.remove_party(conn, party_id)
+                # An earlier party in this batch was never stored
+                if added.pop(party_id, None) is None:
+                    deleted.extend(row_ids)
+            for row in party_rows:
+                row[PARTY_ID_COLUMN] = party_id
+            added[party_id] = party_rows
+            contact_index.add_rows(conn, party_rows)
+        return [row for party_rows in added.values() for row in party_rows], deleted, replaced
+
+    def replace(self, df):
+        """Replace the stored rows with the given dataframe"""
+        if not df.empty:
+            _fill_row_ids(df)
+        try:
+            with write_lock(self.path):
+                self._replace(df)
+                self._save_derived(df)
+        finally:
+            self.invalidate()
+
+    def ensure_row_ids(self):
+        """Give every stored row a stable row identifier and party identifier
+
+        Rows saved before identifiers existed are migrated once with a full
+        rewrite; afterwards this is a cheap check against the cached frame.
+        """
+        df = self.load()
+        if df.empty or not _missing_row_ids(df).any():
+            return
+        try:
+            with write_lock(self.path):
+                df = self._read()
+                if not df.empty and _fill_row_ids(df):
+                    self._replace(df)
+                    self._save_derived(df)
+        finally:
+            self.invalidate()
+
+    def patch(self, updates=None, added=None, deleted=None):
+        """Apply row-level edits keyed by row identifier
+
+        updates maps rsvp_id -> {column: new value}, added is a list of new
+        row dicts and deleted a list of rsvp_ids. The edits are applied to the
+        current stored data under the write lock, so rows submitted by guests
+        since the admin loaded the page are kept. Rows that no longer exist
+        are skipped.
+        """
+        updates = updates or {}
+        added = [_with_row_id(row) for row in (added or [])]
+        deleted = list(deleted or [])
+        if not (updates or added or deleted):
+            return
+        try:
+            with write_lock(self.path):
+                before = self._file_signature()
+                removed_rows, new_rows = self._patch(updates, added, deleted)
+                self._update_derived(new_rows, before, removed_rows)
+        finally:
+            self.invalidate()
+
+    def _rebuild_derived(self, conn):
+        """Recount the menu totals and rebuild the contact index from the stored rows"""
+        df = self._read_columns(aggregates.RECOUNT_COLUMNS + contact_index.INDEX_COLUMNS)
+        aggregates.save(conn, aggregates.recount(df))
+        contact_index.rebuild(conn, df)
+
+    def _save_derived(self, df):
+        """Rebuild the derived data from a frame that was just written (caller holds the write lock)"""
+        try:
+            with self._sidecar.update() as conn:
+                aggregates.save(conn, aggregates.recount(df))
+                contact_index.rebuild(conn, df)
+                self._sidecar.set_source(conn, self._file_signature())
+        except sqlite3.Error:
+            # The RSVP data is already committed; a stale sidecar is rebuilt on next read
+            pass
+
+    def _update_derived(self, rows, before, removed_rows=()):
+        """Fold committed rows into the menu totals and contact index (caller holds the write lock)"""
+        try:
+            with self._sidecar.update() as conn:
+                if self._sidecar.source(conn) == before:
+                    aggregates.apply_rows(conn, rows, removed_rows)
+                    contact_index.remove_rows(conn, removed_rows)
+                    contact_index.add_rows(conn, rows)
+                else:
+                    # Missing sidecar or the data was changed outside the app: rebuild
+                    self._rebuild_derived(conn)
+                self._sidecar.set_source(conn, self._file_signature())
+        except sqlite3.Error:
+            # The RSVP data is already committed; a stale sidecar is rebuilt on next read
+            pass
+
+    def _current_derived(self, read):
+        """Return read(conn) on the derived data, rebuilding it first if it does not match the data file"""
+        try:
+            with self._sidecar.read() as conn:
+                if self._sidecar.source(conn) == self._file_signature():
+                    return read(conn)
+        except sqlite3.Error:
+            pass  # Unreadable sidecar: rebuild it
+
+        with write_lock(self.path):
+            try:
+                with self._sidecar.update() as conn:
+                    # Another session may have rebuilt it while we waited for the lock
+                    if self._sidecar.source(conn) != self._file_signature():
+                        self._rebuild_derived(conn)
+                        self._sidecar.set_source(conn, self._file_signature())
+                    return read(conn)
+            except sqlite3.Error:
+                # Unusable sidecar file (e.g. a full disk): answer from a rebuild in memory
+                with self._sidecar.in_memory() as conn:
+                    self._rebuild_derived(conn)
+                    return read(conn)
+
+    def menu_aggregates(self):
+        """Return the running menu totals and dietary notes for attending guests"""
+        return self.derived('menu_aggregates', lambda: self._current_derived(aggregates.load))
+
+    def contact_index(self):
+        """Return the index of stored parties by normalized contact name and email"""
+        return self.derived('contact_index', lambda: self._current_derived(contact_index.load))
+
+    def find_party(self, contact_name, contact_email):
+        """Return the index entry of the latest party stored for a contact, or None"""
+        key = contact_index.contact_key(contact_name, contact_email)
+        return self._current_derived(lambda conn: contact_index.get_party(conn, contact_index.find_party(conn, key)))
+
+    def peek_party(self, contact_name, contact_email):
+        """find_party() that never waits for the write lock or a rebuild
+
+        Returns (True, entry or None) from up-to-date derived data, or
+        (False, None) while a commit is updating it or it needs a rebuild.
+        """
+        key = contact_index.contact_key(contact_name, contact_email)
+        try:
+            with self._sidecar.read() as conn:
+                if self._sidecar.source(conn) == self._file_signature():
+                    return True, contact_index.get_party(conn, contact_index.find_party(conn, key))
+        except sqlite3.Error:
+            pass
+        return False, None
+
+    def get_party(self, party_id):
+        """Return the index entry of a stored party, or None"""
+        return self._current_derived(lambda conn: contact_index.get_party(conn, party_id))
+
+    def duplicate_parties(self):
+        """Return groups of stored parties that share a contact name or email"""
+        return self.derived('duplicate_parties', lambda: contact_index.duplicates(self.contact_index()))
+
+    def verify_menu_aggregates(self):
+        """Compare the stored menu totals with a full recount; returns a list of differences"""
+        try:
+            with self._sidecar.read() as conn:
+                stored = aggregates.load(conn)
+        except sqlite3.Error:
+            stored = aggregates.empty_aggregates()
+        return aggregates.compare(stored, aggregates.recount(self.load()))
+
+    def _read_columns(self, columns):
+        """Read only the given columns (those that exist) of every row"""
+        df = self._read()
+        return df[[column for column in columns if column in df.columns]]
+
+    def invalidate(self):
+        """Drop the cached frame after a write"""
+        with self._lock:
+            self._writes += 1
+            self._cache_df = None
+            self._cache_version = None
+            self._derived = {}
+            self._derived_version = None
+
+    def derived(self, key, compute):
+        """Return compute() memoized for the current data version
+
+        Used for results derived from the whole table (summary metrics,
+        recent rows, ...) so they are computed once per change of the data
+        rather than on every admin rerun.
+        """
+        version = self.data_version()
+        with self._lock:
+            if version != self._derived_version:
+                self._derived = {}
+                self._derived_version = version
+            if key in self._derived:
+                return self._derived[key]
+
+        value = compute()
+        with self._lock:
+            if version == self._derived_version:
+                self._derived[key] = value
+        return value
+
+    def summary_counts(self):
+        """Return the headline counts shown on the admin summary page"""
+        return dict(self.derived('summary_counts', self._summary_counts))
+
+    def recent(self, limit=10):
+        """Return the most recently submitted rows, newest first"""
+        df = self.derived(('recent', limit), lambda: self._recent(limit))
+        return df.copy(deep=not _COPY_ON_WRITE)
+
+    def _build_search_index(self):
+        """Load the rows and index their names"""
+        df = self.load()
+        return df, SearchIndex(df, SEARCH_COLUMNS)
+
+    def search(self, term):
+        """Return rows whose contact or guest name matches the search term
+
+        Uses the in-memory SearchIndex, rebuilt only when the data version
+        changes. The result keeps the index labels of load(), so it can be
+        merged back into the full frame with DataFrame.update, and
+        result.attrs['fuzzy'] is True when only typo-tolerant matches were found.
+        """
+        df, index = self.derived('search_index', self._build_search_index)
+        positions, is_fuzzy = index.search(term)
+        result = df.iloc[positions].copy(deep=not _COPY_ON_WRITE)
+        result.attrs['fuzzy'] = is_fuzzy
+        return result
+
+def _patch_frame(df, updates, added, deleted):
+    """Apply keyed edits to a full frame; returns (frame, removed rows, new rows)
+
+    Used by backends that rewrite the whole file on every edit.
+    """
+    if not df.empty:
+        _fill_row_ids(df)
+    position_by_id = {row_id: i for i, row_id in enumerate(df.get(ROW_ID_COLUMN, []))}
+    removed_rows, new_rows = [], []
+
+    for row_id, changes in updates.items():
+        position = position_by_id.get(row_id)
+        if position is None:
+            continue
+        label = df.index[position]
+        removed_rows.append(df.loc[label].to_dict())
+        for column, value in changes.items():
+            if column in (ROW_ID_COLUMN, PARTY_ID_COLUMN):
+                continue
+            if column not in df.columns:
+                df[column] = None
+            if df[column].dtype != object:
+                df[column] = df[column].astype('object')
+            df.at[label, column] = schema.to_storage_value(column, value)
+        new_rows.append(df.loc[label].to_dict())
+
+    drop_labels = []
+    for row_id in deleted:
+        position = position_by_id.get(row_id)
+        if position is not None:
+            label = df.index[position]
+            removed_rows.append(df.loc[label].to_dict())
+            drop_labels.append(label)
+    if drop_labels:
+        df = df.drop(index=drop_labels)
+
+    if added:
+        df = pd.concat([df, pd.DataFrame(added)], ignore_index=True)
+        new_rows.extend(added)
+
+    return df, removed_rows, new_rows
+
+class CsvStorage(BaseStorage):
+    """RSVP rows stored in a single CSV file"""
+
+    def _read(self):
+        """Parse the CSV file into the declared column types"""
+        if os.path.exists(self.path):
+            try:
+                return schema.apply_schema(pd.read_csv(self.path, dtype=schema.csv_dtypes()))
+            except:
+                return pd.DataFrame()
+        return pd.DataFrame()
+
+    def iter_chunks(self, chunksize):
+        """Yield the stored rows as text dataframes of at most chunksize rows"""
+        if not os.path.exists(self.path):
+            return
+        try:
+            reader = pd.read_csv(self.path, dtype=str, keep_default_na=False, chunksize=chunksize)
+            with reader:
+                yield from reader
+        except pd.errors.EmptyDataError:
+            return
+
+    def _append(self, rows):
+        """Append rows in one atomic operation
+
+        Rows are appended to the end of the file in a single write, so the cost
+        of a submission does not grow with the number of RSVPs already stored.
+        The file is only rewritten (atomically, via a temporary file) when it is
+        new or the rows introduce a column the file does not have yet.
+        """
+        header = self._read_header()
+        columns = set()
+        for row in rows:
+            columns.update(row)
+
+        if header and columns.issubset(header):
+            self._append_rows(header, rows)
+            return
+
+        # New file, empty file or new columns: fall back to a full rewrite
+        df = self._read()
+        df = pd.concat([df, pd.DataFrame(rows)], ignore_index=True)
+        if not header:
+            df = schema.order_columns(df)
+        self._replace(df)
+
+    def _replace(self, df):
+        """Rewrite the CSV file atomically via a temporary file"""
+        with atomic_write(self.path, fsync=True, newline='', encoding='utf-8') as f:
+            df.to_csv(f, index=False, date_format=schema.TIMESTAMP_FORMAT)
+
+    def _patch(self, updates, added, deleted):
+        """Apply keyed edits to the current file contents and rewrite it atomically
+
+        A CSV file cannot be edited in place, so the file is re-read under the
+        write lock and rewritten; only the addressed rows are touched.
+        """
+        df, removed_rows, new_rows = _patch_frame(self._read(), updates, added, deleted)
+        self._replace(df)
+        return removed_rows, new_rows
+
+    def _read_columns(self, columns):
+        """Parse only the given columns of the CSV file"""
+        wanted = set(columns)
+        if os.path.exists(self.path):
+            try:
+                df = pd.read_csv(self.path, dtype=schema.csv_dtypes(), usecols=lambda column: column in wanted)
+                return schema.apply_schema(df)
+            except:
+                return pd.DataFrame()
+        return pd.DataFrame()
+
+    def _summary_counts(self):
+        """Aggregate the summary metrics from the cached frame"""
+        return summarize_rsvps(self.load())
+
+    def _recent(self, limit):
+        """Select the newest rows without sorting the whole frame"""
+        df = self.load()
+        if df.empty or 'timestamp' not in df.columns:
+            return df.head(0)
+        return df.loc[df['timestamp'].nlargest(limit).index]
+
+    def _read_header(self):
+        """Return the column names of the CSV file, or None if it has no header"""
+        try:
+            with open(self.path, newline='', encoding='utf-8') as f:
+                return next(csv.reader(f), None)
+        except FileNotFoundError:
+            return None
+
+    def _append_rows(self, header, rows):
+        """Append rows without reading or rewriting the existing contents"""
+        with open(self.path, 'a+b') as f:
+            original_size = f.tell()
+
+            # Make sure we start on a fresh line if the file was edited by hand
+            if original_size > 0:
+                f.seek(-1, os.SEEK_END)
+                needs_newline = f.read(1) not in (b'\n', b'\r')
+            else:
+                needs_newline = False
+
+            buffer = io.StringIO()
+            writer = csv.writer(buffer, lineterminator=os.linesep)
+            for row in rows:
+                writer.writerow([schema.to_storage_value(column, row.get(column)) for column in header])
+            payload = buffer.getvalue().encode('utf-8')
+            if needs_newline:
+                payload = os.linesep.encode('utf-8') + payload
+
+            # A single write keeps the appended rows together on disk. If it fails
+            # part way, cut the file back so no partial party is left behind.
+            try:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            except BaseException:
+                f.truncate(original_size)
+                raise
+
+def _quote(name):
+    """Quote an SQL identifier"""
+    return '"' + str(name).replace('"', '""') + '"'
+
+class SqliteStorage(BaseStorage):
+    """RSVP rows stored in a SQLite database (WAL mode) with indexed columns"""
+
+    def __init__(self, path):
+        super().__init__(path)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS rsvps ("
+                    "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                    + ", ".join(f"{_quote(column)} TEXT" for column in RSVP_COLUMNS)
+                    + ")"
+                )
+                self._ensure_columns(conn, [ROW_ID_COLUMN, PARTY_ID_COLUMN])
+                conn.execute("CREATE TABLE IF NOT EXISTS rsvp_changes (changes INTEGER NOT NULL)")
+                conn.execute(
+                    "INSERT INTO rsvp_changes (changes) SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM rsvp_changes)"
+                )
+                for column in ("contact_name", "attending", "timestamp", ROW_ID_COLUMN, PARTY_ID_COLUMN):
+                    conn.execute(
+                        f"CREATE INDEX IF NOT EXISTS idx_rsvps_{column} ON rsvps ({_quote(column)})"
+                    )
+
+    def _connect(self):
+        """Open a connection; one per operation keeps Streamlit threads independent"""
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _columns(self, conn):
+        """Return the data columns of the rsvps table, in table order"""
+        return [row[1] for row in conn.execute("PRAGMA table_info(rsvps)") if row[1] != 'id']
+
+    def _ensure_columns(self, conn, columns):
+        """Add any columns the table does not have yet"""
+        existing = self._columns(conn)
+        for column in columns:
+            if column not in existing:
+                conn.execute(f"ALTER TABLE rsvps ADD COLUMN {_quote(column)} TEXT")
+                existing.append(column)
+        return existing
+
+    def _insert(self, conn, columns, rows):
+        """Insert rows, storing missing values and empty strings as NULL"""
+        placeholders = ", ".join("?" for _ in columns)
+        sql = f"INSERT INTO rsvps ({', '.join(_quote(c) for c in columns)}) VALUES ({placeholders})"
+        values = []
+        for row in rows:
+            record = []
+            for column in columns:
+                value = schema.to_storage_value(column, row.get(column))
+                record.append(value if value != '' else None)
+            values.append(record)
+        conn.executemany(sql, values)
+
+    def _query(self, conn, sql, params=()):
+        """Run a SELECT and return a dataframe shaped like load()"""
+        df = pd.read_sql_query(sql, conn, params=params, index_col='_row')
+        df.index.name = None
+        return schema.apply_schema(df)
+
+    def _select(self, conn, where='', order='', limit=None, params=()):
+        """Select rows with a positional index matching load()"""
+        columns = ", ".join(_quote(c) for c in self._columns(conn))
+        sql = (
+            "SELECT * FROM ("
+            f"SELECT ROW_NUMBER() OVER (ORDER BY id) - 1 AS _row, id, {columns} FROM rsvps"
+            ")"
+        )
+        if where:
+            sql += f" WHERE {where}"
+        sql += f" ORDER BY {order or 'id'}"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        return self._query(conn, sql, params).drop(columns='id')
+
+    def _count_change(self, conn):
+        """Bump the change counter, inside the transaction of a write"""
+        conn.execute("UPDATE rsvp_changes SET changes = changes + 1")
+
+    def _stored_version(self):
+        """The database file and the change counter bumped by every write transaction
+
+        File stats cannot be used: WAL checkpoints rewrite the database and
+        its -wal file whenever the last connection closes, with no row changed.
+        """
+        stat = _file_stat(self.path)
+        if stat is None:
+            return (None,)
+        with closing(self._connect()) as conn:
+            changes = conn.execute("SELECT changes FROM rsvp_changes").fetchone()[0]
+        return ((os.stat(self.path).st_ino, changes),)
+
+    def _read(self):
+        """Read every row from the database"""
+        with closing(self._connect()) as conn:
+            if conn.execute("SELECT 1 FROM rsvps LIMIT 1").fetchone() is None:
+                return pd.DataFrame()
+            columns = ", ".join(_quote(c) for c in self._columns(conn))
+            df = pd.read_sql_query(f"SELECT {columns} FROM rsvps ORDER BY id", conn)
+        return schema.apply_schema(df)
+
+    def _read_columns(self, columns):
+        """Select only the given columns of every row"""
+        with closing(self._connect()) as conn:
+            present = [column for column in columns if column in self._columns(conn)]
+            if not present:
+                return pd.DataFrame()
+            df = pd.read_sql_query(
+                f"SELECT {', '.join(_quote(c) for c in present)} FROM rsvps ORDER BY id", conn
+            )
+        return schema.apply_schema(df)
+
+    def iter_chunks(self, chunksize):
+        """Yield the stored rows as dataframes of at most chunksize rows"""
+        with closing(self._connect()) as conn:
+            columns = ", ".join(_quote(c) for c in self._columns(conn))
+            yield from pd.read_sql_query(
+                f"SELECT {columns} FROM rsvps ORDER BY id", conn, chunksize=chunksize
+            )
+
+    def _append(self, rows):
+        """Append rows in a single transaction"""
+        columns = []
+        for row in rows:
+            for column in row:
+                if column not in columns:
+                    columns.append(column)
+        with closing(self._connect()) as conn:
+            with conn:
+                self._ensure_columns(conn, columns)
+                self._insert(conn, columns, rows)
+                self._count_change(conn)
+
+    def _replace(self, df):
+        """Replace the stored rows with the given dataframe in a single transaction"""
+        columns = [str(column) for column in df.columns]
+        rows = df.rename(columns=str).to_dict('records')
+        with closing(self._connect()) as conn:
+            with conn:
+                self._ensure_columns(conn, columns)
+                conn.execute("DELETE FROM rsvps")
+                self._insert(conn, columns, rows)
+                self._count_change(conn)
+
+    def _fetch_row(self, conn, columns, row_id):
+        """Return one row as a dict, or None"""
+        row = conn.execute(
+            f"SELECT {', '.join(_quote(c) for c in columns)} FROM rsvps WHERE {_quote(ROW_ID_COLUMN)} = ?",
+            (row_id,)
+        ).fetchone()
+        return dict(zip(columns, row)) if row is not None else None
+
+    def _patch(self, updates, added, deleted):
+        """Apply keyed edits with indexed UPDATE/DELETE/INSERT statements in one transaction"""
+        removed_rows, new_rows = [], []
+        with closing(self._connect()) as conn:
+            with conn:
+                id_columns = (ROW_ID_COLUMN, PARTY_ID_COLUMN)
+                changed_columns = {c for changes in updates.values() for c in changes if c not in id_columns}
+                for row in added:
+                    changed_columns.update(row)
+                columns = self._ensure_columns(conn, sorted(changed_columns))
+
+                for row_id, changes in updates.items():
+                    changes = {c: v for c, v in changes.items() if c not in id_columns}
+                    old_row = self._fetch_row(conn, columns, row_id)
+                    if old_row is None or not changes:
+                        continue
+                    assignments = ", ".join(f"{_quote(c)} = ?" for c in changes)
+                    changes = {c: schema.to_storage_value(c, v) for c, v in changes.items()}
+                    values = [v if v != '' else None for v in changes.values()]
+                    conn.execute(
+                        f"UPDATE rsvps SET {assignments} WHERE {_quote(ROW_ID_COLUMN)} = ?",
+                        values + [row_id]
+                    )
+                    removed_rows.append(old_row)
+                    new_rows.append(dict(old_row, **changes))
+
+                for row_id in deleted:
+                    old_row = self._fetch_row(conn, columns, row_id)
+                    if old_row is not None:
+                        conn.execute(f"DELETE FROM rsvps WHERE {_quote(ROW_ID_COLUMN)} = ?", (row_id,))
+                        removed_rows.append(old_row)
+
+                if added:
+                    insert_columns = []
+                    for row in added:
+                        for column in row:
+                            if column not in insert_columns:
+                                insert_columns.append(column)
+                    self._insert(conn, insert_columns, added)
+                    new_rows.extend(added)
+                self._count_change(conn)
+        return removed_rows, new_rows
+
+    def _summary_counts(self):
+        """Count responses and guests in SQL"""
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT "
+                "COUNT(*), "
+                "COUNT(DISTINCT contact_name), "
+                "COUNT(DISTINCT CASE WHEN attending = 'Yes' THEN contact_name END), "
+                "COUNT(DISTINCT CASE WHEN attending = 'No' THEN contact_name END), "
+                "COUNT(CASE WHEN attending = 'Yes' THEN 1 END) "
+                "FROM rsvps"
+            ).fetchone()
+        return {
+            'total_rows': row[0],
+            'total_contacts': row[1],
+            'attending_contacts': row[2],
+            'not_attending_contacts': row[3],
+            'total_guests': row[4]
+        }
+
+    def _recent(self, limit):
+        """Select the newest rows using the timestamp index"""
+        with closing(self._connect()) as conn:
+            return self._select(conn, order='timestamp DESC, id', limit=limit)
+
+# Rows appended to a Feather store are collected in a CSV journal, which is
+# folded into the Feather file once it grows past this size
+FEATHER_JOURNAL_BYTES = 1 << 20
+
+# Schema metadata key holding the generation number of a Feather file
+_GENERATION_KEY = b'rsvp_generation'
+
+class FeatherStorage(BaseStorage):
+    """RSVP rows stored column by column in an uncompressed Feather (Arrow IPC) file
+
+    The file is memory-mapped, so reads that need only some columns (menu
+    totals, summary counts, recent rows) never touch the pages of the others.
+    Feather files cannot be appended to, so new submissions go to a small CSV
+    journal (``<file>.journal-<generation>.csv``) that is merged on read and
+    folded into the Feather file once it grows past FEATHER_JOURNAL_BYTES.
+    Each rewrite bumps the generation stored in the file, which names its
+    journal, so a crash between a rewrite and deleting the absorbed journal
+    cannot duplicate rows.
+    """
+
+    def __init__(self, path):
+        if feather is None:
+            raise RuntimeError("The feather storage backend requires pyarrow")
+        super().__init__(path)
+        self._generation_cache = (None, 0)
+
+    def _generation(self):
+        """Generation number of the Feather file (0 before it is first written)"""
+        stat = _file_stat(self.path)
+        if stat is None:
+            return 0
+        cached_stat, generation = self._generation_cache
+        if stat != cached_stat:
+            with pa.memory_map(self.path) as source:
+                metadata = pa.ipc.open_file(source).schema.metadata or {}
+            generation = int(metadata.get(_GENERATION_KEY, b'0'))
+            self._generation_cache = (stat, generation)
+        return generation
+
+    def _journal(self, generation=None):
+        """The CSV journal of a generation (by default the current one)"""
+        if generation is None:
+            generation = self._generation()
+        return CsvStorage(f"{self.path}.journal-{generation}.csv")
+
+    def _file_paths(self):
+        """The Feather file and its current journal"""
+        return [self.path, self._journal().path]
+
+    def _read_table(self, columns=None):
+        """Memory-map the Feather file as an Arrow table, or None if it does not exist"""
+        if _file_stat(self.path) is None:
+            return None
+        # Uncompressed record batches are read zero-copy from the mapping
+        table = pa.ipc.open_file(pa.memory_map(self.path)).read_all()
+        if columns is not None:
+            table = table.select([column for column in columns if column in table.column_names])
+        return table
+
+    def _read_frame(self, columns=None):
+        """Read the given columns (all if None) of the Feather file and journal"""
+        table = self._read_table(columns)
+        base = table.to_pandas() if table is not None else pd.DataFrame()
+        journal = self._journal()
+        recent = journal._read() if columns is None else journal._read_columns(columns)
+        if recent.empty:
+            df = base
+        elif base.empty:
+            df = recent
+        else:
+            df = pd.concat([base, recent], ignore_index=True)
+        return schema.apply_schema(df)
+
+    def _read(self):
+        """Read every row"""
+        return self._read_frame()
+
+    def _read_columns(self, columns):
+        """Read only the given columns, leaving the others unmapped"""
+        return self._read_frame(columns)
+
+    def iter_chunks(self, chunksize):
+        """Yield the stored rows as text dataframes of at most chunksize rows"""
+        table = self._read_table()
+        journal = self._journal()
+        columns = list(table.column_names) if table is not None else []
+        columns += [column for column in journal._read_header() or [] if column not in columns]
+
+        if table is not None:
+            for batch in table.to_batches(max_chunksize=chunksize):
+                chunk = schema.to_text_frame(schema.apply_schema(batch.to_pandas()))
+                yield chunk.reindex(columns=columns, fill_value='')
+        for chunk in journal.iter_chunks(chunksize):
+            yield chunk.reindex(columns=columns, fill_value='')
+
+    def _write(self, df, generation):
+        """Atomically write a full frame as the Feather file of a generation"""
+        table = pa.Table.from_pandas(schema.coerce_frame(df), preserve_index=False)
+        metadata = dict(table.schema.metadata or {})
+        metadata[_GENERATION_KEY] = str(generation).encode()
+        table = table.replace_schema_metadata(metadata)
+
+        with atomic_write(self.path, 'wb', fsync=True) as f:
+            # Memory mapping needs uncompressed record batches
+            feather.write_feather(table, f, compression='uncompressed')
+
+    def _append(self, rows):
+        """Append rows to the journal, folding it into the Feather file when it is large"""
+        journal = self._journal()
+        journal._append(rows)
+        if os.path.getsize(journal.path) > FEATHER_JOURNAL_BYTES:
+            self._replace(self._read())
+
+    def _replace(self, df):
+        """Write the rows as the next generation of the Feather file and drop old journals"""
+        generation = self._generation() + 1
+        self._write(df, generation)
+        current = self._journal(generation).path
+        for path in glob.glob(glob.escape(self.path) + ".journal-*.csv"):
+            if path != current:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def _patch(self, updates, added, deleted):
+        """Apply keyed edits to the current rows and write a new generation"""
+        df, removed_rows, new_rows = _patch_frame(self._read(), updates, added, deleted)
+        self._replace(df)
+        return removed_rows, new_rows
+
+    def _summary_counts(self):
+        """Aggregate the summary metrics from the two columns they need"""
+        return summarize_rsvps(self._read_columns(['attending', 'contact_name']))
+
+    def _recent(self, limit):
+        """Select the newest rows by timestamp, then read only those rows"""
+        timestamps = self._read_columns(['timestamp'])
+        if timestamps.empty or 'timestamp' not in timestamps.columns:
+            return pd.DataFrame()
+        positions = list(timestamps['timestamp'].nlargest(limit).index)
+
+        table = self._read_table()
+        base_rows = table.num_rows if table is not None else 0
+        parts = []
+        in_base = [p for p in positions if p < base_rows]
+        if in_base:
+            parts.append(table.take(in_base).to_pandas().set_axis(in_base))
+        in_journal = [p for p in positions if p >= base_rows]
+        if in_journal:
+            recent = self._journal()._read()
+            parts.append(recent.iloc[[p - base_rows for p in in_journal]].set_axis(in_journal))
+        return schema.apply_schema(pd.concat(parts).loc[positions])
+
+_storages = {}
+_storages_guard = threading.Lock()
+
+BACKENDS = ("csv", "sqlite", "feather")
+
+def create_storage(backend, csv_file, sqlite_file=None, feather_file=None):
+    """Create a storage backend by name"""
+    if backend == "csv":
+        return CsvStorage(csv_file)
+    if backend == "sqlite":
+        return SqliteStorage(sqlite_file or os.path.splitext(csv_file)[0] + ".db")
+    if backend == "feather":
+        return FeatherStorage(feather_file or os.path.splitext(csv_file)[0] + ".feather")
+    raise ValueError(f"Unknown storage backend '{backend}' (expected one of {', '.join(BACKENDS)})")
+
+def get_storage():
+    """Return the storage backend configured in the [files] section of secrets.toml"""
+    from config import get_config
+
+    files = get_config().files
+    backend = files.backend
+    csv_file = files.csv_file
+    sqlite_file = files.sqlite_file or None
+    feather_file = files.feather_file or None
+
+    key = (backend, csv_file, sqlite_file, feather_file)
+    with _storages_guard:
+        if key not in _storages:
+            _storages[key] = create_storage(backend, csv_file, sqlite_file, feather_file)
+        return _storages[key]
+
+def import_csv(csv_file, storage):
+    """Copy every row of a CSV file into another storage backend"""
+    df = CsvStorage(csv_file).load()
+    if df.empty:
+        return 0
+    storage.replace(df)
+    return len(df)
+
+def main():
+    """Command line entry point for storage maintenance tasks"""
+    parser = argparse.ArgumentParser(description="RSVP storage maintenance")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = subparsers.add_parser(
+        "import-csv", help="Copy the CSV file into the SQLite database or Feather file"
+    )
+    import_parser.add_argument("--csv", help="CSV file to import (defaults to [files] csv_file)")
+    import_parser.add_argument(
+        "--to", choices=["sqlite", "feather"],
+        help="Backend to import into (defaults to [files] backend, or sqlite if that is csv)"
+    )
+    import_parser.add_argument("--db", help="SQLite database to create (defaults to [files] sqlite_file)")
+    import_parser.add_argument("--feather", help="Feather file to create (defaults to [files] feather_file)")
+    import_parser.add_argument("--force", action="store_true", help="Overwrite a target that already has rows")
+
+    subparsers.add_parser("check-aggregates", help="Verify the stored menu totals against a full recount")
+
+    args = parser.parse_args()
+
+    if args.command == "check-aggregates":
+        storage = get_storage()
+        problems = storage.verify_menu_aggregates()
+        for problem in problems:
+            print(problem)
+        print("Menu totals are consistent" if not problems else f"{len(problems)} inconsistencies found")
+        raise SystemExit(1 if problems else 0)
+
+    if args.command == "import-csv":
+        csv_file, backend = args.csv, args.to
+        sqlite_file, feather_file = args.db, args.feather
+        if csv_file is None or backend is None or (sqlite_file or feather_file) is None:
+            from config import get_config
+            files = get_config().files
+            csv_file = csv_file or files.csv_file
+            if backend is None:
+                backend = files.backend if files.backend in ("sqlite", "feather") else "sqlite"
+            sqlite_file = sqlite_file or files.sqlite_file or None
+            feather_file = feather_file or files.feather_file or None
+
+        storage = create_storage(backend, csv_file, sqlite_file, feather_file)
+        if not storage.load().empty and not args.force:
+            parser.error(f"{storage.path} already contains RSVPs; use --force to overwrite")
+
+        count = import_csv(csv_file, storage)
+        print(f"Imported {count} rows from {csv_file} into {storage.path}")
+
+if __name__ == "__main__":
+    main()
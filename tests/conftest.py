@@ -0,0 +1,41 @@
+import os
+import sys
+
+import pytest
+
+# The app modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import storage
+
+
+@pytest.fixture(params=storage.BACKENDS)
+def backend(request, tmp_path):
+    """An empty storage backend of each kind, in a temporary directory"""
+    if request.param == "feather":
+        pytest.importorskip("pyarrow")
+    return storage.create_storage(request.param, str(tmp_path / "rsvps.csv"))
+
+
+def make_party(party_id, contact_name, contact_email, guests, attending="Yes",
+               timestamp="2025-06-01 12:00:00"):
+    """Rows of one submitted party; guests is a list of (first name, last name, main choice, dietary)"""
+    return [
+        {
+            "rsvp_id": f"{party_id}-{number}",
+            "party_id": party_id,
+            "timestamp": timestamp,
+            "contact_name": contact_name,
+            "contact_email": contact_email,
+            "contact_phone": "+47 40000000",
+            "attending": attending,
+            "guest_first_name": first_name,
+            "guest_last_name": last_name,
+            "starter_choice": "Caesar Salad" if attending == "Yes" else "",
+            "main_choice": main_choice if attending == "Yes" else "",
+            "dessert_choice": "Fruit Tart (V)" if attending == "Yes" else "",
+            "dietary_requirements": dietary,
+            "comments": "",
+        }
+        for number, (first_name, last_name, main_choice, dietary) in enumerate(guests)
+    ]
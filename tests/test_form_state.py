@@ -0,0 +1,34 @@
+"""Per-session RSVP form state."""
+import form_state
+from form_state import RsvpForm, MAX_GUESTS
+
+
+def test_reset_moves_to_new_widget_keys(monkeypatch):
+    session_state = {}
+    monkeypatch.setattr(form_state.st, "session_state", session_state)
+    form = form_state.get_form()
+    form.add_guest()
+    form.form_data = {"contact_name": "Kari Dahl"}
+
+    new_form = form_state.reset_form()
+    assert session_state[form_state.FORM_STATE_KEY] is new_form
+    assert new_form.key("contact_name") != form.key("contact_name")
+    assert new_form.guests == [0]
+    assert new_form.form_data == {}
+    assert new_form.submission_id != form.submission_id
+
+
+def test_guest_ids_are_stable_and_bounded():
+    form = RsvpForm()
+    for _ in range(MAX_GUESTS + 5):
+        form.add_guest()
+    assert len(form.guests) == MAX_GUESTS
+
+    form.remove_guest(1)
+    assert form.guests[:2] == [0, 2]
+    assert form.key("main", 2) == "rsvp0_main_2"
+
+    # The last guest stays
+    for guest_id in list(form.guests):
+        form.remove_guest(guest_id)
+    assert len(form.guests) == 1
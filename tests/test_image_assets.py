@@ -0,0 +1,64 @@
+"""Resized image variants are built off the page render."""
+import time
+
+import pytest
+
+import image_assets
+
+Image = pytest.importorskip("PIL.Image")
+
+
+@pytest.fixture
+def variant_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(image_assets, "VARIANT_DIR", str(tmp_path / "img"))
+    monkeypatch.setattr(image_assets, "_urls", {})
+    monkeypatch.setattr(image_assets, "_failed", {})
+    monkeypatch.setattr(image_assets, "_building", set())
+    return tmp_path / "img"
+
+
+def wait_for_variant(source, width):
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        url = image_assets.image_url(source, width)
+        if url != source:
+            return url
+        time.sleep(0.02)
+    raise AssertionError("variant not built")
+
+
+def test_original_is_served_until_the_variant_is_ready(tmp_path, variant_dir, monkeypatch):
+    source = str(tmp_path / "banner.png")
+    Image.new("RGB", (2000, 1000), "red").save(source)
+
+    built = []
+    build_variant = image_assets._build_variant
+
+    def slow_build_variant(path, width):
+        time.sleep(0.2)
+        built.append(width)
+        return build_variant(path, width)
+
+    monkeypatch.setattr(image_assets, "_build_variant", slow_build_variant)
+    started = time.perf_counter()
+    assert image_assets.image_url(source, 400) == source
+    assert image_assets.image_url(source, 400) == source
+    assert time.perf_counter() - started < 0.1
+
+    url = wait_for_variant(source, 400)
+    assert url.startswith(image_assets.STATIC_URL + "/img/banner-")
+    assert built == [400]
+    name = url.rsplit("/", 1)[1].split("?")[0]
+    with Image.open(variant_dir / name) as variant:
+        assert variant.width == 400 * image_assets.PIXEL_DENSITY
+
+
+def test_unreadable_images_fall_back_to_the_source(tmp_path, variant_dir):
+    source = str(tmp_path / "broken.jpg")
+    (tmp_path / "broken.jpg").write_bytes(b"not an image")
+    assert image_assets.image_url(source, 400) == source
+    deadline = time.monotonic() + 10
+    while source not in image_assets._failed and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert image_assets.image_url(source, 400) == source
+    assert not image_assets._building
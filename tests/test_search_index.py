@@ -0,0 +1,37 @@
+"""Typo-tolerant name search."""
+import pandas as pd
+import pytest
+
+from search_index import SearchIndex, _edit_distance
+
+COLUMNS = ["contact_name", "guest_first_name", "guest_last_name"]
+
+
+@pytest.fixture
+def index():
+    df = pd.DataFrame({
+        "contact_name": ["John Smith", "John Smith", "Åse Hansen", "Øystein Berg"],
+        "guest_first_name": ["John", "Jane", "Åse", "Øystein"],
+        "guest_last_name": ["Smith", "Smith", "Hansen", "Berg"],
+    })
+    return SearchIndex(df, COLUMNS)
+
+
+def test_transposition_is_one_edit():
+    assert _edit_distance("jhon", "john", 1) == 1
+    assert _edit_distance("smiht", "smith", 1) == 1
+    assert _edit_distance("jahn", "john", 1) == 1
+    assert _edit_distance("jhno", "john", 1) == 2
+
+
+@pytest.mark.parametrize("term", ["jahn", "smoth", "jhon", "smiht", "jhon smiht", "john smoth"])
+def test_short_typos_are_found(index, term):
+    assert index.search(term) == ([0, 1], True)
+
+
+def test_exact_matches_come_first(index):
+    assert index.search("oystein") == ([3], False)
+    assert index.search("hanse") == ([2], False)
+    assert index.search("hnasen") == ([2], True)
+    assert index.search("xqzv") == ([], False)
+    assert index.search("jahn", fuzzy=False) == ([], False)
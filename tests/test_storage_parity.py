@@ -0,0 +1,264 @@
+"""Every storage backend must behave the same through the BaseStorage API."""
+import os
+import sqlite3
+import stat
+
+import pytest
+
+import schema
+import sidecar
+import storage
+from conftest import make_party
+
+SMITH = make_party("p-smith", "John Smith", "john@example.com", [
+    ("John", "Smith", "Pan-Seared Salmon (GF)", ""),
+    ("Jane", "Smith", "Grilled Chicken Breast (GF)", "Nut allergy"),
+])
+HANSEN = make_party("p-hansen", "Åse Hansen", "ase@example.com", [
+    ("Åse", "Hansen", "Pan-Seared Salmon (GF)", ""),
+])
+BERG = make_party("p-berg", "Ola Berg", "ola@example.com", [("Ola", "Berg", "", "")], attending="No")
+
+
+def stored_rows(backend):
+    """The stored rows as text, in storage order"""
+    df = backend.load()
+    return schema.to_text_frame(df).to_dict('records') if not df.empty else []
+
+
+def column(backend, name):
+    return [row[name] for row in stored_rows(backend)]
+
+
+def seed(backend):
+    for party in (SMITH, HANSEN, BERG):
+        backend.append(party)
+
+
+def test_append_and_load(backend):
+    seed(backend)
+    rows = stored_rows(backend)
+    assert [row["rsvp_id"] for row in rows] == ["p-smith-0", "p-smith-1", "p-hansen-0", "p-berg-0"]
+    assert rows[1]["guest_first_name"] == "Jane"
+    assert rows[1]["dietary_requirements"] == "Nut allergy"
+    assert rows[0]["timestamp"] == "2025-06-01 12:00:00"
+    assert rows[2]["contact_name"] == "Åse Hansen"
+
+
+def test_append_gives_one_party_to_rows_without_ids(backend):
+    rows = [{key: value for key, value in row.items() if key not in ("rsvp_id", "party_id")} for row in SMITH]
+    backend.append(rows)
+    stored = stored_rows(backend)
+    assert len({row["rsvp_id"] for row in stored}) == 2
+    assert len({row["party_id"] for row in stored}) == 1
+
+
+def test_summary_counts(backend):
+    assert backend.summary_counts()['total_rows'] == 0
+    seed(backend)
+    assert backend.summary_counts() == {
+        'total_rows': 4,
+        'total_contacts': 3,
+        'attending_contacts': 2,
+        'not_attending_contacts': 1,
+        'total_guests': 3,
+    }
+
+
+def test_menu_aggregates_match_recount(backend):
+    seed(backend)
+    totals = backend.menu_aggregates()
+    assert totals['total_guests'] == 3
+    assert totals['counts']['main_choice'] == {"Pan-Seared Salmon (GF)": 2, "Grilled Chicken Breast (GF)": 1}
+    assert totals['dietary'] == [{'guest_name': "Jane Smith", 'dietary_requirements': "Nut allergy"}]
+    assert backend.verify_menu_aggregates() == []
+
+
+def test_upsert_replaces_the_same_party(backend):
+    seed(backend)
+    resubmitted = make_party("p-smith", "John Smith", "john@example.com", [
+        ("John", "Smith", "Grilled Chicken Breast (GF)", ""),
+    ], timestamp="2025-06-02 09:00:00")
+    assert backend.upsert(resubmitted) == 1
+    assert column(backend, "rsvp_id") == ["p-hansen-0", "p-berg-0", "p-smith-0"]
+    assert backend.menu_aggregates()['counts']['main_choice'] == {
+        "Pan-Seared Salmon (GF)": 1, "Grilled Chicken Breast (GF)": 1
+    }
+    assert backend.verify_menu_aggregates() == []
+
+
+def test_upsert_replaces_the_same_contact(backend):
+    seed(backend)
+    resubmitted = make_party("p-new", "  JOHN   smith ", "John@Example.com", [
+        ("John", "Smith", "", ""),
+    ], attending="No", timestamp="2025-06-02 09:00:00")
+    assert backend.upsert(resubmitted) == 1
+    rows = stored_rows(backend)
+    assert [row["party_id"] for row in rows] == ["p-hansen", "p-berg", "p-smith"]
+    assert rows[-1]["rsvp_id"] == "p-new-0"
+    assert backend.find_party("John Smith", "john@example.com")['rows'] == ["p-new-0"]
+    assert backend.summary_counts()['total_guests'] == 1
+    assert backend.verify_menu_aggregates() == []
+
+
+def test_upsert_appends_new_parties(backend):
+    seed(backend)
+    newcomer = make_party("p-dahl", "Kari Dahl", "kari@example.com", [("Kari", "Dahl", "", "")])
+    assert backend.upsert(newcomer) == 0
+    assert column(backend, "party_id")[-1] == "p-dahl"
+    assert backend.find_party("kari dahl", "KARI@example.com")['party_id'] == "p-dahl"
+    assert backend.find_party("Nobody", "nobody@example.com") is None
+
+
+def test_upsert_never_matches_a_name_without_email(backend):
+    backend.upsert(make_party("p-first", "Kari Dahl", "", [("Kari", "Dahl", "", "")]))
+    other = make_party("p-second", "kari dahl", " ", [("Kari", "Dahl", "", "")], timestamp="2025-06-02 09:00:00")
+    assert backend.upsert(other) == 0
+    assert column(backend, "party_id") == ["p-first", "p-second"]
+    assert backend.find_party("Kari Dahl", "") is None
+    assert backend.verify_menu_aggregates() == []
+
+
+def test_peek_party_never_rebuilds(backend):
+    seed(backend)
+    assert backend.peek_party("john smith", "JOHN@example.com")[1]['party_id'] == "p-smith"
+    assert backend.peek_party("Nobody", "nobody@example.com") == (True, None)
+
+    # Derived data that does not match the data file is unknown, not rebuilt
+    os.remove(sidecar.sidecar_path(backend.path))
+    assert backend.peek_party("John Smith", "john@example.com") == (False, None)
+    assert backend.find_party("John Smith", "john@example.com")['party_id'] == "p-smith"
+    assert backend.peek_party("John Smith", "john@example.com")[0]
+
+
+def test_contact_index_matches_a_rebuild(backend):
+    seed(backend)
+    backend.upsert(make_party("p-new", "John Smith", "john@example.com", [("John", "Smith", "", "")])
+                   + make_party("p-dahl", "Kari Dahl", "kari@example.com", [("Kari", "Dahl", "", "")]))
+    backend.patch(updates={"p-hansen-0": {"contact_email": "ase.hansen@example.com"}}, deleted=["p-berg-0"])
+    index = backend.contact_index()
+    assert sorted(index['parties']) == ["p-dahl", "p-hansen", "p-smith"]
+    assert backend.menu_aggregates()['total_guests'] == 3
+
+    # Without its sidecar, a backend rebuilds the same index and totals from the data
+    os.remove(sidecar.sidecar_path(backend.path))
+    rebuilt = type(backend)(backend.path)
+    assert rebuilt.contact_index() == index
+    assert rebuilt.menu_aggregates() == backend.menu_aggregates()
+
+
+def test_patch_updates_adds_and_deletes_rows(backend):
+    seed(backend)
+    added = make_party("p-admin", "Admin Added", "", [("Per", "Admin", "Pan-Seared Salmon (GF)", "")])
+    backend.patch(
+        updates={"p-smith-1": {"main_choice": "Pan-Seared Salmon (GF)", "dietary_requirements": ""}},
+        added=added,
+        deleted=["p-hansen-0", "missing-row"],
+    )
+    rows = {row["rsvp_id"]: row for row in stored_rows(backend)}
+    assert sorted(rows) == ["p-admin-0", "p-berg-0", "p-smith-0", "p-smith-1"]
+    assert rows["p-smith-1"]["main_choice"] == "Pan-Seared Salmon (GF)"
+    assert rows["p-smith-1"]["guest_first_name"] == "Jane"
+
+    totals = backend.menu_aggregates()
+    assert totals['counts']['main_choice'] == {"Pan-Seared Salmon (GF)": 3}
+    assert totals['dietary'] == []
+    assert backend.verify_menu_aggregates() == []
+
+
+def test_search(backend):
+    seed(backend)
+    df = backend.load()
+
+    result = backend.search("smith")
+    assert list(result['rsvp_id']) == ["p-smith-0", "p-smith-1"]
+    assert not result.attrs['fuzzy']
+    # Labels match load(), so results can be merged back into the full frame
+    assert list(result.index) == list(df.index[:2])
+
+    assert list(backend.search("ase hansen")['rsvp_id']) == ["p-hansen-0"]
+
+    result = backend.search("hansne")
+    assert list(result['rsvp_id']) == ["p-hansen-0"]
+    assert result.attrs['fuzzy']
+
+    assert backend.search("nobody").empty
+
+
+def test_data_version_changes_on_every_write(backend):
+    versions = [backend.data_version()]
+    backend.append(SMITH)
+    versions.append(backend.data_version())
+    backend.upsert(HANSEN)
+    versions.append(backend.data_version())
+    backend.patch(updates={"p-smith-0": {"comments": "Looking forward to it"}})
+    versions.append(backend.data_version())
+    assert len(set(versions)) == len(versions)
+
+    # Cached reads are refreshed by the new version
+    assert stored_rows(backend)[0]["comments"] == "Looking forward to it"
+
+
+def test_data_version_is_stable_across_reads(backend):
+    # Another reader keeps the SQLite write-ahead log from being checkpointed
+    reader = None
+    if isinstance(backend, storage.SqliteStorage):
+        reader = sqlite3.connect(backend.path)
+        reader.execute("SELECT COUNT(*) FROM rsvps").fetchone()
+    seed(backend)
+    version = backend.data_version()
+    backend.load()
+    backend.summary_counts()
+    backend.menu_aggregates()
+    backend.search("smith")
+    backend.find_party("John Smith", "john@example.com")
+    if reader is not None:
+        # The last connection to close checkpoints the log into the database and
+        # removes the -wal file, without changing any row
+        reader.close()
+    assert backend.data_version() == version
+
+
+def test_data_version_sees_other_writers(backend):
+    backend.append(SMITH)
+    before = backend.data_version()
+    assert len(backend.load()) == 2
+
+    # Another process (or replica) writing the same file
+    other = type(backend)(backend.path)
+    other.append(HANSEN)
+    assert backend.data_version() != before
+    assert len(backend.load()) == 3
+    assert backend.menu_aggregates()['total_guests'] == 3
+
+
+def test_backends_agree(tmp_path):
+    """The same edits leave every backend with the same rows and derived data"""
+    results = {}
+    for name in storage.BACKENDS:
+        if name == "feather":
+            pytest.importorskip("pyarrow")
+        (tmp_path / name).mkdir()
+        backend = storage.create_storage(name, str(tmp_path / name / "rsvps.csv"))
+        seed(backend)
+        backend.upsert(make_party("p-x", "john smith", "JOHN@example.com", [("John", "Smith", "", "")]))
+        backend.patch(updates={"p-berg-0": {"attending": "Yes", "main_choice": "Pan-Seared Salmon (GF)"}})
+        results[name] = (
+            stored_rows(backend),
+            backend.summary_counts(),
+            backend.menu_aggregates()['counts'],
+            [row["rsvp_id"] for row in backend.recent(10).to_dict('records')],
+            list(backend.search("berg")['rsvp_id']),
+        )
+    first = results[storage.BACKENDS[0]]
+    for name, result in results.items():
+        assert result == first, name
+
+
+def test_rewrites_keep_file_permissions(backend):
+    seed(backend)
+    backend.patch(deleted=["p-berg-0"])
+    os.chmod(backend.path, 0o640)
+    backend.upsert(make_party("p-smith", "John Smith", "john@example.com", [("John", "Smith", "", "")]))
+    assert stat.S_IMODE(os.stat(backend.path).st_mode) == 0o640
+    assert stat.S_IMODE(os.stat(sidecar.sidecar_path(backend.path)).st_mode) & 0o044 == 0o044
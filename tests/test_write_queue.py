@@ -0,0 +1,145 @@
+"""Replay of spooled submissions left behind by a stopped process."""
+import json
+import os
+import threading
+
+import pytest
+
+import write_queue
+from conftest import make_party
+
+OLD = make_party("p-1", "Kari Dahl", "kari@example.com", [("Kari", "Dahl", "Pan-Seared Salmon (GF)", "")])
+NEW = make_party("p-1", "Kari Dahl", "kari@example.com", [("Kari", "Dahl", "", "")],
+                 attending="No", timestamp="2025-06-02 09:00:00")
+for row in NEW:
+    row["rsvp_id"] = "p-1-new"
+
+
+def leave_spool(backend, *lines, name="otherhost-1-dead"):
+    """Write the spool of a process that stopped without committing it"""
+    path = f"{backend.path}.queue-{name}.jsonl"
+    with open(path, "w", encoding="utf-8") as f:
+        for line in lines:
+            f.write(json.dumps(line) + "\n")
+    return path
+
+
+def attending(backend):
+    return [(row["party_id"], row["attending"]) for row in backend.load().to_dict("records")]
+
+
+def test_replay_commits_left_over_parties(backend):
+    newcomer = make_party("p-2", "Ola Berg", "ola@example.com", [("Ola", "Berg", "", "")])
+    path = leave_spool(backend, OLD, newcomer)
+    queue = write_queue.WriteQueue(backend)
+    assert queue.flush(timeout=10)
+    assert attending(backend) == [("p-1", "Yes"), ("p-2", "Yes")]
+    assert not os.path.exists(path)
+    queue.close()
+
+
+def test_replay_never_brings_back_replaced_answers(backend):
+    backend.upsert(OLD)
+    backend.upsert(NEW)
+    leave_spool(backend, OLD)
+    write_queue.WriteQueue(backend).close()
+    assert attending(backend) == [("p-1", "No")]
+
+
+def test_replay_skips_committed_parties(backend):
+    leave_spool(backend, OLD, {"committed": ["p-1-0"]}, NEW)
+    write_queue.WriteQueue(backend).close()
+    assert attending(backend) == [("p-1", "No")]
+
+    # Deleted by an admin after it was committed: not resurrected
+    backend.patch(deleted=["p-1-new"])
+    leave_spool(backend, NEW, {"committed": ["p-1-new"]})
+    write_queue.WriteQueue(backend).close()
+    assert attending(backend) == []
+
+
+def test_replay_leaves_spools_of_running_queues(backend):
+    if write_queue.fcntl is None:
+        pytest.skip("spools are claimed with fcntl locks")
+    running = write_queue.WriteQueue(backend)
+    # Spooled, but never handed to the writer thread
+    with running._condition:
+        running._write_spool((json.dumps(OLD) + "\n").encode("utf-8"))
+
+    write_queue.WriteQueue(backend).close()
+    assert attending(backend) == []
+
+    running._spool.close()  # The running process stops
+    write_queue.WriteQueue(backend).close()
+    assert attending(backend) == [("p-1", "Yes")]
+
+
+def test_queued_contacts_are_found_before_they_are_committed(backend):
+    queue = write_queue.WriteQueue(backend)
+    # Queued, but never handed to the writer thread
+    with queue._condition:
+        queue._entries.append((0.0, OLD))
+        assert queue.queued_contact(" kari DAHL", "Kari@Example.com")
+        assert not queue.queued_contact("Kari Dahl", "")
+        assert not queue.queued_contact("Ola Berg", "kari@example.com")
+        queue._entries.clear()
+    queue.close()
+
+
+def test_a_party_that_cannot_be_committed_is_dead_lettered(backend, monkeypatch):
+    monkeypatch.setattr(write_queue, "BATCH_ATTEMPTS", 1)
+    upsert = backend.upsert
+
+    def upsert_without_bad_rows(rows):
+        if any(row["contact_name"] == "Bad Row" for row in rows):
+            raise ValueError("bad row")
+        return upsert(rows)
+
+    monkeypatch.setattr(backend, "upsert", upsert_without_bad_rows)
+    bad = make_party("p-bad", "Bad Row", "bad@example.com", [("Bad", "Row", "", "")])
+    queue = write_queue.WriteQueue(backend)
+    # Both parties go to the writer in one batch
+    with queue._condition:
+        queue.submit(OLD)
+        queue.submit(bad)
+    assert queue.flush(timeout=10)
+    assert attending(backend) == [("p-1", "Yes")]
+    metrics = queue.metrics()
+    assert (metrics['committed_parties'], metrics['dead_letter_parties']) == (1, 1)
+    with open(metrics['dead_letter_file'], encoding="utf-8") as f:
+        [entry] = [json.loads(line) for line in f]
+    assert entry['error'] == "bad row"
+    assert entry['rows'][0]["party_id"] == "p-bad"
+
+    # The queue carries on
+    queue.submit(NEW)
+    assert queue.close(timeout=10)
+    assert attending(backend) == [("p-1", "No")]
+
+
+def test_replay_runs_on_the_writer_thread(backend, monkeypatch):
+    leave_spool(backend, OLD)
+    replaying = threading.Event()
+    release = threading.Event()
+    replay = write_queue.WriteQueue._replay
+
+    def slow_replay(queue):
+        replaying.set()
+        release.wait(10)
+        replay(queue)
+
+    monkeypatch.setattr(write_queue.WriteQueue, "_replay", slow_replay)
+    monkeypatch.setattr(write_queue, "_queues", {})
+    # Neither the constructor nor the module-wide guard waits for the replay
+    queue = write_queue.get_write_queue(backend)
+    assert replaying.wait(10)
+    with write_queue._queues_guard:
+        pass
+    assert not queue.flush(timeout=0.1)
+
+    # Submissions wait until the left-over parties are committed
+    queue.submit(NEW)
+    assert attending(backend) == []
+    release.set()
+    assert queue.close(timeout=10)
+    assert attending(backend) == [("p-1", "No")]
@@ -1,104 +1,205 @@
-import streamlit as st
-import pandas as pd
-import os
+from dataclasses import dataclass
 from datetime import datetime, timedelta
+from functools import lru_cache
 import pytz
 
-# CSV file path
-CSV_FILE = st.secrets["files"]["csv_file"]
+from config import get_config, on_reload, DEADLINE_FORMAT
+from perf import timed
 
-def load_rsvps():
-    """Load existing RSVP data from CSV file"""
-    if os.path.exists(CSV_FILE):
-        try:
-            return pd.read_csv(CSV_FILE, dtype={'contact_phone': str})
-        except:
-            return pd.DataFrame()
-    return pd.DataFrame()
-
-def save_rsvp(rsvp_data):
-    """Save RSVP data to CSV file"""
-    df = load_rsvps()
-    new_df = pd.DataFrame([rsvp_data])
-    df = pd.concat([df, new_df], ignore_index=True)
-    # Ensure phone numbers are saved as strings
-    if 'contact_phone' in df.columns:
-        df['contact_phone'] = df['contact_phone'].astype(str)
-    df.to_csv(CSV_FILE, index=False)
+# storage, write_queue, schema and exports pull in pandas, so they are imported
+# on first use; guests who only view the form and event pages never load them
 
-def save_rsvps(df):
-    """Save entire RSVP dataframe to CSV file"""
-    # Ensure phone numbers are saved as strings
-    if 'contact_phone' in df.columns:
-        df['contact_phone'] = df['contact_phone'].astype(str)
-    df.to_csv(CSV_FILE, index=False)
+def get_storage():
+    """Return the configured storage backend"""
+    import storage
+    return storage.get_storage()
 
-# Deadline utility functions
-def get_deadline_datetime():
-    """Get the deadline datetime from secrets configuration"""
-    try:
-        deadline_str = st.secrets["deadline"]["deadline_datetime"]
-        timezone_str = st.secrets["deadline"].get("timezone", "UTC")
+@timed
+def load_rsvps():
+    """Load existing RSVP data from the configured storage backend (typed per schema.py)"""
+    return get_storage().load()
 
-        # Parse the deadline string
-        deadline_naive = datetime.strptime(deadline_str, "%Y-%m-%d %H:%M")
+def get_data_version():
+    """Get a token that changes whenever the stored RSVP data changes"""
+    return get_storage().data_version()
 
-        # Add timezone
-        tz = pytz.timezone(timezone_str)
-        deadline_tz = tz.localize(deadline_naive)
+def save_rsvp_batch(rows):
+    """Save several RSVP rows in one atomic operation"""
+    get_storage().append(rows)
 
-        return deadline_tz
-    except Exception as e:
-        st.error(f"Error parsing deadline configuration: {e}")
-        return None
+def queue_rsvp_batch(rows):
+    """Queue one party's RSVP rows for the background writer
 
-def is_past_deadline():
-    """Check if the current time is past the RSVP deadline"""
-    deadline = get_deadline_datetime()
-    if deadline is None:
-        return False
+    Returns once the rows are durably spooled; they are committed to storage
+    shortly afterwards, coalesced with other submissions.
+    """
+    from write_queue import get_write_queue
+    get_write_queue(get_storage()).submit(rows)
 
-    now = datetime.now(deadline.tzinfo)
-    return now > deadline
+def get_write_queue_metrics():
+    """Get queue depth, commit counts and commit latency of the background writer"""
+    from write_queue import get_write_queue
+    return get_write_queue(get_storage()).metrics()
 
-def is_within_grace_period():
-    """Check if we're within the admin grace period after deadline"""
-    if not is_past_deadline():
-        return False
+@timed
+def save_rsvp(rsvp_data):
+    """Save a single RSVP row"""
+    save_rsvp_batch([rsvp_data])
 
-    deadline = get_deadline_datetime()
-    if deadline is None:
-        return False
+@timed
+def save_rsvps(df):
+    """Replace all stored RSVP data with the given dataframe"""
+    get_storage().replace(df)
+
+def ensure_rsvp_ids():
+    """Make sure every stored RSVP row has a stable rsvp_id"""
+    get_storage().ensure_row_ids()
+
+def apply_rsvp_edits(updates=None, added=None, deleted=None):
+    """Apply row-level edits keyed by rsvp_id without rewriting unrelated rows"""
+    get_storage().patch(updates, added, deleted)
+
+def get_rsvp_summary():
+    """Get the headline RSVP counts (responses, attending, not attending, guests)"""
+    return get_storage().summary_counts()
+
+def get_recent_rsvps(limit=10):
+    """Get the most recently submitted RSVP rows, newest first"""
+    return get_storage().recent(limit)
+
+def get_menu_totals():
+    """Get the running menu-choice counts and dietary notes for attending guests"""
+    return get_storage().menu_aggregates()
+
+def find_earlier_rsvp(contact_name, contact_email):
+    """Whether an earlier RSVP from this contact is stored or queued: True, False, or None if unknown
+
+    Never waits for the storage write lock; the answer is unknown while the
+    background writer is committing.
+    """
+    from write_queue import get_write_queue
+    storage = get_storage()
+    if get_write_queue(storage).queued_contact(contact_name, contact_email):
+        return True
+    current, party = storage.peek_party(contact_name, contact_email)
+    return party is not None if current else None
+
+def get_duplicate_rsvps():
+    """Get groups of stored parties that share a contact name or email"""
+    return get_storage().duplicate_parties()
+
+def get_rsvp_export(attending_only=False, fmt="csv"):
+    """Build (or reuse) an export of the RSVP data in the given format"""
+    from exports import build_export
+    return build_export(get_storage(), attending_only, fmt)
+
+def search_rsvps(term):
+    """Find RSVP rows whose contact or guest name contains the search term"""
+    return get_storage().search(term)
 
-    grace_hours = st.secrets["deadline"].get("grace_period_hours", 24)
-    grace_period = timedelta(hours=grace_hours)
+# Deadline utility functions
+@dataclass(frozen=True)
+class DeadlineState:
+    """Snapshot of the RSVP deadline configuration and the current time"""
+    deadline: datetime
+    grace_end: datetime
+    warning_start: datetime
+    now: datetime
+    timezone: str
+    grace_hours: float
+    warning_days: float
+
+    @property
+    def is_past_deadline(self):
+        return self.now > self.deadline
+
+    @property
+    def is_within_grace_period(self):
+        return self.deadline < self.now <= self.grace_end
+
+    @property
+    def is_within_warning_period(self):
+        return self.warning_start <= self.now <= self.deadline
+
+    @property
+    def time_until_deadline(self):
+        if self.now > self.deadline:
+            return timedelta(0)  # Past deadline
+        return self.deadline - self.now
+
+@lru_cache(maxsize=8)
+def _parse_deadline(deadline_str, timezone_str, grace_hours, warning_days):
+    """Parse the deadline configuration (cached per configuration values)"""
+    # Parse the deadline string
+    deadline_naive = datetime.strptime(deadline_str, DEADLINE_FORMAT)
+
+    # Add timezone
+    tz = pytz.timezone(timezone_str)
+    deadline_tz = tz.localize(deadline_naive)
+
+    return (
+        deadline_tz,
+        deadline_tz + timedelta(hours=grace_hours),
+        deadline_tz - timedelta(days=warning_days)
+    )
+
+on_reload(_parse_deadline.cache_clear)
+
+def get_deadline_state():
+    """Get a DeadlineState snapshot, or None if no deadline is configured
+
+    Pages call this once per run and pass the snapshot to the helpers below,
+    so the clock is sampled only once per rerun. The deadline settings were
+    validated when the configuration was loaded.
+    """
+    deadline_config = get_config().deadline
+    if deadline_config is None:
+        return None
 
-    now = datetime.now(deadline.tzinfo)
-    return now <= (deadline + grace_period)
+    deadline, grace_end, warning_start = _parse_deadline(
+        deadline_config.deadline_datetime, deadline_config.timezone,
+        deadline_config.grace_period_hours, deadline_config.warning_days
+    )
+
+    return DeadlineState(
+        deadline=deadline,
+        grace_end=grace_end,
+        warning_start=warning_start,
+        now=datetime.now(deadline.tzinfo),
+        timezone=deadline_config.timezone,
+        grace_hours=deadline_config.grace_period_hours,
+        warning_days=deadline_config.warning_days
+    )
+
+def get_deadline_datetime(state=None):
+    """Get the deadline datetime from secrets configuration"""
+    if state is None:
+        state = get_deadline_state()
+    return state.deadline if state else None
 
-def is_within_warning_period():
-    """Check if we're within the warning period before deadline"""
-    deadline = get_deadline_datetime()
-    if deadline is None:
-        return False
+def is_past_deadline(state=None):
+    """Check if the current time is past the RSVP deadline"""
+    if state is None:
+        state = get_deadline_state()
+    return state.is_past_deadline if state else False
 
-    warning_days = st.secrets["deadline"].get("warning_days", 7)
-    warning_period = timedelta(days=warning_days)
+def is_within_grace_period(state=None):
+    """Check if we're within the admin grace period after deadline"""
+    if state is None:
+        state = get_deadline_state()
+    return state.is_within_grace_period if state else False
 
-    now = datetime.now(deadline.tzinfo)
-    return (deadline - warning_period) <= now <= deadline
+def is_within_warning_period(state=None):
+    """Check if we're within the warning period before deadline"""
+    if state is None:
+        state = get_deadline_state()
+    return state.is_within_warning_period if state else False
 
-def get_time_until_deadline():
+def get_time_until_deadline(state=None):
     """Get the time remaining until the deadline"""
-    deadline = get_deadline_datetime()
-    if deadline is None:
-        return None
-
-    now = datetime.now(deadline.tzinfo)
-    if now > deadline:
-        return timedelta(0)  # Past deadline
-
-    return deadline - now
+    if state is None:
+        state = get_deadline_state()
+    return state.time_until_deadline if state else None
 
 def format_time_remaining(time_delta):
     """Format time remaining in a human-readable format"""
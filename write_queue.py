@@ -0,0 +1,416 @@
+"""Background single-writer queue for guest submissions.
+
+A submission is acknowledged once it has been appended (and fsync'd) to a
+small spool file next to the data file, so the guest does not wait for the
+storage write lock, menu totals or any file rewrite. One writer thread per
+data file drains the queue, coalescing every party waiting at that moment
+into a single storage commit. Parties are committed with storage.upsert(),
+so a party submitted twice, or an RSVP resubmitted by the same contact,
+replaces the earlier rows instead of adding to them.
+
+Spooled parties that were not committed when a process stopped are replayed
+into storage the next time a queue is started for the same data file, by
+its writer thread before it commits anything submitted to it. The
+writer appends a marker line naming the parties of each batch once it is
+committed, and a replay skips those, parties whose rows are already stored
+(matched by rsvp_id) and parties whose party or contact has an equally
+recent or newer stored submission, so a replay never duplicates a party or
+brings back answers that were replaced since. An atexit hook flushes the
+queue on shutdown.
+
+A batch that keeps failing is committed one party at a time after
+BATCH_ATTEMPTS tries, and a party that still cannot be committed is moved
+to <data file>.dead-letter.jsonl, so one bad party cannot hold up the
+parties queued behind it.
+
+Each queue holds an exclusive fcntl lock on its spool file while it runs.
+Replicas sharing the volume have their own PID namespaces, so a spool is
+taken to be left behind when its lock can be taken, not when its writer's
+PID is gone; whoever takes the lock replays it.
+"""
+import atexit
+import collections
+import glob
+import json
+import os
+import socket
+import threading
+import time
+
+import contact_index
+import schema
+from perf import percentile, timer
+from schema import ROW_ID_COLUMN, PARTY_ID_COLUMN, TIMESTAMP_COLUMN
+
+try:
+    import fcntl
+except ImportError:  # Windows: only spools of exited processes on this host are replayed
+    fcntl = None
+
+# Parties that may wait in the queue before submit() blocks
+QUEUE_MAX_PARTIES = 1000
+
+# Upper bound on the parties coalesced into one storage commit
+BATCH_MAX_PARTIES = 200
+
+# Failed commits of a batch before its parties are committed one at a time
+BATCH_ATTEMPTS = 3
+
+# How long submit() waits for room in a full queue before giving up
+SUBMIT_TIMEOUT_SECONDS = 10
+
+# How long the shutdown hook waits for queued parties to be committed
+SHUTDOWN_FLUSH_SECONDS = 30
+
+# Commit latencies kept for the metrics percentiles
+LATENCY_SAMPLES = 500
+
+def _pid_alive(pid):
+    """Return True if a process with this pid is running"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def _claim_spool(path):
+    """Open the spool of another queue for replay, or return None while it is in use
+
+    The lock is held until the returned file is closed. A spool removed by
+    an earlier replay after it was opened here is not returned.
+    """
+    try:
+        f = open(path, 'rb')
+    except FileNotFoundError:
+        return None
+    try:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            if os.fstat(f.fileno()).st_ino != os.stat(path).st_ino:
+                raise FileNotFoundError(path)
+        else:
+            # <data file>.queue-<host>-<pid>-<id>.jsonl
+            host, pid, _ = path.rsplit('.queue-', 1)[1].rsplit('-', 2)
+            if host != socket.gethostname() or _pid_alive(int(pid)):
+                raise BlockingIOError(path)
+    except (OSError, ValueError):
+        f.close()
+        return None
+    return f
+
+def _read_spool(f):
+    """Return the spooled parties that no commit marker names"""
+    parties, committed = [], set()
+    for line in f:
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            # A torn last line was never acknowledged
+            continue
+        if isinstance(entry, dict):
+            committed.update(entry.get('committed', ()))
+        elif entry:
+            parties.append(entry)
+    return [party for party in parties if party[0].get(ROW_ID_COLUMN) not in committed]
+
+class WriteQueue:
+    """Bounded queue of parties committed to a storage backend by one writer thread"""
+
+    def __init__(self, storage):
+        self.storage = storage
+        self._spool_path = f"{storage.path}.queue-{socket.gethostname()}-{os.getpid()}-{schema.new_id()}.jsonl"
+        self._spool = None
+        self._dead_letter_path = f"{storage.path}.dead-letter.jsonl"
+        self._slots = threading.BoundedSemaphore(QUEUE_MAX_PARTIES)
+        self._condition = threading.Condition()
+        self._entries = collections.deque()
+        self._pending = 0
+        self._replaying = True
+        self._thread = None
+
+        self._committed_parties = 0
+        self._replaced_parties = 0
+        self._committed_batches = 0
+        self._last_batch_size = 0
+        self._failures = 0
+        self._last_error = None
+        self._dead_letter_parties = 0
+        self._queue_latencies = collections.deque(maxlen=LATENCY_SAMPLES)
+        self._write_latencies = collections.deque(maxlen=LATENCY_SAMPLES)
+
+        with self._condition:
+            self._start()
+
+    def submit(self, rows):
+        """Queue one party's rows; returns once the party is durably spooled
+
+        Rows are given their rsvp_id/party_id here, so the spooled copy and
+        the committed rows are identical and a replay can recognise them.
+        Raises TimeoutError if the queue stays full for SUBMIT_TIMEOUT_SECONDS.
+        """
+        party_id = schema.new_id()
+        rows = [dict(row) for row in rows]
+        for row in rows:
+            row.setdefault(ROW_ID_COLUMN, schema.new_id())
+            row.setdefault(PARTY_ID_COLUMN, party_id)
+        if not rows:
+            return
+
+        if not self._slots.acquire(timeout=SUBMIT_TIMEOUT_SECONDS):
+            raise TimeoutError("The RSVP write queue is full, please try again in a moment")
+        try:
+            line = (json.dumps(rows, ensure_ascii=False) + "\n").encode('utf-8')
+            with self._condition:
+                self._write_spool(line)
+                self._entries.append((time.perf_counter(), rows))
+                self._pending += 1
+                self._start()
+                self._condition.notify_all()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def queued_contact(self, contact_name, contact_email):
+        """True if a party from this contact is queued but not yet committed"""
+        key = contact_index.contact_key(contact_name, contact_email)
+        if not contact_index.can_match(key):
+            return False
+        with self._condition:
+            return any(
+                contact_index.contact_key(rows[0].get('contact_name'), rows[0].get('contact_email')) == key
+                for _, rows in self._entries
+            )
+
+    def flush(self, timeout=None):
+        """Wait until left-over spools are replayed and every queued party is committed
+
+        Returns False on timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self._pending or self._replaying:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def close(self, timeout=None):
+        """Flush the queue and remove its spool file; returns False on timeout"""
+        if not self.flush(timeout):
+            return False
+        with self._condition:
+            if not self._pending and self._spool is not None:
+                # Removed before the lock is released, so it is never replayed
+                os.remove(self._spool_path)
+                self._spool.close()
+                self._spool = None
+        return True
+
+    def metrics(self):
+        """Queue depth, commit counts and latency percentiles (in milliseconds)"""
+        with self._condition:
+            queue_latencies = list(self._queue_latencies)
+            write_latencies = list(self._write_latencies)
+            return {
+                'queue_depth': self._pending,
+                'queue_capacity': QUEUE_MAX_PARTIES,
+                'committed_parties': self._committed_parties,
+                'replaced_parties': self._replaced_parties,
+                'committed_batches': self._committed_batches,
+                'last_batch_size': self._last_batch_size,
+                'failed_commits': self._failures,
+                'last_error': self._last_error,
+                'dead_letter_parties': self._dead_letter_parties,
+                'dead_letter_file': self._dead_letter_path,
+                'commit_latency_p50_ms': percentile(queue_latencies, 0.50),
+                'commit_latency_p95_ms': percentile(queue_latencies, 0.95),
+                'write_latency_p50_ms': percentile(write_latencies, 0.50),
+                'write_latency_p95_ms': percentile(write_latencies, 0.95),
+            }
+
+    def _start(self):
+        """Start the writer thread if it is not running (caller holds the condition)"""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="rsvp-writer", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        """Writer thread: replay left-over spools, then commit everything queued so far, one batch at a time"""
+        if self._replaying:
+            try:
+                self._replay()
+            except Exception as e:
+                # Spools not replayed stay where they are and are replayed on the next start
+                with self._condition:
+                    self._failures += 1
+                    self._last_error = str(e)
+            finally:
+                with self._condition:
+                    self._replaying = False
+                    self._condition.notify_all()
+        while True:
+            with self._condition:
+                while not self._entries:
+                    self._condition.wait()
+                batch = [self._entries[i] for i in range(min(len(self._entries), BATCH_MAX_PARTIES))]
+
+            # Identifies each party in the commit marker (upsert may change its party_id)
+            committed = [party_rows[0][ROW_ID_COLUMN] for _, party_rows in batch]
+            start = time.perf_counter()
+            with timer("rsvp_commit"):
+                replaced, dead = self._commit([party_rows for _, party_rows in batch])
+            finished = time.perf_counter()
+
+            with self._condition:
+                for _ in batch:
+                    self._entries.popleft()
+                self._pending -= len(batch)
+                self._committed_parties += len(batch) - dead
+                self._replaced_parties += replaced
+                self._committed_batches += 1
+                self._last_batch_size = len(batch)
+                self._write_latencies.append((finished - start) * 1000)
+                self._queue_latencies.extend((finished - queued_at) * 1000 for queued_at, _ in batch)
+                try:
+                    if not self._pending:
+                        # Everything spooled so far is committed
+                        self._truncate_spool()
+                    else:
+                        self._write_spool((json.dumps({'committed': committed}) + "\n").encode('utf-8'))
+                except OSError as e:
+                    # A replay still skips the batch: its rows are stored or dead-lettered
+                    self._last_error = str(e)
+                self._condition.notify_all()
+            for _ in batch:
+                self._slots.release()
+
+    def _commit(self, parties):
+        """Commit parties to storage, retrying failures with backoff
+
+        After BATCH_ATTEMPTS failed tries the parties are committed one at a
+        time. Returns the number of earlier parties replaced and the number
+        of parties moved to the dead-letter file.
+        """
+        backoff = 0.1
+        attempts = 0
+        while True:
+            try:
+                if attempts < BATCH_ATTEMPTS:
+                    return self.storage.upsert([row for rows in parties for row in rows]), 0
+                return self._commit_one_by_one(parties)
+            except Exception as e:
+                # The parties stay queued (and spooled) until they are committed
+                with self._condition:
+                    self._failures += 1
+                    self._last_error = str(e)
+                attempts += 1
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 5)
+
+    def _commit_one_by_one(self, parties):
+        """Commit parties separately, moving any that fail to the dead-letter file"""
+        replaced = dead = 0
+        for rows in parties:
+            try:
+                replaced += self.storage.upsert(rows)
+            except Exception as e:
+                self._dead_letter(rows, e)
+                dead += 1
+        with self._condition:
+            self._dead_letter_parties += dead
+            if dead:
+                self._last_error = f"{dead} submissions moved to {self._dead_letter_path}"
+        return replaced, dead
+
+    def _dead_letter(self, rows, error):
+        """Append a party that cannot be committed to the dead-letter file, fsync'd"""
+        line = json.dumps({'error': str(error), 'rows': rows}, ensure_ascii=False) + "\n"
+        with open(self._dead_letter_path, 'ab') as f:
+            f.write(line.encode('utf-8'))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _open_spool(self):
+        """Create this queue's spool file, locked before it can be seen under its name"""
+        f = open(self._spool_path + ".new", 'ab')
+        try:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            os.rename(self._spool_path + ".new", self._spool_path)
+        except BaseException:
+            f.close()
+            raise
+        return f
+
+    def _write_spool(self, line):
+        """Append a line to the spool file and fsync it (caller holds the condition)"""
+        if self._spool is None:
+            self._spool = self._open_spool()
+        self._spool.write(line)
+        self._spool.flush()
+        os.fsync(self._spool.fileno())
+
+    def _truncate_spool(self):
+        """Empty the spool file (caller holds the condition)"""
+        if self._spool is not None:
+            self._spool.truncate(0)
+            os.fsync(self._spool.fileno())
+
+    def _superseded(self, party, stored_ids):
+        """True if a spooled party is stored, or the party it would replace is as recent or newer"""
+        if any(row.get(ROW_ID_COLUMN) in stored_ids for row in party):
+            return True
+        first = party[0]
+        # The party an upsert would replace: the same party, or else the same contact's latest
+        stored = self.storage.get_party(first.get(PARTY_ID_COLUMN))
+        if stored is None:
+            stored = self.storage.find_party(first.get('contact_name'), first.get('contact_email'))
+        timestamp = schema.to_storage_value(TIMESTAMP_COLUMN, first.get(TIMESTAMP_COLUMN))
+        return stored is not None and stored['timestamp'] >= timestamp
+
+    def _replay(self):
+        """Commit parties left in the spool files of stopped processes"""
+        pattern = glob.escape(self.storage.path) + ".queue-*.jsonl"
+        for path in glob.glob(pattern):
+            f = _claim_spool(path)
+            if f is None:
+                continue
+            # If we stop part way, the lock is released and the spool replayed again later
+            with f:
+                parties = _read_spool(f)
+                if parties:
+                    stored = self.storage._read_columns([ROW_ID_COLUMN])
+                    stored_ids = set(stored[ROW_ID_COLUMN].dropna()) if ROW_ID_COLUMN in stored.columns else set()
+                    parties = [party for party in parties if not self._superseded(party, stored_ids)]
+                    if parties:
+                        self._commit(parties)
+                os.remove(path)
+
+_queues = {}
+_queues_guard = threading.Lock()
+
+def get_write_queue(storage):
+    """Return the write queue for a storage backend, starting it on first use"""
+    with _queues_guard:
+        if storage.path not in _queues:
+            _queues[storage.path] = WriteQueue(storage)
+        return _queues[storage.path]
+
+def flush_all(timeout=None):
+    """Wait for every write queue in this process to drain"""
+    with _queues_guard:
+        queues = list(_queues.values())
+    return all(write_queue.flush(timeout) for write_queue in queues)
+
+def _shutdown():
+    """Flush-on-shutdown hook: commit queued parties before the process exits"""
+    with _queues_guard:
+        queues = list(_queues.values())
+    for write_queue in queues:
+        # Anything not committed in time stays spooled and is replayed on restart
+        write_queue.close(SHUTDOWN_FLUSH_SECONDS)
+
+atexit.register(_shutdown)